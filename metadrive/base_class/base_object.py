@@ -1,4 +1,3 @@
-import copy
 import math
 from abc import ABC
 from typing import Dict
@@ -118,7 +117,6 @@ class BaseObject(BaseRunnable, MetaDriveType, ABC):
         Config is a static conception, which specified the parameters of one element.
         There parameters doesn't change, such as length of straight road, max speed of one vehicle, etc.
         """
-        config = copy.deepcopy(config)
         BaseRunnable.__init__(self, name, random_seed, config)
         MetaDriveType.__init__(self)
         if not escape_random_seed_assertion:
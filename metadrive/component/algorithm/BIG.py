@@ -62,13 +62,16 @@ class BIG:
         )
         self.blocks.append(first_block)
         self.next_step = NextStep.forward
+        self._topology_only = False
         # assert block_type_version in ["v1", "v2"]
         # self.block_type_version = block_type_version
 
-    def generate(self, generate_method: str, parameter: Union[str, int]):
+    def generate(self, generate_method: str, parameter: Union[str, int], topology_only=False):
         """
         In order to embed it to the show_base loop, we implement BIG in a more complex way
+        :param topology_only: only search the block sequence. Except the first block, blocks are not created in world
         """
+        self._topology_only = topology_only
         if generate_method == BigGenerateMethod.BLOCK_NUM:
             assert isinstance(parameter, int), "When generating map by assigning block num, the parameter should be int"
             self.block_num = parameter + 1
@@ -91,6 +94,8 @@ class BIG:
 
     def big_helper_func(self):
         if len(self.blocks) >= self.block_num and self.next_step == NextStep.forward:
+            if not self._topology_only:
+                self.construct_in_world()
             return True
         if self.next_step == NextStep.forward:
             self._forward()
@@ -132,12 +137,21 @@ class BIG:
         block.destruct_block(self._physics_world)
 
     def construct(self, block) -> bool:
-        success = block.construct_block(self._render_node_path, self._physics_world)
+        # only the geometry is checked when searching, blocks are created in world after the map is accepted
+        success = block.construct_topology()
         lane_num = max([len(socket.get_positive_lanes(self._global_network)) for socket in block._sockets.values()])
         if lane_num < self.block_dist_config.MIN_LANE_NUM or lane_num > self.block_dist_config.MAX_LANE_NUM:
             success = False
         return success
 
+    def construct_in_world(self):
+        """
+        Create node paths and physics bodies for the accepted blocks. The first block is created in its constructor
+        """
+        for block in self.blocks:
+            if not block.is_attached():
+                block.construct_in_world(self._render_node_path, self._physics_world)
+
     def _forward(self):
         logging.debug("forward")
         block = self.sample_block()
@@ -196,3 +210,4 @@ class BIG:
         self._exit_length = None
         self.blocks = None
         self.next_step = None
+        self._topology_only = None
@@ -9,7 +9,7 @@ import numpy as np
 from panda3d.bullet import BulletBoxShape
 from panda3d.bullet import BulletConvexHullShape
 from panda3d.bullet import BulletTriangleMeshShape, BulletTriangleMesh
-from panda3d.core import LPoint3f, Material
+from panda3d.core import LPoint3f, Material, TransformState
 from panda3d.core import TextureStage
 from panda3d.core import Vec3, LQuaternionf, RigidBodyCombiner, \
     SamplerState, NodePath, Texture
@@ -38,7 +38,8 @@ class BaseBlock(BaseObject, PGDrivableAreaProperty, ABC):
     """
     Block is a driving area consisting of several roads
     Note: overriding the _sample() function to fill block_network/respawn_roads in subclass
-    Call Block.construct_block() to add it to world
+    Call Block.construct_block() to add it to world, or call construct_topology() and construct_in_world() separately
+    to check the geometry before creating anything in world
     """
     ID = "B"
 
@@ -72,6 +73,10 @@ class BaseBlock(BaseObject, PGDrivableAreaProperty, ABC):
         self.crosswalks = {}
         self.sidewalks = {}
 
+        # collision shapes collected when merge_collision_bodies=True, see _construct_merged_collision_bodies()
+        self._merged_line_shapes = None
+        self._merged_sidewalk_mesh = None
+
         if self.render:
             # side
             self.side_texture = self.loader.loadTexture(AssetLoader.file_path("textures", "sidewalk", "color.png"))
@@ -103,6 +108,16 @@ class BaseBlock(BaseObject, PGDrivableAreaProperty, ABC):
         """
         Randomly Construct a block, if overlap return False
         """
+        success = self.construct_topology(extra_config, no_same_node)
+        self.construct_in_world(root_render_np, physics_world, attach_to_world)
+        return success
+
+    def construct_topology(self, extra_config: Dict = None, no_same_node=True) -> bool:
+        """
+        Randomly sample the lanes and sockets of this block and add them to the global network, without creating any
+        node path or physics body. Call construct_in_world() to build it after the block is accepted, if overlap return
+        False
+        """
         self.sample_parameters()
 
         if not isinstance(self.origin, NodePath):
@@ -120,15 +135,18 @@ class BaseBlock(BaseObject, PGDrivableAreaProperty, ABC):
         self._clear_topology()
         success = self._sample_topology()
         self._global_network.add(self.block_network, no_same_node)
+        return success
 
+    def construct_in_world(self, root_render_np: NodePath, physics_world: PhysicsWorld, attach_to_world=True):
+        """
+        Create node paths and physics bodies for the topology sampled by construct_topology() and attach them to world
+        """
         self._create_in_world()
         self.attach_to_world(root_render_np, physics_world)
 
         if not attach_to_world:
             self.detach_from_world(physics_world)
 
-        return success
-
     def detach_from_world(self, physics_world: PhysicsWorld):
         """
         Detach the object from the scene graph but store it in the memory
@@ -220,11 +238,18 @@ class BaseBlock(BaseObject, PGDrivableAreaProperty, ABC):
         self.crosswalk_node_path = NodePath(RigidBodyCombiner(self.name + "_crosswalk"))
         self.lane_node_path = NodePath(RigidBodyCombiner(self.name + "_lane"))
 
+        if self.engine is not None and self.engine.global_config.get("merge_collision_bodies", False):
+            self._merged_line_shapes = {}
+            self._merged_sidewalk_mesh = BulletTriangleMesh()
+
         if skip:  # for debug
             pass
         else:
             self.create_in_world()
 
+        if self._merged_line_shapes is not None:
+            self._construct_merged_collision_bodies()
+
         self.lane_line_node_path.flattenStrong()
         self.lane_line_node_path.node().collect()
         self.lane_line_node_path.hide(CamMask.AllOn)
@@ -378,6 +403,12 @@ class BaseBlock(BaseObject, PGDrivableAreaProperty, ABC):
                     np = make_polygon_model(polygon, height)
                     np.reparentTo(self.sidewalk_node_path)
                     np.setPos(0, 0, z_pos)
+                    self._node_path_list.append(np)
+
+                    if self._merged_sidewalk_mesh is not None:
+                        geom = np.node().getGeom(0)
+                        self._merged_sidewalk_mesh.addGeom(geom, True, TransformState.makePos(Vec3(0, 0, z_pos)))
+                        continue
 
                     body_node = BaseRigidBodyNode(None, MetaDriveType.BOUNDARY_SIDEWALK)
                     body_node.setKinematic(False)
@@ -394,7 +425,6 @@ class BaseBlock(BaseObject, PGDrivableAreaProperty, ABC):
                     body_node.addShape(shape)
                     self.dynamic_nodes.append(body_node)
                     body_node.setIntoCollideMask(CollisionGroup.Sidewalk)
-                    self._node_path_list.append(np)
 
     def _construct_crosswalk(self):
         """
@@ -491,6 +521,25 @@ class BaseBlock(BaseObject, PGDrivableAreaProperty, ABC):
             liane_type = MetaDriveType.LINE_BROKEN_SINGLE_WHITE if line_color == PGLineColor.GREY \
                 else MetaDriveType.LINE_BROKEN_SINGLE_YELLOW
 
+        # its scale will change by setScale
+        body_height = PGDrivableAreaProperty.LANE_LINE_GHOST_HEIGHT
+        shape = BulletBoxShape(Vec3(length / 2, PGDrivableAreaProperty.LANE_LINE_WIDTH / 4, body_height))
+        mask = PGDrivableAreaProperty.CONTINUOUS_COLLISION_MASK if line_type != PGLineType.BROKEN \
+            else PGDrivableAreaProperty.BROKEN_COLLISION_MASK
+
+        # position and heading
+        pos = panda_vector(middle, PGDrivableAreaProperty.LANE_LINE_GHOST_HEIGHT / 2)
+        direction_v = end_point - start_point
+        # theta = -numpy.arctan2(direction_v[1], direction_v[0])
+        theta = panda_heading(math.atan2(direction_v[1], direction_v[0]))
+        quat = LQuaternionf(math.cos(theta / 2), 0, 0, math.sin(theta / 2))
+
+        if self._merged_line_shapes is not None:
+            # the shape will be added to the merged body of this line type
+            transform = TransformState.makePosQuatScale(pos, quat, Vec3(1, 1, 1))
+            self._merged_line_shapes.setdefault((liane_type, mask), []).append((shape, transform))
+            return node_path_list
+
         # add bullet body for it
         body_node = BaseGhostBodyNode(None, liane_type)
         body_node.setActive(False)
@@ -500,20 +549,43 @@ class BaseBlock(BaseObject, PGDrivableAreaProperty, ABC):
         node_path_list.append(body_np)
         node_path_list.append(body_node)
 
-        # its scale will change by setScale
-        body_height = PGDrivableAreaProperty.LANE_LINE_GHOST_HEIGHT
-        shape = BulletBoxShape(Vec3(length / 2, PGDrivableAreaProperty.LANE_LINE_WIDTH / 4, body_height))
         body_np.node().addShape(shape)
-        mask = PGDrivableAreaProperty.CONTINUOUS_COLLISION_MASK if line_type != PGLineType.BROKEN \
-            else PGDrivableAreaProperty.BROKEN_COLLISION_MASK
         body_np.node().setIntoCollideMask(mask)
         self.static_nodes.append(body_np.node())
-
-        # position and heading
-        body_np.setPos(panda_vector(middle, PGDrivableAreaProperty.LANE_LINE_GHOST_HEIGHT / 2))
-        direction_v = end_point - start_point
-        # theta = -numpy.arctan2(direction_v[1], direction_v[0])
-        theta = panda_heading(math.atan2(direction_v[1], direction_v[0]))
-        body_np.setQuat(LQuaternionf(math.cos(theta / 2), 0, 0, math.sin(theta / 2)))
+        body_np.setPos(pos)
+        body_np.setQuat(quat)
 
         return node_path_list
+
+    def _construct_merged_collision_bodies(self):
+        """
+        When merge_collision_bodies=True, lane line segments of the same type and collision mask are added to one ghost
+        body as child shapes, and all sidewalk polygons are added to one triangle mesh body. The names and collision
+        masks of bodies are the same as the ones built for each segment or polygon, so contact tests and ray tests see
+        the same types while the physics world contains far fewer bodies
+        """
+        for (line_type, mask), shapes in self._merged_line_shapes.items():
+            body_node = BaseGhostBodyNode(None, line_type)
+            body_node.setActive(False)
+            body_node.setKinematic(False)
+            body_node.setStatic(True)
+            for shape, transform in shapes:
+                body_node.addShape(shape, transform)
+            body_node.setIntoCollideMask(mask)
+            body_np = self.lane_line_node_path.attachNewNode(body_node)
+            self._node_path_list.append(body_np)
+            self._node_path_list.append(body_node)
+            self.static_nodes.append(body_node)
+
+        if self._merged_sidewalk_mesh.getNumTriangles() > 0:
+            body_node = BaseRigidBodyNode(None, MetaDriveType.BOUNDARY_SIDEWALK)
+            body_node.setKinematic(False)
+            body_node.setStatic(True)
+            body_np = self.sidewalk_node_path.attachNewNode(body_node)
+            self._node_path_list.append(body_np)
+            body_node.addShape(BulletTriangleMeshShape(self._merged_sidewalk_mesh, dynamic=False))
+            self.dynamic_nodes.append(body_node)
+            body_node.setIntoCollideMask(CollisionGroup.Sidewalk)
+
+        self._merged_line_shapes = None
+        self._merged_sidewalk_mesh = None
@@ -34,6 +34,10 @@ class BaseMap(BaseRunnable, ABC):
     GENERATE_CONFIG = "config"
     GENERATE_TYPE = "type"
 
+    # rough memory cost of a panda3d node and a Bullet body, used to estimate the memory footprint of a map
+    NODE_BYTES = 512
+    PHYSICS_BODY_BYTES = 2048
+
     # default lane parameter
     MAX_LANE_WIDTH = 4.5
     MIN_LANE_WIDTH = 3.0
@@ -55,6 +59,9 @@ class BaseMap(BaseRunnable, ABC):
         self.crosswalks = {}
         self.sidewalks = {}
 
+        # geometry used to draw the semantic map and height map of the terrain, which is computed once for each map
+        self.terrain_cache = {}
+
         # A flatten representation of blocks, might cause chaos in city-level generation.
         self.blocks = []
 
@@ -103,6 +110,25 @@ class BaseMap(BaseRunnable, ABC):
     def num_blocks(self):
         return len(self.blocks)
 
+    def estimate_memory_size(self):
+        """
+        Roughly estimate the memory footprint of this map in bytes. Node paths and Bullet bodies are counted with fixed
+        costs, while vertex data of geometries and numpy arrays of lanes are counted by their sizes
+        """
+        ret = 0
+        for block in self.blocks:
+            ret += (len(block.static_nodes) + len(block.dynamic_nodes)) * self.PHYSICS_BODY_BYTES
+            ret += block.origin.findAllMatches("**").getNumPaths() * self.NODE_BYTES
+            for geom_np in block.origin.findAllMatches("**/+GeomNode"):
+                geom_node = geom_np.node()
+                for i in range(geom_node.getNumGeoms()):
+                    vertex_data = geom_node.getGeom(i).getVertexData()
+                    for j in range(vertex_data.getNumArrays()):
+                        ret += vertex_data.getArray(j).getDataSizeBytes()
+        for lane in self.road_network.get_all_lanes():
+            ret += sum(v.nbytes for v in vars(lane).values() if isinstance(v, np.ndarray))
+        return ret
+
     def destroy(self):
         self.detach_from_world()
         # if self._semantic_map is not None:
@@ -120,6 +146,7 @@ class BaseMap(BaseRunnable, ABC):
             self.road_network.destroy()
         self.road_network = None
         self.spawn_roads = None
+        self.terrain_cache = {}
 
         if self.lane_coordinates_debug_node is not None:
             self.lane_coordinates_debug_node.removeNode()
@@ -179,33 +206,25 @@ class BaseMap(BaseRunnable, ABC):
     def get_boundary_line_vector(self, interval):
         return {}
 
-    # @time_me
-    def get_semantic_map(
-        self,
-        center_point,
-        size=512,
-        pixels_per_meter=8,
-        color_setting=MapTerrainSemanticColor,
-        line_sample_interval=2,
-        yellow_line_thickness=1,
-        white_line_thickness=1,
-        layer=("lane_line", "lane")
-    ):
+    @staticmethod
+    def _to_pixel_points(points, center_point, pixels_per_meter, size):
         """
-        Get semantics of the map for terrain generation
-        :param center_point: 2D point, the center to select the rectangular region
-        :param size: [m] length and width
-        :param pixels_per_meter: the returned map will be in (size*pixels_per_meter * size*pixels_per_meter) size
-        :param color_setting: color palette for different attribute. When generating terrain, make sure using
-        :param line_sample_interval: [m] It determines the resolution of sampled points.
-        :param polyline_thickness: [m] The width of the road lines
-        :param layer: layer to get
-        MapTerrainAttribute
-        :return: semantic map
+        Convert 2D points in world coordinates to pixel coordinates of a size x size map centered at center_point
         """
-        center_p = center_point
+        points = np.asarray(points, dtype=float)
+        x = (points[:, 0] - center_point[0]) * pixels_per_meter + size / 2
+        y = np.trunc((points[:, 1] - center_point[1]) * pixels_per_meter) + size / 2
+        return np.stack([x, y], axis=-1).astype(np.int32)
+
+    def _get_semantic_elements(self, color_setting, line_sample_interval, layer):
+        """
+        Collect polygons, polylines and crosswalks with their colors in world coordinates for drawing the semantic map.
+        They don't depend on the map region, so they are computed once for each map and setting
+        """
+        key = ("semantic_map", color_setting, line_sample_interval, tuple(layer))
+        if key in self.terrain_cache:
+            return self.terrain_cache[key]
 
-        # if self._semantic_map is None:
         all_lanes = self.get_map_features(interval=line_sample_interval)
         polygons = []
         polylines = []
@@ -213,7 +232,7 @@ class BaseMap(BaseRunnable, ABC):
         points_to_skip = math.floor(PGDrivableAreaProperty.STRIPE_LENGTH * 2 / line_sample_interval)
         for obj in all_lanes.values():
             if MetaDriveType.is_lane(obj["type"]) and "lane" in layer:
-                polygons.append((obj["polygon"], color_setting.get_color(obj["type"])))
+                polygons.append((np.asarray(obj["polygon"]), color_setting.get_color(obj["type"])))
             elif "lane_line" in layer and (MetaDriveType.is_road_line(obj["type"])
                                            or MetaDriveType.is_road_boundary_line(obj["type"])):
                 if MetaDriveType.is_broken_line(obj["type"]):
@@ -221,46 +240,17 @@ class BaseMap(BaseRunnable, ABC):
                         if index + points_to_skip < len(obj["polyline"]):
                             polylines.append(
                                 (
-                                    [obj["polyline"][index],
-                                     obj["polyline"][index + points_to_skip]], color_setting.get_color(obj["type"])
+                                    np.asarray([obj["polyline"][index], obj["polyline"][index + points_to_skip]]),
+                                    color_setting.get_color(obj["type"])
                                 )
                             )
                 else:
-                    polylines.append((obj["polyline"], color_setting.get_color(obj["type"])))
-
-        size = int(size * pixels_per_meter)
-        mask = np.zeros([size, size, 1], dtype=np.uint8)
-        mask[..., 0] = color_setting.get_color(MetaDriveType.GROUND)
-        # create an example bounding box polygon
-        # for idx in range(len(polygons)):
-        for polygon, color in polygons:
-            points = [
-                [
-                    int((x - center_p[0]) * pixels_per_meter + size / 2),
-                    int((y - center_p[1]) * pixels_per_meter) + size / 2
-                ] for x, y in polygon
-            ]
-            cv2.fillPoly(mask, np.array([points]).astype(np.int32), color=color)
-        for line, color in polylines:
-            points = [
-                [
-                    int((p[0] - center_p[0]) * pixels_per_meter + size / 2),
-                    int((p[1] - center_p[1]) * pixels_per_meter) + size / 2
-                ] for p in line
-            ]
-            thickness = yellow_line_thickness if color == MapTerrainSemanticColor.YELLOW else white_line_thickness
-            # thickness = min(thickness, 2)  # clip
-            cv2.polylines(mask, np.array([points]).astype(np.int32), False, color, thickness)
+                    polylines.append((np.asarray(obj["polyline"]), color_setting.get_color(obj["type"])))
 
+        crosswalks = []
         if "crosswalk" in layer:
             for id, sidewalk in self.crosswalks.items():
                 polygon = sidewalk["polygon"]
-                points = [
-                    [
-                        int((x - center_p[0]) * pixels_per_meter + size / 2),
-                        int((y - center_p[1]) * pixels_per_meter) + size / 2
-                    ] for x, y in polygon
-                ]
                 # edges = find_longest_parallel_edges(polygon)
                 # p_1, p_2 = edges[0]
                 p_1, p_2 = find_longest_edge(polygon)[0]
@@ -271,10 +261,57 @@ class BaseMap(BaseRunnable, ABC):
                 # 0-2pi
                 angle = np.arctan2(*dir) / np.pi * 180 + 180
                 angle = int(angle / 2) + color_setting.get_color(MetaDriveType.CROSSWALK)
-                cv2.fillPoly(mask, np.array([points]).astype(np.int32), color=angle)
+                crosswalks.append((np.asarray(polygon), angle))
+
+        self.terrain_cache[key] = (polygons, polylines, crosswalks)
+        return self.terrain_cache[key]
+
+    # @time_me
+    def get_semantic_map(
+        self,
+        center_point,
+        size=512,
+        pixels_per_meter=8,
+        color_setting=MapTerrainSemanticColor,
+        line_sample_interval=2,
+        yellow_line_thickness=1,
+        white_line_thickness=1,
+        layer=("lane_line", "lane")
+    ):
+        """
+        Get semantics of the map for terrain generation
+        :param center_point: 2D point, the center to select the rectangular region
+        :param size: [m] length and width
+        :param pixels_per_meter: the returned map will be in (size*pixels_per_meter * size*pixels_per_meter) size
+        :param color_setting: color palette for different attribute. When generating terrain, make sure using
+        :param line_sample_interval: [m] It determines the resolution of sampled points.
+        :param polyline_thickness: [m] The width of the road lines
+        :param layer: layer to get
+        MapTerrainAttribute
+        :return: semantic map
+        """
+        center_p = center_point
+        polygons, polylines, crosswalks = self._get_semantic_elements(color_setting, line_sample_interval, layer)
 
-        #     self._semantic_map = mask
-        # return self._semantic_map
+        size = int(size * pixels_per_meter)
+        mask = np.zeros([size, size, 1], dtype=np.uint8)
+        mask[..., 0] = color_setting.get_color(MetaDriveType.GROUND)
+        # overlapped polygons can't be filled in one call, otherwise the overlapped region is not filled
+        for polygon, color in polygons:
+            cv2.fillPoly(mask, [self._to_pixel_points(polygon, center_p, pixels_per_meter, size)], color=color)
+
+        # consecutive lines with the same color and thickness are drawn in one call
+        lines_to_draw = []
+        for i, (line, color) in enumerate(polylines):
+            lines_to_draw.append(self._to_pixel_points(line, center_p, pixels_per_meter, size))
+            if i + 1 == len(polylines) or polylines[i + 1][1] != color:
+                thickness = yellow_line_thickness if color == MapTerrainSemanticColor.YELLOW else white_line_thickness
+                # thickness = min(thickness, 2)  # clip
+                cv2.polylines(mask, lines_to_draw, False, color, thickness)
+                lines_to_draw = []
+
+        for polygon, angle in crosswalks:
+            cv2.fillPoly(mask, [self._to_pixel_points(polygon, center_p, pixels_per_meter, size)], color=angle)
         return mask
 
     # @time_me
@@ -297,31 +334,25 @@ class BaseMap(BaseRunnable, ABC):
         """
         center_p = center_point
 
-        # if self._height_map is None:
         extension = max(1, extension)
-        all_lanes = self.get_map_features()
-        polygons = []
-
-        for obj in all_lanes.values():
-            if MetaDriveType.is_lane(obj["type"]):
-                polygons.append(obj["polygon"])
+        if "height_map" not in self.terrain_cache:
+            all_lanes = self.get_map_features()
+            polygons = []
+            for obj in all_lanes.values():
+                if MetaDriveType.is_lane(obj["type"]):
+                    polygons.append(np.asarray(obj["polygon"]))
+            for sidewalk in self.sidewalks.values():
+                polygons.append(np.asarray(sidewalk["polygon"]))
+            self.terrain_cache["height_map"] = polygons
+        polygons = self.terrain_cache["height_map"]
 
         size = int(size * pixels_per_meter)
         mask = np.zeros([size, size, 1])
 
         need_scale = abs(extension - 1) > 1e-1
 
-        for sidewalk in self.sidewalks.values():
-            polygons.append(sidewalk["polygon"])
-
         for polygon in polygons:
-            points = [
-                [
-                    int((x - center_p[0]) * pixels_per_meter + size / 2),
-                    int((y - center_p[1]) * pixels_per_meter) + size / 2
-                ] for x, y in polygon
-            ]
-            cv2.fillPoly(mask, np.asarray([points]).astype(np.int32), color=[height])
+            cv2.fillPoly(mask, [self._to_pixel_points(polygon, center_p, pixels_per_meter, size)], color=[height])
         if need_scale:
             # Define a kernel. A 3x3 rectangle kernel
             kernel = np.ones(((extension + 1) * pixels_per_meter, (extension + 1) * pixels_per_meter), np.uint8)
@@ -329,8 +360,6 @@ class BaseMap(BaseRunnable, ABC):
             # Apply dilation
             mask = cv2.dilate(mask, kernel, iterations=1)
             mask = np.expand_dims(mask, axis=-1)
-        #     self._height_map = mask
-        # return self._height_map
         return mask
 
     def show_bounding_box(self):
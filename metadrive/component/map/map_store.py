@@ -0,0 +1,121 @@
+from collections import OrderedDict
+
+
+class MapStore:
+    """
+    Maps kept by a map manager, keyed by seed or scenario index. It works like a dict mapping every key to the stored
+    map or None, so maps can be reused across episodes instead of being built again.
+
+    A budget can be set by the number of maps and/or the estimated bytes of maps (see BaseMap.estimate_memory_size()).
+    When storing a map exceeds the budget, least recently used maps are destroyed, except the newly stored one. Sizes of
+    maps are only estimated when storing them if max_bytes is set, otherwise they are estimated in get_stats().
+    Call get() to fetch a map and count hits and misses, while indexing only peeks at the store.
+    """
+    def __init__(self, keys, max_num=None, max_bytes=None):
+        """
+        :param keys: all seeds or scenario indices of maps
+        :param max_num: the max number of stored maps, no limit if None
+        :param max_bytes: the max estimated bytes of stored maps, no limit if None
+        """
+        assert max_num is None or max_num > 0, "The max number of stored maps should be positive"
+        self._keys = dict.fromkeys(keys)
+        self.max_num = max_num
+        self.max_bytes = max_bytes
+
+        # in the order of use, the least recently used map is the first one
+        self._maps = OrderedDict()
+        # only tracked if max_bytes is set
+        self._map_bytes = {}
+        self.stored_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Return the stored map and mark it as recently used, or None if it is not stored
+        """
+        if key in self._maps:
+            self.hits += 1
+            self._maps.move_to_end(key)
+            return self._maps[key]
+        self.misses += 1
+        return None
+
+    def __getitem__(self, key):
+        if key not in self._maps:
+            if key not in self._keys:
+                raise KeyError(key)
+            return None
+        return self._maps[key]
+
+    def __setitem__(self, key, map):
+        self._keys.setdefault(key)
+        if key in self._maps:
+            self._remove(key)
+        if map is None:
+            return
+        self._maps[key] = map
+        if self.max_bytes is not None:
+            self._map_bytes[key] = map.estimate_memory_size()
+            self.stored_bytes += self._map_bytes[key]
+        while len(self._maps) > 1 and self._exceed_budget():
+            evicted_key = next(iter(self._maps))
+            evicted_map = self._remove(evicted_key)
+            evicted_map.detach_from_world()
+            evicted_map.destroy()
+            self.evictions += 1
+
+    def _exceed_budget(self):
+        return (self.max_num is not None and len(self._maps) > self.max_num) or \
+               (self.max_bytes is not None and self.stored_bytes > self.max_bytes)
+
+    def _remove(self, key):
+        self.stored_bytes -= self._map_bytes.pop(key, 0)
+        return self._maps.pop(key)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def keys(self):
+        return list(self._keys)
+
+    def values(self):
+        return [self[key] for key in self._keys]
+
+    def items(self):
+        return [(key, self[key]) for key in self._keys]
+
+    @property
+    def num_stored_maps(self):
+        return len(self._maps)
+
+    def get_stats(self):
+        stored_bytes = self.stored_bytes
+        if self.max_bytes is None:
+            stored_bytes = sum(map.estimate_memory_size() for map in self._maps.values())
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            num_stored_maps=self.num_stored_maps,
+            stored_bytes=stored_bytes
+        )
+
+    def clear(self):
+        """
+        Destroy all stored maps. Counters are kept
+        """
+        for map in self._maps.values():
+            map.detach_from_world()
+            map.destroy()
+        self._maps.clear()
+        self._map_bytes.clear()
+        self.stored_bytes = 0
@@ -108,16 +108,23 @@ class PGMap(BaseMap):
     def road_network_type(self):
         return NodeRoadNetwork
 
-    def get_meta_data(self):
-        assert self.blocks is not None and len(self.blocks) > 0, "Please generate Map before saving it"
-        map_config = []
-        for b in self.blocks:
-            b_config = b.get_config()
+    @classmethod
+    def get_block_sequence(cls, blocks):
+        """
+        Serialize blocks to a list of block configs, from which the map can be created by MapGenerateMethod.PG_MAP_FILE
+        """
+        block_sequence = []
+        for b in blocks:
+            b_config = b.get_config(copy=False).frozen()
             json_config = b_config.get_serializable_dict()
-            json_config[self.BLOCK_ID] = b.ID
-            json_config[self.PRE_BLOCK_SOCKET_INDEX] = b.pre_block_socket_index
-            map_config.append(json_config)
+            json_config[cls.BLOCK_ID] = b.ID
+            json_config[cls.PRE_BLOCK_SOCKET_INDEX] = b.pre_block_socket_index
+            block_sequence.append(json_config)
+        return block_sequence
 
+    def get_meta_data(self):
+        assert self.blocks is not None and len(self.blocks) > 0, "Please generate Map before saving it"
+        map_config = self.get_block_sequence(self.blocks)
         saved_data = copy.deepcopy({self.BLOCK_SEQUENCE: map_config, "map_config": self.config.copy()})
         saved_data.update(super(PGMap, self).get_meta_data())
         return saved_data
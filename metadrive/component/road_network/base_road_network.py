@@ -51,6 +51,12 @@ class BaseRoadNetwork:
     def get_closest_lane_index(self, position, return_all=False):
         raise NotImplementedError
 
+    def get_k_closest_lane_indices(self, position, k):
+        """
+        Return a list of (distance, lane_index) of the k closest lanes in L1 distance, sorted by distance
+        """
+        raise NotImplementedError
+
     def shortest_path(self, start: str, goal: str) -> List[str]:
         """
         Breadth-first search of shortest checkpoints from start to goal.
@@ -4,6 +4,7 @@ from typing import List
 
 from metadrive.component.road_network.base_road_network import BaseRoadNetwork
 from metadrive.component.road_network.base_road_network import LaneIndex
+from metadrive.component.road_network.lane_spatial_index import LaneSpatialIndex
 from metadrive.scenario.scenario_description import ScenarioDescription as SD
 from metadrive.utils.math import get_boxes_bounding_box
 from metadrive.utils.pg.utils import get_lanes_bounding_box
@@ -19,9 +20,28 @@ class EdgeRoadNetwork(BaseRoadNetwork):
     def __init__(self):
         super(EdgeRoadNetwork, self).__init__()
         self.graph = {}
+        self._spatial_index = None
+
+    def after_init(self):
+        """
+        Build the spatial index for lane localization. It is called automatically when querying the closest lanes
+        """
+        self._spatial_index = LaneSpatialIndex([(id, lane_info.lane) for id, lane_info in self.graph.items()])
+
+    def get_closest_lane_index(self, position, return_all=False):
+        if return_all:
+            return self.get_k_closest_lane_indices(position, len(self.graph))
+        distance, index = self.get_k_closest_lane_indices(position, 1)[0]
+        return index, distance
+
+    def get_k_closest_lane_indices(self, position, k):
+        if self._spatial_index is None:
+            self.after_init()
+        return self._spatial_index.query(position, k)
 
     def add_lane(self, lane) -> None:
         assert lane.index is not None, "Lane index can not be None"
+        self._spatial_index = None
         self.graph[lane.index] = lane_info(
             lane=lane,
             entry_lanes=lane.entry_lanes or [],
@@ -34,11 +54,13 @@ class EdgeRoadNetwork(BaseRoadNetwork):
         return self.graph[index].lane
 
     def __isub__(self, other):
+        self._spatial_index = None
         for id, lane_info in other.graph.items():
             self.graph.pop(id)
         return self
 
     def add(self, other, no_intersect=True):
+        self._spatial_index = None
         for id, lane_info in other.graph.items():
             if no_intersect:
                 assert id not in self.graph.keys(), "Intersect: {} exists in two network".format(id)
@@ -102,6 +124,9 @@ class EdgeRoadNetwork(BaseRoadNetwork):
 
         """
         super(EdgeRoadNetwork, self).destroy()
+        if self._spatial_index is not None:
+            self._spatial_index.destroy()
+            self._spatial_index = None
         if self.graph is not None:
             for k, v in self.graph.items():
                 v.lane.destroy()
@@ -142,6 +167,7 @@ class EdgeRoadNetwork(BaseRoadNetwork):
 class OpenDriveRoadNetwork(EdgeRoadNetwork):
     def add_lane(self, lane) -> None:
         assert lane.index is not None, "Lane index can not be None"
+        self._spatial_index = None
         self.graph[lane.index] = lane_info(
             lane=lane, entry_lanes=None, exit_lanes=None, left_lanes=None, right_lanes=None
         )
@@ -0,0 +1,105 @@
+import math
+from collections import defaultdict
+
+import numpy as np
+
+
+class LaneSpatialIndex:
+    """
+    A uniform grid over lane center line segments, used to find the closest lanes to a position without computing the
+    distance to every lane in the road network. Each lane is registered to all grid cells overlapped by the bounding
+    boxes of its center line segments. When querying, cells are visited ring by ring around the position and the exact
+    lane.distance() is only computed for lanes found in these cells. The search stops when no unvisited lane can be
+    closer than the k-th closest lane found. Lanes are pruned by the Euclidean distance to their center lines, which
+    bounds lane.distance() from below for StraightLane/CircularLane and for PointLane with smooth center lines.
+    """
+    CELL_SIZE = 10
+    POLYLINE_INTERVAL = 2
+    # The polyline is a chord approximation of the center line. Extend segment boxes to make the search exact
+    MARGIN = 1
+
+    def __init__(self, lanes, cell_size=None):
+        """
+        :param lanes: a list of (lane_index, lane)
+        :param cell_size: size of the grid cell, unit: [m]
+        """
+        self.cell_size = cell_size or self.CELL_SIZE
+        self.lane_indices = []
+        self.lanes = []
+        self.grid = defaultdict(list)
+        self.min_cell = None
+        self.max_cell = None
+        cell_min_list = []
+        cell_max_list = []
+        for lane_id, (lane_index, lane) in enumerate(lanes):
+            self.lane_indices.append(lane_index)
+            self.lanes.append(lane)
+            polyline = np.asarray(lane.get_polyline(self.POLYLINE_INTERVAL))[..., :2]
+            if len(polyline) == 1:
+                polyline = np.concatenate([polyline, polyline])
+            seg_min = np.minimum(polyline[:-1], polyline[1:]) - self.MARGIN
+            seg_max = np.maximum(polyline[:-1], polyline[1:]) + self.MARGIN
+            cell_min = np.floor(seg_min / self.cell_size).astype(int)
+            cell_max = np.floor(seg_max / self.cell_size).astype(int)
+            cells = set()
+            for (x_min, y_min), (x_max, y_max) in zip(cell_min.tolist(), cell_max.tolist()):
+                for x in range(x_min, x_max + 1):
+                    for y in range(y_min, y_max + 1):
+                        cells.add((x, y))
+            for cell in cells:
+                self.grid[cell].append(lane_id)
+            cell_min_list.append(cell_min.min(axis=0))
+            cell_max_list.append(cell_max.max(axis=0))
+        if len(self.lanes) > 0:
+            self.min_cell = np.min(cell_min_list, axis=0).tolist()
+            self.max_cell = np.max(cell_max_list, axis=0).tolist()
+
+    def __len__(self):
+        return len(self.lanes)
+
+    def query(self, position, k=1):
+        """
+        Find the k closest lanes to a position in L1 distance, which is computed by lane.distance()
+        :param position: 2D position
+        :param k: the number of lanes to return
+        :return: a list of (distance, lane_index) sorted by distance. Its length is min(k, number of lanes)
+        """
+        if len(self.lanes) == 0:
+            return []
+        k = min(k, len(self.lanes))
+        cx = math.floor(position[0] / self.cell_size)
+        cy = math.floor(position[1] / self.cell_size)
+        # rings beyond this one contain no lanes
+        max_ring = max(cx - self.min_cell[0], self.max_cell[0] - cx, cy - self.min_cell[1], self.max_cell[1] - cy, 0)
+        visited = set()
+        candidates = []
+        for ring in range(max_ring + 1):
+            for cell in self._ring_cells(cx, cy, ring):
+                for lane_id in self.grid.get(cell, ()):
+                    if lane_id not in visited:
+                        visited.add(lane_id)
+                        candidates.append((self.lanes[lane_id].distance(position), lane_id))
+            # unvisited lanes are at least ring * cell_size away from the position
+            if len(candidates) >= k:
+                candidates.sort()
+                if candidates[k - 1][0] <= ring * self.cell_size:
+                    break
+        candidates.sort()
+        return [(dist, self.lane_indices[lane_id]) for dist, lane_id in candidates[:k]]
+
+    @staticmethod
+    def _ring_cells(cx, cy, ring):
+        if ring == 0:
+            yield cx, cy
+            return
+        for x in range(cx - ring, cx + ring + 1):
+            yield x, cy - ring
+            yield x, cy + ring
+        for y in range(cy - ring + 1, cy + ring):
+            yield cx - ring, y
+            yield cx + ring, y
+
+    def destroy(self):
+        self.lanes = None
+        self.lane_indices = None
+        self.grid = None
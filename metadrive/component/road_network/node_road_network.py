@@ -5,6 +5,7 @@ from typing import List, Tuple, Dict
 
 from metadrive.component.lane.abs_lane import AbstractLane
 from metadrive.component.road_network.base_road_network import BaseRoadNetwork
+from metadrive.component.road_network.lane_spatial_index import LaneSpatialIndex
 from metadrive.component.road_network.road import Road
 from metadrive.constants import Decoration
 from metadrive.utils.math import get_boxes_bounding_box
@@ -20,8 +21,23 @@ class GraphLookupTable:
     def __init__(self, graph, debug):
         self.graph = graph
         self.debug = debug
+        lanes = []
+        for _from, to_dict in self.graph.items():
+            for _to, lanes_on_road in to_dict.items():
+                for _id, lane in enumerate(lanes_on_road):
+                    lanes.append(((_from, _to, _id), lane))
+        self.spatial_index = LaneSpatialIndex(lanes)
 
     def get(self, position, return_all):
+        if not return_all:
+            distance, index = self.spatial_index.query(position, k=1)[0]
+            return index, distance
+        return self._get_all(position)
+
+    def _get_all(self, position):
+        """
+        Compute the distance to all lanes and sort them
+        """
         log = dict()
         count = 0
         for _, (_from, to_dict) in enumerate(self.graph.items()):
@@ -56,13 +72,17 @@ class GraphLookupTable:
                 distance_index_mapping.append((dist, (Decoration.start, Decoration.end, id)))
 
         distance_index_mapping = sorted(distance_index_mapping, key=lambda d: d[0])
-        if return_all:
-            return distance_index_mapping
-        else:
-            ret_ind = 0
-            index = distance_index_mapping[ret_ind][1]
-            distance = distance_index_mapping[ret_ind][0]
-            return index, distance
+        return distance_index_mapping
+
+    def get_k_closest(self, position, k):
+        """
+        Return a list of (distance, lane_index) of the k closest lanes
+        """
+        return self.spatial_index.query(position, k)
+
+    def destroy(self):
+        self.spatial_index.destroy()
+        self.graph = None
 
 
 class NodeRoadNetwork(BaseRoadNetwork):
@@ -79,6 +99,8 @@ class NodeRoadNetwork(BaseRoadNetwork):
         self._graph_helper = None
         self.debug = debug
         self.is_initialized = False
+        # (from, to) -> (lanes, bounding box), used when checking if a new lane overlaps the network
+        self.road_bounding_boxes = {}
 
     def after_init(self):
         assert not self.is_initialized
@@ -239,6 +261,9 @@ class NodeRoadNetwork(BaseRoadNetwork):
     def get_closest_lane_index(self, position, return_all=False):
         return self._graph_helper.get(position, return_all)
 
+    def get_k_closest_lane_indices(self, position, k):
+        return self._graph_helper.get_k_closest(position, k)
+
     def bfs_paths(self, start: str, goal: str) -> List[List[str]]:
         """
         Breadth-first search of all routes from start to goal.
@@ -340,6 +365,9 @@ class NodeRoadNetwork(BaseRoadNetwork):
 
         """
         super(NodeRoadNetwork, self).destroy()
+        if self._graph_helper is not None:
+            self._graph_helper.destroy()
+            self._graph_helper = None
         if self.graph is not None:
             for from_, _to_dict in self.graph.items():
                 for _to, lanes in _to_dict.items():
@@ -0,0 +1,140 @@
+import numpy as np
+from panda3d.bullet import BulletBoxShape, BulletCylinderShape
+from panda3d.core import LVecBase4
+
+from metadrive.component.sensors.lidar import Lidar
+
+
+def ray_box_hit_distances(start, directions, centers, headings, half_extents):
+    """
+    Intersect rays sharing one start point with oriented 2D boxes using the slab method.
+    :param start: ray start point in shape [2]
+    :param directions: unit direction of each ray in shape [num_rays, 2]
+    :param centers: box centers in shape [num_boxes, 2]
+    :param headings: rotation of box local x-axis in shape [num_boxes], unit [rad]
+    :param half_extents: half size along box local x and y axis in shape [num_boxes, 2]
+    :return: distance to the first hit in shape [num_rays, num_boxes], inf if the ray doesn't hit the box. The distance
+    is 0 if the start point is inside the box
+    """
+    cos, sin = np.cos(headings), np.sin(headings)
+    diff = np.asarray(start)[None, :] - centers
+    # start point and ray directions in box local frames
+    local_start_x = diff[:, 0] * cos + diff[:, 1] * sin
+    local_start_y = -diff[:, 0] * sin + diff[:, 1] * cos
+    local_dir_x = directions[:, 0:1] * cos + directions[:, 1:2] * sin
+    local_dir_y = -directions[:, 0:1] * sin + directions[:, 1:2] * cos
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t1_x = (-half_extents[:, 0] - local_start_x) / local_dir_x
+        t2_x = (half_extents[:, 0] - local_start_x) / local_dir_x
+        t1_y = (-half_extents[:, 1] - local_start_y) / local_dir_y
+        t2_y = (half_extents[:, 1] - local_start_y) / local_dir_y
+        t_near = np.maximum(np.minimum(t1_x, t2_x), np.minimum(t1_y, t2_y))
+        t_far = np.minimum(np.maximum(t1_x, t2_x), np.maximum(t1_y, t2_y))
+        hit = np.logical_and(t_far >= t_near, t_far >= 0)
+    return np.where(hit, np.maximum(t_near, 0.0), np.inf)
+
+
+def ray_circle_hit_distances(start, directions, centers, radius):
+    """
+    Intersect rays sharing one start point with 2D circles.
+    :param start: ray start point in shape [2]
+    :param directions: unit direction of each ray in shape [num_rays, 2]
+    :param centers: circle centers in shape [num_circles, 2]
+    :param radius: radius of each circle in shape [num_circles]
+    :return: distance to the first hit in shape [num_rays, num_circles], inf if the ray doesn't hit the circle. The
+    distance is 0 if the start point is inside the circle
+    """
+    diff = np.asarray(start)[None, :] - centers
+    b = directions @ diff.T
+    c = np.sum(diff**2, axis=-1) - radius**2
+    disc = b**2 - c
+    with np.errstate(invalid="ignore"):
+        sqrt_disc = np.sqrt(disc)
+    t_near = -b - sqrt_disc
+    t_far = -b + sqrt_disc
+    hit = np.logical_and(disc >= 0, t_far >= 0)
+    return np.where(hit, np.maximum(t_near, 0.0), np.inf)
+
+
+class AnalyticLidar(Lidar):
+    """
+    A Lidar computing the cloud points analytically in 2D with NumPy instead of casting rays in the Bullet world.
+    Objects found by the broad phase detector are represented by their collision shapes: box shapes are treated as
+    oriented boxes and cylinder shapes as circles. Objects whose vertical extent doesn't cover the lidar height are
+    skipped, which is the same as what rays in the physics world do. Only objects with a physics body can be detected,
+    so static geometry without object like lane lines should be detected by SideDetector or LaneLineDetector.
+    Use it by: config["sensors"]["lidar"] = (AnalyticLidar, )
+    """
+    def perceive(
+        self,
+        base_vehicle,
+        physics_world,
+        num_lasers,
+        distance,
+        height=None,
+        detector_mask: np.ndarray = None,
+        show=False
+    ):
+        height = height or self.DEFAULT_HEIGHT
+        objs = self.get_surrounding_objects(base_vehicle, int(distance))
+        start = np.asarray(base_vehicle.position, dtype=float)
+        angles = self._get_lidar_range(num_lasers, self.start_phase_offset) + base_vehicle.heading_theta
+        directions = np.stack([np.cos(angles), np.sin(angles)], axis=1)
+
+        boxes, circles = self._get_collision_shapes(objs, height)
+        hit_distances = np.full((num_lasers, ), np.inf)
+        if len(boxes) > 0:
+            centers, headings, half_extents = (np.asarray(v, dtype=float) for v in zip(*boxes))
+            dist = ray_box_hit_distances(start, directions, centers, headings, half_extents)
+            hit_distances = np.minimum(hit_distances, dist.min(axis=1))
+        if len(circles) > 0:
+            centers, radius = (np.asarray(v, dtype=float) for v in zip(*circles))
+            dist = ray_circle_hit_distances(start, directions, centers, radius)
+            hit_distances = np.minimum(hit_distances, dist.min(axis=1))
+        cloud_points = np.minimum(hit_distances / distance, 1.0)
+
+        if show and self.cloud_points_vis is not None:
+            self._draw_cloud_points(start, directions, cloud_points * distance, height)
+        return cloud_points.tolist(), objs
+
+    def _get_collision_shapes(self, objs, height):
+        """
+        Collect the 2D collision shapes intersecting the lidar plane
+        :return: boxes as a list of (center, heading, half_extents) and circles as a list of (center, radius)
+        """
+        boxes = []
+        circles = []
+        for obj in objs:
+            node = obj.origin.node()
+            if not hasattr(node, "getNumShapes") or (node.getIntoCollideMask() & self.mask).isZero():
+                continue
+            heading = np.deg2rad(obj.origin.getH())
+            cos, sin = np.cos(heading), np.sin(heading)
+            pos = obj.origin.getPos()
+            for i in range(node.getNumShapes()):
+                shape = node.getShape(i)
+                if not isinstance(shape, (BulletBoxShape, BulletCylinderShape)):
+                    continue
+                offset = node.getShapePos(i)
+                half_extents = shape.getHalfExtentsWithMargin()
+                z = pos[2] + offset[2]
+                if not z - half_extents[2] <= height <= z + half_extents[2]:
+                    continue
+                center = (pos[0] + offset[0] * cos - offset[1] * sin, pos[1] + offset[0] * sin + offset[1] * cos)
+                if isinstance(shape, BulletBoxShape):
+                    boxes.append((center, heading, (half_extents[0], half_extents[1])))
+                else:
+                    circles.append((center, shape.getRadius()))
+        return boxes, circles
+
+    def _draw_cloud_points(self, start, directions, hit_distances, height):
+        num_lasers = len(directions)
+        ends = start[None, :] + directions * hit_distances[:, None]
+        factors = np.arange(num_lasers) / num_lasers if self.ANGLE_FACTOR else np.ones((num_lasers, ))
+        factors = factors * 0.9 + 0.1
+        points = [(x, y, height) for x, y in ends.tolist()]
+        colors = [LVecBase4(*(f * c for c in self.MARK_COLOR), 1) for f in factors.tolist()]
+        if self._current_frame != self.engine.episode_step:
+            self.cloud_points_vis.reset()
+        self._current_frame = self.engine.episode_step
+        self.cloud_points_vis.draw_lines([points + points[:1]], [colors])
@@ -85,6 +85,97 @@ def perceive(
     return cloud_points, detected_objects, colors
 
 
+def get_laser_ends(lidar_range, perceive_distance, heading_theta, vehicle_position_x, vehicle_position_y):
+    """
+    Vectorized version of get_laser_end. Compute the end points of all lasers at once
+    :return: laser ends in shape [num_lasers, 2]
+    """
+    angles = lidar_range + heading_theta
+    ends = np.empty((len(angles), 2), dtype=float)
+    ends[:, 0] = perceive_distance * np.cos(angles) + vehicle_position_x
+    ends[:, 1] = perceive_distance * np.sin(angles) + vehicle_position_y
+    return ends
+
+
+def batch_ray_test(physics_world, start_position, laser_ends, mask, extra_filter_node):
+    """
+    Cast a batch of rays from the same start position. Rays whose closest hit is a node in extra_filter_node will
+    fall back to rayTestAll and take the closest hit which is not filtered.
+    :param physics_world: BulletWorld to query
+    :param start_position: (x, y, z) start of all rays
+    :param laser_ends: array in shape [num_rays, 3], the end of each ray
+    :param mask: collision mask
+    :param extra_filter_node: a set of nodes to ignore, usually the dynamic nodes of ego vehicle
+    :return: hit_fractions [num_rays], hit_nodes [num_rays], hit_positions [num_rays, 3], results [num_rays]. The
+    results are BulletRayHit objects or None if nothing is hit
+    """
+    num_rays = len(laser_ends)
+    hit_fractions = np.ones((num_rays, ), dtype=float)
+    hit_positions = np.array(laser_ends, dtype=float)
+    hit_nodes = [None] * num_rays
+    results = [None] * num_rays
+    ray_test_closest = physics_world.rayTestClosest
+    ray_test_all = physics_world.rayTestAll
+    for i, laser_end in enumerate(hit_positions.tolist()):
+        result = ray_test_closest(start_position, laser_end, mask)
+        node = result.getNode()
+        if node in extra_filter_node:
+            # Fall back to all tests. min() keeps the first hit among equal fractions, the same as a stable sort
+            hits = [
+                hit for hit in ray_test_all(start_position, laser_end, mask).getHits()
+                if hit.getNode() not in extra_filter_node
+            ]
+            if not hits:
+                continue
+            result = min(hits, key=lambda ret: ret.getHitFraction())
+            node = result.getNode()
+        elif not result.hasHit():
+            hit_fractions[i] = result.getHitFraction()
+            continue
+        hit_fractions[i] = result.getHitFraction()
+        hit_positions[i] = result.getHitPos()
+        hit_nodes[i] = node
+        results[i] = result
+    return hit_fractions, hit_nodes, hit_positions, results
+
+
+def batch_perceive(
+    cloud_points, detector_mask, mask, lidar_range, perceive_distance, heading_theta, vehicle_position_x,
+    vehicle_position_y, num_lasers, height, physics_world, extra_filter_node, require_colors, ANGLE_FACTOR, MARK_COLOR0,
+    MARK_COLOR1, MARK_COLOR2
+):
+    """
+    The same as perceive(), but laser ends are computed for all lasers at once and ray tests are issued in one batch
+    """
+    cloud_points.fill(1.0)
+    laser_ends = np.empty((num_lasers, 3), dtype=float)
+    laser_ends[:, :2] = get_laser_ends(
+        lidar_range, perceive_distance, heading_theta, vehicle_position_x, vehicle_position_y
+    )
+    laser_ends[:, 2] = height
+    if detector_mask is not None:
+        active = np.flatnonzero(detector_mask)
+    else:
+        active = np.arange(num_lasers)
+
+    hit_fractions, hit_nodes, hit_positions, results = batch_ray_test(
+        physics_world, panda_vector(vehicle_position_x, vehicle_position_y, height), laser_ends[active], mask,
+        extra_filter_node
+    )
+    cloud_points[active] = hit_fractions
+    detected_objects = [result for result, node in zip(results, hit_nodes) if node]
+
+    colors = []
+    if require_colors:
+        # the hit position is only used for visualization, so the height is aligned to the laser ends
+        laser_ends[active, :2] = hit_positions[:, :2]
+        factors = np.arange(num_lasers) / num_lasers if ANGLE_FACTOR else np.ones((num_lasers, ))
+        factors = factors * 0.9 + 0.1
+        for laser_index, (point, f) in enumerate(zip(laser_ends.tolist(), factors.tolist())):
+            colors.append((laser_index, tuple(point), (f * MARK_COLOR0, f * MARK_COLOR1, f * MARK_COLOR2)))
+    return cloud_points, detected_objects, colors
+
+
 class DistanceDetector(BaseSensor):
     """
     It is a module like lidar, used to detect sidewalk/center line or other static things
@@ -113,6 +204,8 @@ class DistanceDetector(BaseSensor):
         ) if AssetLoader.loader is not None else None
         self.logger.debug("Load Vehicle Module: {}".format(self.__class__.__name__))
         self._current_frame = None
+        # cast all lasers in one batch instead of one by one
+        self.batch_ray_test = engine.global_config.get("batch_ray_test", False)
 
     def perceive(
         self,
@@ -129,7 +222,8 @@ class DistanceDetector(BaseSensor):
         vehicle_position = base_vehicle.position
         heading_theta = base_vehicle.heading_theta
         assert not isinstance(detector_mask, str), "Please specify detector_mask either with None or a numpy array."
-        cloud_points, detected_objects, colors = perceive(
+        perceive_func = batch_perceive if self.batch_ray_test else perceive
+        cloud_points, detected_objects, colors = perceive_func(
             cloud_points=np.ones((num_lasers, ), dtype=float),
             detector_mask=detector_mask.astype(dtype=np.uint8) if detector_mask is not None else None,
             mask=self.mask,
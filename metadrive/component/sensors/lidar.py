@@ -71,6 +71,78 @@ class Lidar(DistanceDetector):
             show=show
         )[0], detected_objects
 
+    def perceive_batch(self, vehicles, physics_world, num_lasers, distance, height=None, show=False):
+        """
+        The same as calling perceive() for each vehicle, but the lidar masks of all vehicles are computed together
+        :return: a list of cloud points and a list of detected objects, one for each vehicle
+        """
+        detected_objects = [self.get_surrounding_objects(vehicle, int(distance)) for vehicle in vehicles]
+        if self.enable_mask:
+            lidar_masks = self.get_lidar_masks(vehicles, detected_objects, num_lasers)
+        else:
+            lidar_masks = [None] * len(vehicles)
+        cloud_points = [
+            super(Lidar, self).perceive(
+                vehicle,
+                physics_world,
+                distance=distance,
+                height=height,
+                num_lasers=num_lasers,
+                detector_mask=lidar_mask,
+                show=show
+            )[0] for vehicle, lidar_mask in zip(vehicles, lidar_masks)
+        ]
+        return cloud_points, detected_objects
+
+    def get_lidar_masks(self, vehicles, detected_objects, num_lasers):
+        """
+        Vectorized _get_lidar_mask() for a batch of vehicles. The angle ranges covered by all (vehicle, surrounding
+        object) pairs are computed at once
+        :param vehicles: a list of vehicles
+        :param detected_objects: the surrounding objects of each vehicle, see get_surrounding_objects()
+        :param num_lasers: number of lasers
+        :return: masks in shape [len(vehicles), num_lasers]
+        """
+        masks = np.zeros((len(vehicles), num_lasers), dtype=bool)
+        pair_index, ego_states, obj_states = [], [], []
+        for i, (vehicle, objs) in enumerate(zip(vehicles, detected_objects)):
+            if len(objs) == 0:
+                continue
+            pos1 = vehicle.position
+            ego_state = (pos1[0], pos1[1], vehicle.heading_theta)
+            for obj in objs:
+                pos2 = obj.position
+                length = obj.LENGTH if hasattr(obj, "LENGTH") else vehicle.LENGTH
+                width = obj.WIDTH if hasattr(obj, "WIDTH") else vehicle.WIDTH
+                pair_index.append(i)
+                ego_states.append(ego_state)
+                obj_states.append((pos2[0], pos2[1], ((length + width) / 2)**2))
+        if len(pair_index) == 0:
+            return masks
+        ego_states = np.asarray(ego_states, dtype=float)
+        obj_states = np.asarray(obj_states, dtype=float)
+        diff_x = obj_states[:, 0] - ego_states[:, 0]
+        diff_y = obj_states[:, 1] - ego_states[:, 1]
+        half_max_span_square = obj_states[:, 2]
+        dist_square = diff_x**2 + diff_y**2
+        # all lasers are used if the object is too close
+        too_close = dist_square < half_max_span_square
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            span = np.arcsin(np.sqrt(half_max_span_square / dist_square))
+        head_in_1 = np.arctan2(diff_y, diff_x) - ego_states[:, 2]
+        small_angle = np.rad2deg(head_in_1 - span) % 360
+        large_angle = np.rad2deg(head_in_1 + span) % 360
+        angle_delta = 360 / num_lasers
+        laser_index = np.arange(num_lasers)
+        after_small = laser_index >= np.floor(small_angle / angle_delta)[:, None]
+        before_large = laser_index <= np.ceil(large_angle / angle_delta)[:, None]
+        # the range crosses 0 deg, e.g. from 355 deg to 5 deg
+        cross_zero = (large_angle < small_angle)[:, None]
+        pair_masks = np.where(cross_zero, after_small | before_large, after_small & before_large) | too_close[:, None]
+        np.logical_or.at(masks, np.asarray(pair_index), pair_masks)
+        return masks
+
     @staticmethod
     def get_surrounding_vehicles(detected_objects) -> Set:
         from metadrive.component.vehicle.base_vehicle import BaseVehicle
@@ -92,6 +164,11 @@ class Lidar(DistanceDetector):
     def get_surrounding_vehicles_info(
         self, ego_vehicle, detected_objects, perceive_distance, num_others, add_others_navi
     ):
+        table = self.engine.object_state_table
+        if table is not None and ego_vehicle.id in table:
+            return self._get_surrounding_vehicles_info_from_table(
+                table, ego_vehicle, detected_objects, perceive_distance, num_others, add_others_navi
+            )
         surrounding_vehicles = list(self.get_surrounding_vehicles(detected_objects))
         surrounding_vehicles.sort(
             key=lambda v: norm(ego_vehicle.position[0] - v.position[0], ego_vehicle.position[1] - v.position[1])
@@ -136,6 +213,116 @@ class Lidar(DistanceDetector):
 
         return res
 
+    def get_surrounding_vehicles_info_batch(
+        self, ego_vehicles, detected_objects, perceive_distance, num_others, add_others_navi
+    ):
+        """
+        The same as calling get_surrounding_vehicles_info() for each vehicle, but the states of a vehicle are read once
+        even if it surrounds many ego vehicles, and relative states are computed in a vectorized way
+        :return: a list of surrounding vehicles info, one for each ego vehicle
+        """
+        if self.engine.object_state_table is not None:
+            return [
+                self.get_surrounding_vehicles_info(ego_vehicle, objs, perceive_distance, num_others, add_others_navi)
+                for ego_vehicle, objs in zip(ego_vehicles, detected_objects)
+            ]
+        surrounding_vehicles = [list(self.get_surrounding_vehicles(objs)) for objs in detected_objects]
+        states = {}
+        for vehicle in ego_vehicles + [v for vehicles in surrounding_vehicles for v in vehicles]:
+            if vehicle not in states:
+                states[vehicle] = (vehicle.position, vehicle.velocity_km_h)
+
+        ret = []
+        for ego_vehicle, vehicles in zip(ego_vehicles, surrounding_vehicles):
+            res = []
+            if len(vehicles) > 0:
+                ego_position, ego_velocity = states[ego_vehicle]
+                position = np.asarray([states[v][0] for v in vehicles], dtype=float)
+                velocity = np.asarray([states[v][1] for v in vehicles], dtype=float)
+                dist = np.sqrt((ego_position[0] - position[:, 0])**2 + (ego_position[1] - position[:, 1])**2)
+                order = np.argsort(dist, kind="stable")[:num_others]
+                relative_position = self._to_local_coordinates(ego_vehicle, position[order] - ego_position)
+                relative_velocity = self._to_local_coordinates(ego_vehicle, velocity[order] - ego_velocity)
+                info = np.stack(
+                    [
+                        (relative_position[:, 0] / perceive_distance + 1) / 2,
+                        (relative_position[:, 1] / perceive_distance + 1) / 2,
+                        (relative_velocity[:, 0] / ego_vehicle.max_speed_km_h + 1) / 2,
+                        (relative_velocity[:, 1] / ego_vehicle.max_speed_km_h + 1) / 2
+                    ],
+                    axis=1
+                )
+                info = np.clip(info, 0.0, 1.0)
+                for i, index in enumerate(order):
+                    res += info[i].tolist()
+                    if add_others_navi:
+                        ckpt1, ckpt2 = vehicles[index].navigation.get_checkpoints()
+                        for ckpt in (ckpt1, ckpt2):
+                            relative_ckpt = self._project_to_vehicle_system(ckpt, ego_vehicle, perceive_distance)
+                            res.append(clip((relative_ckpt[0] / perceive_distance + 1) / 2, 0.0, 1.0))
+                            res.append(clip((relative_ckpt[1] / perceive_distance + 1) / 2, 0.0, 1.0))
+            res += [0.0] * ((8 if add_others_navi else 4) * (num_others - min(len(vehicles), num_others)))
+            ret.append(res)
+        return ret
+
+    @staticmethod
+    def _to_local_coordinates(vehicle, vectors):
+        """
+        Vectorized vehicle.convert_to_local_coordinates(vector, 0). The conversion is linear, so unit vectors are
+        converted once and combined in single precision like Panda3D does
+        :param vectors: vectors in world coordinates in shape [N, 2]
+        :return: vectors in vehicle coordinates in shape [N, 2]
+        """
+        basis = np.array(
+            [vehicle.convert_to_local_coordinates((1., 0.), 0.),
+             vehicle.convert_to_local_coordinates((0., 1.), 0.)],
+            dtype=np.float32
+        )
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return (vectors[:, 0:1] * basis[0] + vectors[:, 1:2] * basis[1]).astype(float)
+
+    def _get_surrounding_vehicles_info_from_table(
+        self, table, ego_vehicle, detected_objects, perceive_distance, num_others, add_others_navi
+    ):
+        """
+        The same as get_surrounding_vehicles_info, but positions and velocities are read from the object state table
+        """
+        vehicles = [v for v in self.get_surrounding_vehicles(detected_objects) if v.id in table]
+        rows = table.get_rows([v.id for v in vehicles])
+        ego_row = table.rows[ego_vehicle.id]
+        ego_position = table.position[ego_row]
+        ego_heading = table.heading[ego_row]
+        dist = np.hypot(table.position[rows, 0] - ego_position[0], table.position[rows, 1] - ego_position[1])
+        order = np.argsort(dist, kind="stable")[:num_others]
+        rows = rows[order]
+
+        relative_position, relative_velocity = table.to_local_coordinates(rows, ego_position, ego_heading)
+        relative_velocity = (
+            relative_velocity - table.to_local_coordinates([ego_row], ego_position, ego_heading)[1]
+        ) * 3.6
+        info = np.stack(
+            [
+                (relative_position[:, 0] / perceive_distance + 1) / 2,
+                (relative_position[:, 1] / perceive_distance + 1) / 2,
+                (relative_velocity[:, 0] / ego_vehicle.max_speed_km_h + 1) / 2,
+                (relative_velocity[:, 1] / ego_vehicle.max_speed_km_h + 1) / 2
+            ],
+            axis=1
+        )
+        info = np.clip(info, 0.0, 1.0)
+
+        res = []
+        for i, row in enumerate(rows):
+            res += info[i].tolist()
+            if add_others_navi:
+                ckpt1, ckpt2 = table.objects[row].navigation.get_checkpoints()
+                for ckpt in (ckpt1, ckpt2):
+                    relative_ckpt = self._project_to_vehicle_system(ckpt, ego_vehicle, perceive_distance)
+                    res.append(clip((relative_ckpt[0] / perceive_distance + 1) / 2, 0.0, 1.0))
+                    res.append(clip((relative_ckpt[1] / perceive_distance + 1) / 2, 0.0, 1.0))
+        res += [0.0] * ((8 if add_others_navi else 4) * (num_others - len(rows)))
+        return res
+
     def _get_lidar_mask(self, vehicle, num_lasers, radius):
         pos1 = vehicle.position
         head1 = vehicle.heading_theta
@@ -1,7 +1,9 @@
 import os
 import pickle
+import shutil
 import time
 from collections import OrderedDict
+from contextlib import nullcontext
 from typing import Callable, Optional, Union, List, Dict, AnyStr
 
 import numpy as np
@@ -11,8 +13,11 @@ from metadrive.constants import RENDER_MODE_NONE
 from metadrive.engine.core.engine_core import EngineCore
 from metadrive.engine.interface import Interface
 from metadrive.engine.logger import get_logger, reset_logger
+from metadrive.engine.object_state_table import ObjectStateTable
+from metadrive.engine.step_profiler import StepProfiler
 
 from metadrive.pull_asset import pull_asset
+from metadrive.scenario.columnar_episode import ColumnarEpisode
 from metadrive.utils import concat_step_infos
 from metadrive.utils.utils import is_map_related_class
 from metadrive.version import VERSION, asset_version
@@ -37,6 +42,8 @@ def generate_distinct_rgb_values():
 
 COLOR_SPACE = generate_distinct_rgb_values()
 
+_NULL_CONTEXT = nullcontext()
+
 
 class BaseEngine(EngineCore, Randomizable):
     """
@@ -87,6 +94,18 @@ class BaseEngine(EngineCore, Randomizable):
         # topdown renderer
         self.top_down_renderer = None
 
+        # states of dynamic objects in arrays
+        self.object_state_table = ObjectStateTable(
+        ) if self.global_config.get("use_object_state_table", False) else None
+
+        # wall time of each stage in env.step()
+        self.step_profiler = None
+        if self.global_config.get("profile_step", False):
+            self.step_profiler = StepProfiler(self.global_config.get("profile_window", 1000))
+            for sensor_id, sensor in self.sensors.items():
+                if hasattr(sensor, "perceive"):
+                    self.step_profiler.instrument(sensor, "perceive", "sensor/" + sensor_id)
+
         # warm up
         self.warmup()
 
@@ -411,6 +430,8 @@ class BaseEngine(EngineCore, Randomizable):
         # print(len(BaseEngine.COLORS_FREE), len(BaseEngine.COLORS_OCCUPIED))
         self.c_id = new_c2i
         self.id_c = new_i2c
+        if self.object_state_table is not None:
+            self.object_state_table.clear()
         return step_infos
 
     def before_step(self, external_actions: Dict[AnyStr, np.array]):
@@ -423,8 +444,9 @@ class BaseEngine(EngineCore, Randomizable):
         self.episode_step += 1
         step_infos = {}
         self.external_actions = external_actions
-        for manager in self.managers.values():
-            new_step_infos = manager.before_step()
+        for manager_name, manager in self.managers.items():
+            with self.profile("before_step/" + manager_name):
+                new_step_infos = manager.before_step()
             step_infos = concat_step_infos([step_infos, new_step_infos])
         return step_infos
 
@@ -437,8 +459,10 @@ class BaseEngine(EngineCore, Randomizable):
             # simulate or replay
             for name, manager in self.managers.items():
                 if name != "record_manager":
-                    manager.step()
-            self.step_physics_world()
+                    with self.profile("step/" + name):
+                        manager.step()
+            with self.profile("physics_world"):
+                self.step_physics_world()
             # the recording should happen after step physics world
             if "record_manager" in self.managers and i < step_num - 1:
                 # last recording should be finished in after_step(), as some objects may be created in after_step.
@@ -468,11 +492,17 @@ class BaseEngine(EngineCore, Randomizable):
         step_infos = {}
         if self.record_episode:
             assert list(self.managers.keys())[-1] == "record_manager", "Record Manager should have lowest priority"
-        for manager in self.managers.values():
-            new_step_info = manager.after_step(*args, **kwargs)
+        for manager_name, manager in self.managers.items():
+            with self.profile("after_step/" + manager_name):
+                new_step_info = manager.after_step(*args, **kwargs)
             step_infos = concat_step_infos([step_infos, new_step_info])
         self.interface.after_step()
 
+        # Refresh the state table after all managers, since some objects are created in after_step(). Observations and
+        # policies are computed after this point, so they all see the states after stepping physics world.
+        if self.object_state_table is not None:
+            self.object_state_table.refresh(self._spawned_objects)
+
         # === Option 1: Set episode_step to "num of calls to env.step"
         # We want to make sure that the episode_step is always aligned to the "number of calls to env.step"
         # So if this function is called in env.reset, we will not increment episode_step.
@@ -492,13 +522,25 @@ class BaseEngine(EngineCore, Randomizable):
         # poses = [v.position for v in self.agent_manager.active_agents.values()]
         return step_infos
 
+    def profile(self, key):
+        """
+        Context manager recording the wall time of a block to the step profiler. It does nothing if profiling is off
+        :param key: name of the stage
+        """
+        return self.step_profiler.timer(key) if self.step_profiler is not None else _NULL_CONTEXT
+
     def dump_episode(self, pkl_file_name=None) -> None:
-        """Dump the data of an episode."""
+        """Dump the data of an episode. A ColumnarEpisode is returned if config["record_episode_dir"] is set, and its
+        file is copied to pkl_file_name, which can be loaded by ColumnarEpisode(pkl_file_name)"""
         assert self.record_manager is not None
         episode_state = self.record_manager.get_episode_metadata()
         if pkl_file_name is not None:
-            with open(pkl_file_name, "wb+") as file:
-                pickle.dump(episode_state, file)
+            if isinstance(episode_state, ColumnarEpisode):
+                if os.path.abspath(pkl_file_name) != os.path.abspath(episode_state.file_path):
+                    shutil.copyfile(episode_state.file_path, pkl_file_name)
+            else:
+                with open(pkl_file_name, "wb+") as file:
+                    pickle.dump(episode_state, file)
         return episode_state
 
     def close(self):
@@ -525,6 +567,10 @@ class BaseEngine(EngineCore, Randomizable):
                 self._clean_color(obj.id)
                 obj.destroy()
         self._dying_objects = {}
+        if self.object_state_table is not None:
+            self.object_state_table.clear()
+        if self.step_profiler is not None:
+            self.step_profiler.clear()
         if self.main_camera is not None:
             self.main_camera.destroy()
         self.interface.destroy()
@@ -591,9 +591,16 @@ class Terrain(BaseObject, ABC):
 
         """
         if self.engine.current_map:
-            drivable_region = self.engine.current_map.get_height_map(
-                center_point, self._heightmap_size, 1, self._drivable_area_extension
-            )
+            # the drivable region of a map is cached as bits, so it is rasterized only once when the map is reused
+            terrain_cache = self.engine.current_map.terrain_cache
+            key = ("drivable_region", tuple(center_point), self._heightmap_size, self._drivable_area_extension)
+            if key not in terrain_cache:
+                drivable_region = self.engine.current_map.get_height_map(
+                    center_point, self._heightmap_size, 1, self._drivable_area_extension
+                )
+                terrain_cache[key] = (np.packbits(drivable_region > 0), drivable_region.shape)
+            packed_region, shape = terrain_cache[key]
+            drivable_region = np.unpackbits(packed_region, count=int(np.prod(shape))).reshape(shape).astype(bool)
         else:
             drivable_region = np.ones((self._heightmap_size, self._heightmap_size, 1))
         return drivable_region
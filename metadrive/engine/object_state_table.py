@@ -0,0 +1,128 @@
+import numpy as np
+
+from metadrive.type import MetaDriveType
+
+
+class ObjectStateTable:
+    """
+    A struct-of-arrays snapshot of dynamic objects, i.e. vehicles, pedestrians and cyclists, in the scene. The states
+    of all objects are read from Panda3D/Bullet once per step and stored in contiguous arrays, so that observations,
+    policies and renderers can query them in a vectorized way instead of accessing properties object by object.
+    The i-th row of each array belongs to the object self.ids[i]. Lanes are stored as integer ids, which can be
+    converted back to lane indices via self.lane_indices.
+    """
+    def __init__(self):
+        self.ids = []
+        self.objects = []
+        self.rows = {}
+        # lane id -> lane index, lane index -> lane id
+        self.lane_indices = []
+        self._lane_ids = {}
+        self._type_cache = {}
+        self._set_arrays([], [], [], [], [], [])
+
+    def _set_arrays(self, position, heading, velocity, size, lane_id, obj_type):
+        # [N, 2], unit: [m]
+        self.position = np.asarray(position, dtype=float).reshape(-1, 2)
+        # [N], unit: [rad]
+        self.heading = np.asarray(heading, dtype=float)
+        # [N, 2], unit: [m/s]
+        self.velocity = np.asarray(velocity, dtype=float).reshape(-1, 2)
+        # [N, 3], length, width and height, unit: [m]
+        self.size = np.asarray(size, dtype=float).reshape(-1, 3)
+        # [N], -1 for objects not on any lane
+        self.lane_id = np.asarray(lane_id, dtype=int)
+        # [N], MetaDriveType
+        self.type = np.asarray(obj_type, dtype=object)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, object_id):
+        return object_id in self.rows
+
+    def refresh(self, objects):
+        """
+        Read states of all dynamic objects
+        :param objects: a dict mapping object id to object, usually engine.get_objects()
+        """
+        from metadrive.component.traffic_participants.base_traffic_participant import BaseTrafficParticipant
+        from metadrive.component.vehicle.base_vehicle import BaseVehicle
+        self.ids = []
+        self.objects = []
+        position, heading, velocity, size, lane_id, obj_type = [], [], [], [], [], []
+        for object_id, obj in objects.items():
+            if not isinstance(obj, (BaseVehicle, BaseTrafficParticipant)):
+                continue
+            self.ids.append(object_id)
+            self.objects.append(obj)
+            position.append(obj.position)
+            heading.append(obj.heading_theta)
+            velocity.append(obj.velocity)
+            size.append((obj.LENGTH, obj.WIDTH, getattr(obj, "HEIGHT", 0.)))
+            lane = obj.navigation.current_lane if getattr(obj, "navigation", None) is not None else None
+            lane_id.append(self._get_lane_id(lane.index) if lane is not None else -1)
+            obj_type.append(self._get_type(obj))
+        self.rows = {object_id: row for row, object_id in enumerate(self.ids)}
+        self._set_arrays(position, heading, velocity, size, lane_id, obj_type)
+
+    def _get_lane_id(self, lane_index):
+        if lane_index not in self._lane_ids:
+            self._lane_ids[lane_index] = len(self.lane_indices)
+            self.lane_indices.append(lane_index)
+        return self._lane_ids[lane_index]
+
+    def _get_type(self, obj):
+        obj_class = obj.__class__
+        if obj_class not in self._type_cache:
+            from metadrive.component.traffic_participants.cyclist import Cyclist
+            from metadrive.component.traffic_participants.pedestrian import Pedestrian
+            if issubclass(obj_class, Pedestrian):
+                self._type_cache[obj_class] = MetaDriveType.PEDESTRIAN
+            elif issubclass(obj_class, Cyclist):
+                self._type_cache[obj_class] = MetaDriveType.CYCLIST
+            else:
+                self._type_cache[obj_class] = MetaDriveType.VEHICLE
+        return self._type_cache[obj_class]
+
+    def get_rows(self, object_ids):
+        """
+        Rows of objects, objects not in this table are skipped
+        """
+        return np.asarray([self.rows[object_id] for object_id in object_ids if object_id in self.rows], dtype=int)
+
+    def query_radius(self, position, radius, exclude=None):
+        """
+        Find objects in a circle
+        :param position: center of the circle
+        :param radius: radius of the circle
+        :param exclude: an object id to exclude, usually the ego vehicle
+        :return: rows of objects sorted by the distance to the center
+        """
+        dist = np.hypot(self.position[:, 0] - position[0], self.position[:, 1] - position[1])
+        if exclude is not None and exclude in self.rows:
+            dist[self.rows[exclude]] = np.inf
+        rows = np.where(dist <= radius)[0]
+        return rows[np.argsort(dist[rows], kind="stable")]
+
+    def to_local_coordinates(self, rows, origin, heading):
+        """
+        Positions and velocities of objects in the coordinates of a frame, e.g. the ego vehicle
+        :param rows: rows of objects
+        :param origin: position of the frame
+        :param heading: heading of the frame, unit: [rad]
+        :return: relative positions and velocities in shape [len(rows), 2]
+        """
+        cos, sin = np.cos(heading), np.sin(heading)
+        rotation = np.array([[cos, -sin], [sin, cos]])
+        position = (self.position[rows] - np.asarray(origin)[:2]) @ rotation
+        velocity = self.velocity[rows] @ rotation
+        return position, velocity
+
+    def clear(self):
+        self.ids = []
+        self.objects = []
+        self.rows = {}
+        self.lane_indices = []
+        self._lane_ids = {}
+        self._set_arrays([], [], [], [], [], [])
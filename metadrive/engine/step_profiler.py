@@ -0,0 +1,122 @@
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+
+
+class StepProfiler:
+    """
+    Record the wall time of each stage of env.step(), e.g. each manager in before_step/step/after_step, stepping the
+    physics world, each sensor's perceive(), observations and reward/done/cost functions. Time of a stage is summed
+    within one env.step() and the sums of the latest window steps are kept, so statistics and histograms reflect
+    recent steps only. All durations are in seconds.
+    Use it by setting config["profile_step"]=True and accessing env.engine.step_profiler
+    """
+    TOTAL = "total"
+
+    def __init__(self, window=1000):
+        """
+        :param window: the number of latest steps kept for each stage
+        """
+        self.window = window
+        self.records = defaultdict(lambda: deque(maxlen=self.window))
+        self.last_step = {}
+        self._current = defaultdict(float)
+        self._step_start = None
+
+    def timer(self, key):
+        """
+        Context manager adding the wall time of the block to a stage
+        """
+        return _Timer(self, key)
+
+    def record(self, key, duration):
+        self._current[key] += duration
+
+    def instrument(self, obj, method_name, key):
+        """
+        Wrap a method of an object, e.g. sensor.perceive, to record its wall time to a stage
+        """
+        method = getattr(obj, method_name)
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.record(key, time.perf_counter() - start)
+
+        setattr(obj, method_name, wrapper)
+
+    def begin_step(self):
+        """
+        Start one env.step(). Time recorded out of env.step(), e.g. in env.reset(), is dropped
+        """
+        self._current.clear()
+        self._step_start = time.perf_counter()
+
+    def end_step(self):
+        """
+        Finish one env.step() and push the time of each stage in this step to the records
+        """
+        if self._step_start is not None:
+            self._current[self.TOTAL] = time.perf_counter() - self._step_start
+            self._step_start = None
+        for key, duration in self._current.items():
+            self.records[key].append(duration)
+        self.last_step = dict(self._current)
+        self._current.clear()
+
+    def get_statistics(self):
+        """
+        :return: a dict mapping each stage to count, mean, p50, p90, p99 and max of its time per step
+        """
+        ret = {}
+        for key, record in self.records.items():
+            record = np.asarray(record)
+            p50, p90, p99 = (float(v) for v in np.percentile(record, [50, 90, 99]))
+            ret[key] = dict(
+                count=len(record), mean=float(record.mean()), p50=p50, p90=p90, p99=p99, max=float(record.max())
+            )
+        return ret
+
+    def get_histogram(self, key, bins=20):
+        """
+        :return: counts and bin edges of the time per step of a stage, see np.histogram
+        """
+        return np.histogram(np.asarray(self.records[key]), bins=bins)
+
+    def summary(self):
+        """
+        A table of stages sorted by the mean time per step, unit: [ms]
+        """
+        lines = ["{:<40}{:>10}{:>10}{:>10}{:>10}".format("stage", "mean", "p50", "p99", "max")]
+        statistics = sorted(self.get_statistics().items(), key=lambda kv: -kv[1]["mean"])
+        for key, s in statistics:
+            lines.append(
+                "{:<40}{:>10.3f}{:>10.3f}{:>10.3f}{:>10.3f}".format(
+                    key, s["mean"] * 1e3, s["p50"] * 1e3, s["p99"] * 1e3, s["max"] * 1e3
+                )
+            )
+        return "\n".join(lines)
+
+    def clear(self):
+        self.records.clear()
+        self.last_step = {}
+        self._current.clear()
+        self._step_start = None
+
+
+class _Timer:
+    __slots__ = ("profiler", "key", "start")
+
+    def __init__(self, profiler, key):
+        self.profiler = profiler
+        self.key = key
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.profiler.record(self.key, time.perf_counter() - self.start)
@@ -7,3 +7,4 @@ from metadrive.envs.marl_envs import (
     MultiAgentMetaDrive, MultiAgentTollgateEnv, MultiAgentBottleneckEnv, MultiAgentIntersectionEnv,
     MultiAgentRoundaboutEnv, MultiAgentParkingLotEnv, MultiAgentTinyInter
 )
+from metadrive.envs.vector_env import SubprocVectorEnv
@@ -180,6 +180,8 @@ BASE_DEFAULT_CONFIG = dict(
 
     # ===== Sensors =====
     sensors=dict(lidar=(Lidar, ), side_detector=(SideDetector, ), lane_line_detector=(LaneLineDetector, )),
+    # If True, lidar/side detector/lane line detector compute all laser ends at once and return hits in a batch
+    batch_ray_test=False,
 
     # ===== Engine Core config =====
     # If true pop a window to render
@@ -215,6 +217,12 @@ BASE_DEFAULT_CONFIG = dict(
     disable_model_compression=True,
     # Whether to disable the collision detection (useful for debugging / replay logged scenarios)
     disable_collision=False,
+    # If True, states of vehicles and traffic participants are stored in engine.object_state_table after each step,
+    # so that lidar observation can read them in a vectorized way
+    use_object_state_table=False,
+    # If True, observations of all agents are computed together via observe_batch() of the observation class, which
+    # shares computation among agents, e.g. lidar masks in LidarStateObservation. Useful for multi-agent envs
+    batch_observation=False,
 
     # ===== Terrain =====
     # The size of the square map region, which is centered at [0, 0]. The map objects outside it are culled.
@@ -233,6 +241,9 @@ BASE_DEFAULT_CONFIG = dict(
     show_crosswalk=True,
     # Whether to show sidewalk
     show_sidewalk=True,
+    # If True, lane line segments of the same type in a block are merged into one physics body, and so are sidewalks.
+    # It reduces the number of bodies in the physics world and makes building, attaching and detaching maps faster
+    merge_collision_bodies=False,
 
     # ===== Debug =====
     # Please see Documentation: Debug for more details
@@ -243,6 +254,12 @@ BASE_DEFAULT_CONFIG = dict(
     debug_static_world=False,  # debug static world
     log_level=logging.INFO,  # log level. logging.DEBUG/logging.CRITICAL or so on
     show_coordinates=False,  # show coordinates for maps and objects for debug
+    # Record wall time of managers, physics world, sensors, observations and reward/done/cost functions in each step.
+    # Statistics of the latest profile_window steps are available via env.engine.step_profiler
+    profile_step=False,
+    profile_window=1000,
+    # If True, wall time of each stage in the current step is added to the step info with key "profile"
+    profile_step_info=False,
 
     # ===== GUI =====
     # Please see Documentation: GUI for more details
@@ -264,6 +281,11 @@ BASE_DEFAULT_CONFIG = dict(
     # Please see Documentation: Record and Replay for more details
     # When replay_episode is True, the episode metadata will be recorded
     record_episode=False,
+    # When set to a folder, recorded frames are streamed to a file in this folder in a columnar format instead of being
+    # kept in memory, and engine.dump_episode() returns a ColumnarEpisode. See metadrive/scenario/columnar_episode.py
+    record_episode_dir=None,
+    # The number of frames buffered before being written to the file, when record_episode_dir is set
+    record_chunk_size=500,
     # The value should be None or the log data. If it is the later one, the simulator will replay logged scenario
     replay_episode=None,
     # When set to True, the replay system will only reconstruct the first frame from the logged scenario metadata
@@ -434,6 +456,8 @@ class BaseEnv(gym.Env):
 
     # ===== Run-time =====
     def step(self, actions: Union[Union[np.ndarray, list], Dict[AnyStr, Union[list, np.ndarray]], int]):
+        if self.engine.step_profiler is not None:
+            self.engine.step_profiler.begin_step()
         actions = self._preprocess_actions(actions)  # preprocess environment input
         engine_info = self._step_simulator(actions)  # step the simulation
         while self.in_stop:
@@ -604,6 +628,23 @@ class BaseEnv(gym.Env):
         data.update(agent_info)
         return data
 
+    def _observe_batch(self, agents):
+        """
+        Observe agents grouped by the class of their observations, see BaseObservation.observe_batch()
+        :return: a dict mapping agent id to observation, in the order of agents
+        """
+        groups = {}
+        for v_id in agents.keys():
+            groups.setdefault(self.observations[v_id].__class__, []).append(v_id)
+        obses = {}
+        for obs_class, v_ids in groups.items():
+            with self.engine.profile("observation/" + obs_class.__name__):
+                results = obs_class.observe_batch(
+                    [self.observations[v_id] for v_id in v_ids], [agents[v_id] for v_id in v_ids]
+                )
+            obses.update(zip(v_ids, results))
+        return {v_id: obses[v_id] for v_id in agents.keys()}
+
     def _get_step_return(self, actions, engine_info):
         # update obs, dones, rewards, costs, calculate done at first !
         obses = {}
@@ -611,15 +652,24 @@ class BaseEnv(gym.Env):
         cost_infos = {}
         reward_infos = {}
         rewards = {}
+        profile = self.engine.profile
+        batch_observation = self.config["batch_observation"] and len(self.agents) > 1
         for v_id, v in self.agents.items():
             self.episode_lengths[v_id] += 1
-            rewards[v_id], reward_infos[v_id] = self.reward_function(v_id)
+            with profile("reward_function"):
+                rewards[v_id], reward_infos[v_id] = self.reward_function(v_id)
             self.episode_rewards[v_id] += rewards[v_id]
-            done_function_result, done_infos[v_id] = self.done_function(v_id)
-            _, cost_infos[v_id] = self.cost_function(v_id)
+            with profile("done_function"):
+                done_function_result, done_infos[v_id] = self.done_function(v_id)
+            with profile("cost_function"):
+                _, cost_infos[v_id] = self.cost_function(v_id)
             self.dones[v_id] = done_function_result or self.dones[v_id]
-            o = self.observations[v_id].observe(v)
-            obses[v_id] = o
+            if not batch_observation:
+                with profile("observation/" + self.observations[v_id].__class__.__name__):
+                    o = self.observations[v_id].observe(v)
+                obses[v_id] = o
+        if batch_observation:
+            obses = self._observe_batch(self.agents)
 
         step_infos = concat_step_infos([engine_info, done_infos, reward_infos, cost_infos])
         truncateds = {k: step_infos[k].get(TerminationState.MAX_STEP, False) for k in self.agents.keys()}
@@ -632,9 +682,13 @@ class BaseEnv(gym.Env):
                 if self.config["truncate_as_terminate"]:
                     self.dones[k] = terminateds[k] = True
 
+        if self.engine.step_profiler is not None:
+            self.engine.step_profiler.end_step()
         for v_id, r in rewards.items():
             step_infos[v_id]["episode_reward"] = self.episode_rewards[v_id]
             step_infos[v_id]["episode_length"] = self.episode_lengths[v_id]
+            if self.config["profile_step_info"] and self.engine.step_profiler is not None:
+                step_infos[v_id]["profile"] = self.engine.step_profiler.last_step
 
         if not self.is_multi_agent:
             return self._wrap_as_single_agent(obses), self._wrap_as_single_agent(rewards), \
@@ -32,12 +32,25 @@ METADRIVE_DEFAULT_CONFIG = dict(
         "start_position": [0, 0],
     },
     store_map=True,
+    # When store_map=True, least recently used maps are destroyed if the number or the estimated bytes of stored maps
+    # exceed these budgets. None means no limit. Hits, misses and evictions: map_manager.get_map_store_stats()
+    store_map_max_num=None,
+    store_map_max_bytes=None,
+    # If set, maps are created from the block sequences in this file dumped by map_manager.dump_all_maps(), without
+    # running the BIG search. Maps are created when they are used. The file can be shared by many envs.
+    pg_map_file=None,
 
     # ===== Traffic =====
     traffic_density=0.1,
     need_inverse_traffic=False,
     traffic_mode=TrafficMode.Trigger,  # "Respawn", "Trigger"
     random_traffic=False,  # Traffic is randomized at default.
+    # If True, traffic vehicles are moved by a kinematic bicycle model instead of Bullet vehicle dynamics, which is much
+    # faster in dense traffic. Collisions between traffic vehicles are not simulated in this mode.
+    kinematic_traffic=False,
+    # If True, IDM traffic vehicles find their front/back vehicles in a table shared by all vehicles and compute
+    # accelerations together, instead of running a Bullet contact test and a loop over neighbors for each vehicle.
+    batch_traffic_policy=False,
     # this will update the vehicle_config and set to traffic
     traffic_vehicle_config=dict(
         show_navi_mark=False,
@@ -103,7 +116,7 @@ class MetaDriveEnv(BaseEnv):
         return config
 
     def __init__(self, config: Union[dict, None] = None):
-        self.default_config_copy = Config(self.default_config(), unchangeable=True)
+        self.default_config_copy = self.default_config().frozen()
         super(MetaDriveEnv, self).__init__(config)
 
         # scenario setting
@@ -34,7 +34,12 @@ SCENARIO_ENV_CONFIG = dict(
 
     # ===== Map Config =====
     store_map=True,
+    # When store_map=True, least recently used maps are destroyed if the number or the estimated bytes of stored maps
+    # exceed these budgets. None means no limit. Hits, misses and evictions: map_manager.get_map_store_stats()
+    store_map_max_num=None,
+    store_map_max_bytes=None,
     store_data=True,
+    prefetch_scenarios=0,  # Load this number of upcoming scenarios in background. Works with sequential_seed=True
     need_lane_localization=True,
     no_map=False,
     map_region_size=1024,
@@ -1,6 +1,6 @@
 from metadrive.envs.metadrive_env import MetaDriveEnv
 from metadrive.obs.top_down_obs import TopDownObservation
-from metadrive.obs.top_down_obs_multi_channel import TopDownMultiChannel
+from metadrive.obs.top_down_obs_multi_channel import TopDownMultiChannel, TopDownMultiChannelCV2
 from metadrive.utils import Config
 
 
@@ -16,7 +16,10 @@ class TopDownSingleFrameMetaDriveEnv(MetaDriveEnv):
                 "post_stack": 5,
                 "norm_pixel": True,
                 "resolution_size": 84,
-                "distance": 30
+                "distance": 30,
+                # "pygame" or "cv2". The multi-channel observation can be rasterized with NumPy and OpenCV, which caches
+                # the road network of each map and is faster than drawing on pygame surfaces
+                "rasterizer": "pygame",
             }
         )
         return config
@@ -30,9 +33,14 @@ class TopDownSingleFrameMetaDriveEnv(MetaDriveEnv):
         )
 
 
+def _get_multi_channel_class(rasterizer):
+    assert rasterizer in ["pygame", "cv2"], "Unknown rasterizer: {}".format(rasterizer)
+    return TopDownMultiChannelCV2 if rasterizer == "cv2" else TopDownMultiChannel
+
+
 class TopDownMetaDrive(TopDownSingleFrameMetaDriveEnv):
     def get_single_observation(self, _=None):
-        return TopDownMultiChannel(
+        return _get_multi_channel_class(self.config["rasterizer"])(
             self.config["vehicle_config"],
             onscreen=self.config["use_render"],
             clip_rgb=self.config["norm_pixel"],
@@ -56,13 +64,14 @@ class TopDownMetaDriveEnvV2(MetaDriveEnv):
                 "post_stack": 5,
                 "norm_pixel": True,
                 "resolution_size": 84,
-                "distance": 30
+                "distance": 30,
+                "rasterizer": "pygame",  # "pygame" or "cv2", see TopDownSingleFrameMetaDriveEnv
             }
         )
         return config
 
     def get_single_observation(self, _=None):
-        return TopDownMultiChannel(
+        return _get_multi_channel_class(self.config["rasterizer"])(
             self.config["vehicle_config"],
             self.config["use_render"],
             self.config["norm_pixel"],
@@ -0,0 +1,263 @@
+"""
+A vectorized environment running one MetaDrive environment per subprocess.
+
+Since only one BaseEngine can exist in a process, each environment lives in its own worker process. Workers write
+observations, rewards, terminations and truncations into preallocated shared memory, so the main process reads them as
+NumPy arrays without pickling. Only actions, commands and info dicts go through pipes.
+
+Example:
+
+    env = SubprocVectorEnv(MetaDriveEnv, dict(num_scenarios=100, start_seed=0), num_envs=4)
+    obs, infos = env.reset()
+    obs, rewards, terminateds, truncateds, infos = env.step(np.stack([env.single_action_space.sample()] * 4))
+    env.close()
+"""
+import copy
+import multiprocessing as mp
+import traceback
+
+import gymnasium as gym
+import numpy as np
+from gymnasium.vector.utils import batch_space
+
+
+def _get_observation_specs(observation_space):
+    """
+    The shape and dtype of each observation buffer. A Box space has one buffer with key None and a Dict space has one
+    buffer for each Box subspace
+    """
+    if isinstance(observation_space, gym.spaces.Box):
+        return {None: (observation_space.shape, observation_space.dtype)}
+    assert isinstance(observation_space, gym.spaces.Dict) and \
+           all(isinstance(space, gym.spaces.Box) for space in observation_space.spaces.values()), \
+        "Only Box or Dict of Box observation spaces are supported, got: {}".format(observation_space)
+    return {key: (space.shape, space.dtype) for key, space in observation_space.spaces.items()}
+
+
+def _as_arrays(buffers, specs, num_envs):
+    """
+    Create NumPy views of the shared memory in shape [num_envs, ...]
+    """
+    return {
+        key: np.frombuffer(buffers[key], dtype=dtype).reshape((num_envs, ) + tuple(shape))
+        for key, (shape, dtype) in specs.items()
+    }
+
+
+def _write_obs(obs_arrays, index, obs):
+    if None in obs_arrays:
+        obs_arrays[None][index] = obs
+    else:
+        for key, array in obs_arrays.items():
+            array[index] = obs[key]
+
+
+def _worker(index, env_class, config, pipe, parent_pipe, obs_buffers, obs_specs, reward_buffer, done_buffers, num_envs):
+    parent_pipe.close()
+    env = None
+    obs_arrays = _as_arrays(obs_buffers, obs_specs, num_envs)
+    rewards = np.frombuffer(reward_buffer, dtype=np.float64)
+    terminateds, truncateds = (np.frombuffer(buffer, dtype=np.bool_) for buffer in done_buffers)
+    try:
+        env = env_class(config)
+        while True:
+            command, data = pipe.recv()
+            if command == "reset":
+                obs, info = env.reset(**data)
+                _write_obs(obs_arrays, index, obs)
+                pipe.send(("ok", info))
+            elif command == "step":
+                action, auto_reset = data
+                obs, reward, terminated, truncated, info = env.step(action)
+                if auto_reset and (terminated or truncated):
+                    final_obs, final_info = obs, info
+                    obs, info = env.reset()
+                    info["final_observation"] = final_obs
+                    info["final_info"] = final_info
+                _write_obs(obs_arrays, index, obs)
+                rewards[index] = reward
+                terminateds[index] = terminated
+                truncateds[index] = truncated
+                pipe.send(("ok", info))
+            elif command == "call":
+                name, args, kwargs = data
+                attr = getattr(env, name)
+                pipe.send(("ok", attr(*args, **kwargs) if callable(attr) else attr))
+            elif command == "close":
+                pipe.send(("ok", None))
+                break
+            else:
+                raise ValueError("Unknown command: {}".format(command))
+    except (KeyboardInterrupt, EOFError):
+        pass
+    except Exception:
+        pipe.send(("error", traceback.format_exc()))
+    finally:
+        if env is not None:
+            env.close()
+        pipe.close()
+
+
+class SubprocVectorEnv:
+    """
+    Run num_envs single-agent environments in subprocesses and step them in parallel. Observations, rewards,
+    terminations and truncations are exchanged through shared memory.
+
+    When shard_scenarios=True, the scenarios are split among workers: ScenarioEnv workers get worker_index/num_workers,
+    which is how ScenarioDataManager shards a dataset, and environments using start_seed, like MetaDriveEnv, get
+    consecutive chunks of seeds. When auto_reset=True, an episode is reset in the same step() it ends. The returned
+    observation and info belong to the new episode, while the last observation and info of the finished episode are
+    stored in info["final_observation"] and info["final_info"].
+    """
+    def __init__(self, env_class, config=None, num_envs=2, shard_scenarios=True, auto_reset=True, context="spawn"):
+        """
+        :param env_class: a single-agent environment class, e.g. MetaDriveEnv or ScenarioEnv
+        :param config: the config shared by all workers
+        :param num_envs: the number of workers
+        :param shard_scenarios: split scenarios among workers
+        :param auto_reset: reset an environment automatically once its episode ends
+        :param context: the start method of multiprocessing. Use "spawn" to avoid forking a process with Panda3D states
+        """
+        config = copy.deepcopy(config or {})
+        self.num_envs = num_envs
+        self.auto_reset = auto_reset
+        self.closed = False
+
+        # get spaces from a temporary environment, which doesn't launch the engine
+        tmp = env_class(copy.deepcopy(config))
+        assert not tmp.is_multi_agent, "SubprocVectorEnv only supports single-agent environments"
+        self.single_observation_space = tmp.observation_space
+        self.single_action_space = tmp.action_space
+        default_config = tmp.default_config()
+        del tmp
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+        self.action_space = batch_space(self.single_action_space, num_envs)
+
+        # shared memory
+        ctx = mp.get_context(context)
+        self._obs_specs = _get_observation_specs(self.single_observation_space)
+        obs_buffers = {
+            key: ctx.RawArray("b",
+                              num_envs * int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize)
+            for key, (shape, dtype) in self._obs_specs.items()
+        }
+        reward_buffer = ctx.RawArray("d", num_envs)
+        done_buffers = (ctx.RawArray("b", num_envs), ctx.RawArray("b", num_envs))
+        self._obs = _as_arrays(obs_buffers, self._obs_specs, num_envs)
+        self._rewards = np.frombuffer(reward_buffer, dtype=np.float64)
+        self._terminateds, self._truncateds = (np.frombuffer(buffer, dtype=np.bool_) for buffer in done_buffers)
+
+        self._pipes = []
+        self._processes = []
+        for index in range(num_envs):
+            worker_config = self._get_worker_config(config, default_config, index) if shard_scenarios else config
+            parent_pipe, child_pipe = ctx.Pipe()
+            process = ctx.Process(
+                target=_worker,
+                name="SubprocVectorEnvWorker-{}".format(index),
+                args=(
+                    index, env_class, worker_config, child_pipe, parent_pipe, obs_buffers, self._obs_specs,
+                    reward_buffer, done_buffers, num_envs
+                ),
+                daemon=True
+            )
+            process.start()
+            child_pipe.close()
+            self._pipes.append(parent_pipe)
+            self._processes.append(process)
+
+    def _get_worker_config(self, config, default_config, index):
+        config = copy.deepcopy(config)
+        if "num_workers" in default_config:
+            # ScenarioEnv, scenarios are assigned to workers by ScenarioDataManager
+            config["worker_index"] = index
+            config["num_workers"] = self.num_envs
+            config.setdefault("sequential_seed", True)
+        elif "start_seed" in default_config:
+            num_scenarios = config.get("num_scenarios", default_config["num_scenarios"])
+            assert num_scenarios % self.num_envs == 0, \
+                "num_scenarios: {} can not be divided by num_envs: {}".format(num_scenarios, self.num_envs)
+            num_scenarios = num_scenarios // self.num_envs
+            config["start_seed"] = config.get("start_seed", default_config["start_seed"]) + index * num_scenarios
+            config["num_scenarios"] = num_scenarios
+        return config
+
+    def _send(self, commands):
+        assert not self.closed, "SubprocVectorEnv is closed"
+        for pipe, command in zip(self._pipes, commands):
+            pipe.send(command)
+
+    def _receive(self):
+        results = []
+        errors = []
+        for index, pipe in enumerate(self._pipes):
+            status, result = pipe.recv()
+            if status == "error":
+                errors.append("Worker {}:\n{}".format(index, result))
+            results.append(result)
+        if len(errors) > 0:
+            self.close(terminate=True)
+            raise RuntimeError("\n".join(errors))
+        return results
+
+    def _get_obs(self, copy_obs):
+        obs = {key: array.copy() if copy_obs else array for key, array in self._obs.items()}
+        return obs[None] if None in obs else obs
+
+    def reset(self, seed=None, copy_obs=True):
+        """
+        Reset all environments
+        :param seed: None, an int for all environments, or a list of seeds for each environment
+        :param copy_obs: return a copy of the shared memory. If False, the returned observations will be overwritten by
+        the next reset() or step()
+        :return: batched observations, a list of infos
+        """
+        seeds = seed if isinstance(seed, (list, tuple)) else [seed] * self.num_envs
+        assert len(seeds) == self.num_envs
+        self._send([("reset", dict(seed=s) if s is not None else dict()) for s in seeds])
+        infos = self._receive()
+        return self._get_obs(copy_obs), infos
+
+    def step(self, actions, copy_obs=True):
+        """
+        Step all environments
+        :param actions: batched actions in shape [num_envs, ...]
+        :param copy_obs: return a copy of the shared memory
+        :return: batched observations, rewards, terminateds, truncateds and a list of infos
+        """
+        assert len(actions) == self.num_envs
+        self._send([("step", (action, self.auto_reset)) for action in actions])
+        infos = self._receive()
+        return (self._get_obs(copy_obs), self._rewards.copy(), self._terminateds.copy(), self._truncateds.copy(), infos)
+
+    def call(self, name, *args, **kwargs):
+        """
+        Call a method or get an attribute of all environments
+        :return: a list of results
+        """
+        self._send([("call", (name, args, kwargs))] * self.num_envs)
+        return self._receive()
+
+    def close(self, terminate=False):
+        if self.closed:
+            return
+        self.closed = True
+        if not terminate:
+            for pipe in self._pipes:
+                try:
+                    pipe.send(("close", None))
+                    pipe.recv()
+                except (BrokenPipeError, EOFError):
+                    pass
+        for process in self._processes:
+            if terminate:
+                process.terminate()
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+        for pipe in self._pipes:
+            pipe.close()
+
+    def __del__(self):
+        if not getattr(self, "closed", True):
+            self.close(terminate=True)
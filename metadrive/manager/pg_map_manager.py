@@ -1,12 +1,49 @@
+import copy
+import multiprocessing as mp
 import pickle
 
+from panda3d.core import NodePath
 from tqdm import tqdm
 
+from metadrive.component.algorithm.BIG import BIG, BigGenerateMethod
+from metadrive.component.map.map_store import MapStore
 from metadrive.component.map.pg_map import PGMap, MapGenerateMethod
+from metadrive.component.road_network.node_road_network import NodeRoadNetwork
+from metadrive.engine.core.physics_world import PhysicsWorld
 from metadrive.manager.base_manager import BaseManager
+from metadrive.utils.config import config_to_dict
 from metadrive.utils.utils import get_time_str
 
 
+def search_block_sequence(map_config, block_dist_config):
+    """
+    Search the block sequence of a map by BIG without engine. Blocks are not created in world, so it can run in worker
+    processes. The map created from the block sequence by MapGenerateMethod.PG_MAP_FILE is the same as the one generated
+    by BIG
+    """
+    big = BIG(
+        map_config.get(PGMap.LANE_NUM, 2),
+        map_config.get(PGMap.LANE_WIDTH, 3.5),
+        NodeRoadNetwork(),
+        NodePath("render"),
+        PhysicsWorld(),
+        exit_length=map_config.get("exit_length", 50),
+        random_seed=map_config[PGMap.SEED],
+        block_dist_config=block_dist_config
+    )
+    big.generate(map_config[PGMap.GENERATE_TYPE], map_config[PGMap.GENERATE_CONFIG], topology_only=True)
+    block_sequence = PGMap.get_block_sequence(big.blocks)
+    for block in big.blocks:
+        block.destroy()
+    big.destroy()
+    return block_sequence
+
+
+def _search_block_sequence_in_process(args):
+    map_config, block_dist_config = args
+    return map_config[PGMap.SEED], search_block_sequence(map_config, block_dist_config)
+
+
 class PGMapManager(BaseManager):
     """
     MapManager contains a list of PGmaps
@@ -20,7 +57,20 @@ class PGMapManager(BaseManager):
         # for pgmaps
         start_seed = self.start_seed = self.engine.global_config["start_seed"]
         env_num = self.env_num = self.engine.global_config["num_scenarios"]
-        self.maps = {_seed: None for _seed in range(start_seed, start_seed + env_num)}
+        self.maps = self._create_map_store(range(start_seed, start_seed + env_num))
+
+        # maps loaded from a file dumped by dump_all_maps() are created from their block sequences without BIG
+        self.loaded_map_data = {}
+        map_file = self.engine.global_config.get("pg_map_file", None)
+        if map_file is not None:
+            self.read_map_file(map_file)
+
+    def _create_map_store(self, seeds):
+        return MapStore(
+            seeds,
+            max_num=self.engine.global_config.get("store_map_max_num", None),
+            max_bytes=self.engine.global_config.get("store_map_max_bytes", None)
+        )
 
     def spawn_object(self, object_class, *args, **kwargs):
         # Note: Map instance should not be reused / recycled.
@@ -50,21 +100,36 @@ class PGMapManager(BaseManager):
             self.unload_map(map)
 
     def reset(self):
-        config = self.engine.global_config.copy()
         current_seed = self.engine.global_seed
 
-        if self.maps[current_seed] is None:
-            map_config = config["map_config"]
-            map_config.update({"seed": current_seed})
-            map_config = self.add_random_to_map(map_config)
-            map = self.spawn_object(PGMap, map_config=map_config, random_seed=None)
+        map = self.maps.get(current_seed)
+        if map is None:
+            map = self.generate_map(current_seed)
             self.current_map = map
             if self.engine.global_config["store_map"]:
                 self.maps[current_seed] = map
         else:
-            map = self.maps[current_seed]
             self.load_map(map)
 
+    def get_map_config(self, seed):
+        map_config = self.engine.global_config["map_config"].copy()
+        map_config.update({"seed": seed})
+        return self.add_random_to_map(map_config)
+
+    def generate_map(self, seed):
+        """
+        Generate the map of a seed. If the map is loaded from file, it is created from the loaded block sequence
+        """
+        if seed in self.loaded_map_data:
+            map_data = self.loaded_map_data[seed]
+            # block configs are consumed when creating blocks
+            map_config = copy.deepcopy(map_data["map_config"])
+            map_config[PGMap.GENERATE_TYPE] = MapGenerateMethod.PG_MAP_FILE
+            map_config[PGMap.GENERATE_CONFIG] = copy.deepcopy(map_data[PGMap.BLOCK_SEQUENCE])
+        else:
+            map_config = self.get_map_config(seed)
+        return self.spawn_object(PGMap, map_config=map_config, random_seed=None)
+
     def add_random_to_map(self, map_config):
         if self.engine.global_config["random_lane_width"]:
             map_config[PGMap.LANE_WIDTH
@@ -78,36 +143,65 @@ class PGMapManager(BaseManager):
         Call this function to generate all maps before using them
         """
         for seed in tqdm(self.maps.keys(), desc="Generate maps"):
-            config = self.engine.global_config.copy()
             current_seed = seed
             self.engine.seed(seed)
             if self.maps[current_seed] is None:
-                map_config = config["map_config"]
-                map_config.update({"seed": current_seed})
-                map_config = self.add_random_to_map(map_config)
-                map = self.spawn_object(PGMap, map_config=map_config, random_seed=None)
+                map = self.generate_map(current_seed)
                 self.maps[current_seed] = map
                 map.detach_from_world()
 
-    def dump_all_maps(self, file_name=None):
+    def dump_all_maps(self, file_name=None, num_workers=None):
         """
-        Dump all maps. If some maps are not generated, we will generate it at first
+        Dump all maps. If some maps are not generated, we will generate it at first. When the number or bytes of
+        stored maps are limited, maps not stored are generated one at a time and destroyed after dumping, so that they
+        neither exceed the budget nor evict the current map
+        :param file_name: the file to save maps
+        :param num_workers: if set, block sequences of maps not stored are searched by this number of processes without
+        creating maps in world. These maps are dumped without map features, which are not required by load_all_maps()
+        :return: the dumped data of all maps
         """
         if file_name is None:
             start_seed = self.engine.global_config["start_seed"]
             end_seed = start_seed + self.engine.global_config["num_scenarios"]
             file_name = "{}_{}_{}.json".format(start_seed, end_seed, get_time_str())
-        self.generate_all_maps()
+        store_generated_maps = self.maps.max_num is None and self.maps.max_bytes is None
         ret = {}
-        for seed, map in tqdm(self.maps.items(), desc="Dump maps"):
+        to_search = {}
+        for seed in tqdm(self.maps.keys(), desc="Dump maps"):
+            map = self.maps[seed]
+            if map is not None:
+                ret[seed] = map.get_meta_data()
+                continue
+            self.engine.seed(seed)
+            if num_workers is not None and seed not in self.loaded_map_data:
+                map_config = self.get_map_config(seed)
+                if map_config[PGMap.GENERATE_TYPE] in [BigGenerateMethod.BLOCK_NUM, BigGenerateMethod.BLOCK_SEQUENCE]:
+                    # keep maps in the order of seeds
+                    ret[seed] = None
+                    to_search[seed] = config_to_dict(map_config)
+                    continue
+            map = self.generate_map(seed)
+            map.detach_from_world()
             ret[seed] = map.get_meta_data()
+            if store_generated_maps:
+                self.maps[seed] = map
+            else:
+                map.destroy()
+        if len(to_search) > 0:
+            block_dist_config = self.engine.global_config["block_dist_config"]
+            args = [(map_config, block_dist_config) for map_config in to_search.values()]
+            with mp.get_context("spawn").Pool(max(min(num_workers, len(args)), 1)) as pool:
+                for seed, block_sequence in tqdm(pool.imap_unordered(_search_block_sequence_in_process, args),
+                                                 total=len(args), desc="Search maps"):
+                    ret[seed] = {PGMap.BLOCK_SEQUENCE: block_sequence, "map_config": to_search[seed]}
         with open(file_name, "wb+") as file:
             pickle.dump(ret, file)
         return ret
 
-    def load_all_maps(self, file_name):
-        if self.current_map is not None:
-            self.unload_map(self.current_map)
+    def read_map_file(self, file_name):
+        """
+        Read maps dumped by dump_all_maps(). Maps are created from the loaded block sequences when they are used
+        """
         with open(file_name, "rb") as file:
             loaded_map_data = pickle.load(file)
         map_seeds = list(loaded_map_data.keys())
@@ -118,28 +212,39 @@ class PGMapManager(BaseManager):
         ], "The environment num and start seed in config: {}, {} must be the same as the env num and start seed: {}, {} in the loaded file".format(
             self.env_num, self.start_seed, map_num, start_seed
         )
+        self.loaded_map_data = loaded_map_data
+        return loaded_map_data
 
-        for i in tqdm(range(self.env_num), desc="Load maps"):
-            loaded_seed = i + start_seed
-            map_data = loaded_map_data[loaded_seed]
-            block_sequence = map_data["block_sequence"]
-            map_config = map_data["map_config"]
-            map_config[PGMap.GENERATE_TYPE] = MapGenerateMethod.PG_MAP_FILE
-            map_config[PGMap.GENERATE_CONFIG] = block_sequence
-            map = self.spawn_object(PGMap, map_config=map_config, random_seed=None)
-            self.maps[i + self.start_seed] = map
-            map.detach_from_world()
+    def load_all_maps(self, file_name, lazy=False):
+        """
+        Load maps dumped by dump_all_maps(). Stored maps are replaced by the loaded ones
+        :param file_name: the dumped file
+        :param lazy: if True, a map is created when it is used for the first time, otherwise all maps are created now
+        :return: the loaded data of all maps
+        """
+        if self.current_map is not None:
+            self.unload_map(self.current_map)
+        self.maps.clear()
+        loaded_map_data = self.read_map_file(file_name)
+        if not lazy:
+            for seed in tqdm(self.maps.keys(), desc="Load maps"):
+                map = self.generate_map(seed)
+                self.maps[seed] = map
+                map.detach_from_world()
         self.reset()
         return loaded_map_data
 
+    def get_map_store_stats(self):
+        """
+        Return hits, misses and evictions of stored maps, as well as the number and estimated bytes of stored maps
+        """
+        return self.maps.get_stats()
+
     def clear_stored_maps(self):
         """
         Clear all stored maps
         """
-        for m in self.maps.values():
-            if m is not None:
-                m.detach_from_world()
-                m.destroy()
+        self.maps.clear()
         start_seed = self.start_seed = self.engine.global_config["start_seed"]
         env_num = self.env_num = self.engine.global_config["num_scenarios"]
-        self.maps = {_seed: None for _seed in range(start_seed, start_seed + env_num)}
+        self.maps = self._create_map_store(range(start_seed, start_seed + env_num))
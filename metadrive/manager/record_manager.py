@@ -1,10 +1,12 @@
 import copy
+import os
 from metadrive.utils.utils import get_time_str
 import logging
 
 from metadrive.base_class.base_object import BaseObject
 from metadrive.constants import ObjectState, PolicyState
 from metadrive.manager.base_manager import BaseManager
+from metadrive.scenario.columnar_episode import ColumnarEpisode, ColumnarEpisodeWriter
 from metadrive.utils.utils import is_map_related_instance, is_map_related_class
 
 
@@ -34,7 +36,8 @@ class FrameInfo:
 
 class RecordManager(BaseManager):
     """
-    Record the episode information for replay or reloading episode
+    Record the episode information for replay or reloading episode. If config["record_episode_dir"] is set, frames are
+    streamed to a columnar episode file in that folder once the next step begins, instead of being kept in memory
     """
     PRIORITY = 100  # lowest priority
 
@@ -47,8 +50,13 @@ class RecordManager(BaseManager):
         # for debug, we don't allow assign the same id to different vehicles
         # previous recycling mechanism will bring such issue, which is fixed now
         self._episode_obj_names = set()
+        # for streaming frames to a columnar episode file
+        self._writer = None
+        self._pending_frames = None
+        self._num_streamed_episodes = 0
 
     def before_reset(self):
+        self._close_writer()
         if self.engine.record_episode:
             self.episode_info = {}
             self._episode_obj_names = set()
@@ -73,6 +81,8 @@ class RecordManager(BaseManager):
             self.collect_objects_states()
             self.collect_manager_states()
             self.collect_manager_metadata()
+            if self.engine.global_config.get("record_episode_dir", None) is not None:
+                self._open_writer()
             self.current_frames = None
             self.reset_frame = None
             self.current_frame_count = 0
@@ -94,7 +104,33 @@ class RecordManager(BaseManager):
             ret[manager.class_name] = mgr_state
         self.current_frame.manager_info = ret
 
+    def _open_writer(self):
+        record_dir = self.engine.global_config["record_episode_dir"]
+        os.makedirs(record_dir, exist_ok=True)
+        file_name = "seed_{}_{}_{}.pkl".format(self.engine.global_seed, get_time_str(), self._num_streamed_episodes)
+        self._num_streamed_episodes += 1
+        self._pending_frames = self.episode_info.pop("frame")[0]
+        self._writer = ColumnarEpisodeWriter(
+            os.path.join(record_dir, file_name),
+            self.episode_info,
+            chunk_size=self.engine.global_config.get("record_chunk_size", 500)
+        )
+
+    def _write_pending_frames(self):
+        # frames of a step are written when the next step begins, since spawn or clear info may be added to them later
+        if self._pending_frames is not None:
+            self._writer.add_frames(self._pending_frames)
+            self._pending_frames = None
+
+    def _close_writer(self):
+        if self._writer is not None:
+            self._write_pending_frames()
+            self._writer.close()
+            self._writer = None
+
     def before_step(self, *args, **kwargs) -> dict:
+        if self._writer is not None:
+            self._write_pending_frames()
         if self.engine.record_episode:
             self.current_frames = [
                 FrameInfo(self.engine.episode_step) for _ in range(self.engine.global_config["decision_repeat"])
@@ -115,7 +151,10 @@ class RecordManager(BaseManager):
         if self.engine.record_episode and self.current_frame_count:
             self.step()
             assert len(self.current_frames) == self.engine.global_config["decision_repeat"], "Number of Frame Mismatch!"
-            self.episode_info["frame"].append(self.current_frames)
+            if self._writer is not None:
+                self._pending_frames = self.current_frames
+            else:
+                self.episode_info["frame"].append(self.current_frames)
         return {}
 
     def collect_objects_states(self):
@@ -127,14 +166,23 @@ class RecordManager(BaseManager):
                     self.current_frame.policy_info[name] = policy_mapping[name].get_state()
 
         self.current_frame.agents = list(self.engine.agents.keys())
-        self.current_frame._agent_to_object = copy.deepcopy(self.engine.agent_manager._agent_to_object)
-        self.current_frame._object_to_agent = copy.deepcopy(self.engine.agent_manager._object_to_agent)
+        # mappings between names, which are strings, so shallow copies are enough
+        self.current_frame._agent_to_object = dict(self.engine.agent_manager._agent_to_object)
+        self.current_frame._object_to_agent = dict(self.engine.agent_manager._object_to_agent)
 
     def get_episode_metadata(self):
+        """
+        Return the recorded episode, which is a ColumnarEpisode if frames are streamed to a file
+        """
         assert self.engine.record_episode, "Turn on recording episode and then dump it"
+        if self._writer is not None:
+            self._write_pending_frames()
+            self._writer.flush()
+            return ColumnarEpisode(self._writer.file_path)
         return copy.deepcopy(self.episode_info)
 
     def destroy(self):
+        self._close_writer()
         self.episode_info = None
 
     def add_spawn_info(self, obj, object_class, kwargs):
@@ -1,11 +1,12 @@
 import copy
 import os
-from metadrive.utils.config import Config
-import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 from metadrive.manager.base_manager import BaseManager
-from metadrive.scenario.scenario_description import ScenarioDescription as SD, MetaDriveType
-from metadrive.scenario.utils import read_scenario_data, read_dataset_summary
+from metadrive.scenario.scenario_description import ScenarioDescription as SD
+from metadrive.scenario.utils import read_scenario_data, read_dataset_summary, read_difficulty_index
+from metadrive.utils.config import Config
 
 
 class ScenarioDataManager(BaseManager):
@@ -32,6 +33,11 @@ class ScenarioDataManager(BaseManager):
         ]
         self._scenarios = {}
 
+        # prefetch upcoming scenarios in a background thread
+        self.num_prefetch = self.engine.global_config["prefetch_scenarios"]
+        self._prefetch_executor = None
+        self._prefetched = OrderedDict()
+
         # Read summary file first:
         self.summary_dict, self.summary_lookup, self.mapping = read_dataset_summary(self.directory)
         self.summary_lookup[:self.start_scenario_index] = [None] * self.start_scenario_index
@@ -76,8 +82,12 @@ class ScenarioDataManager(BaseManager):
 
     def get_scenario(self, i, should_copy=False):
         if i not in self._scenarios:
-            ret = self._get_scenario(i)
+            if i in self._prefetched:
+                ret = self._prefetched.pop(i).result()
+            else:
+                ret = self._get_scenario(i)
             self._scenarios[i] = ret
+            self._prefetch(i)
         else:
             ret = self._scenarios[i]
         self.coverage[i - self.start_scenario_index] = 1
@@ -88,6 +98,43 @@ class ScenarioDataManager(BaseManager):
 
         return ret
 
+    def _upcoming_scenario_indices(self, i):
+        """
+        Scenarios this worker will visit after scenario i with sequential seeds in the current curriculum level
+        """
+        level_start = self.start_scenario_index + self.engine.current_level * self.engine.num_scenarios_per_level
+        level_end = level_start + self.engine.num_scenarios_per_level
+        indices = [idx for idx in self.available_scenario_indices if level_start <= idx < level_end]
+        if i not in indices:
+            return []
+        pos = indices.index(i)
+        return [indices[(pos + k) % len(indices)] for k in range(1, min(self.num_prefetch, len(indices) - 1) + 1)]
+
+    def _prefetch(self, i):
+        """
+        Load the upcoming scenarios of scenario i in the background. At most num_prefetch scenarios are kept and the
+        least recently requested ones are dropped
+        """
+        if self.num_prefetch <= 0:
+            return
+        if self._prefetch_executor is None:
+            self._prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ScenarioPrefetch")
+        for idx in self._upcoming_scenario_indices(i):
+            if idx in self._scenarios:
+                continue
+            if idx in self._prefetched:
+                self._prefetched.move_to_end(idx)
+            else:
+                self._prefetched[idx] = self._prefetch_executor.submit(self._get_scenario, idx)
+        while len(self._prefetched) > self.num_prefetch:
+            _, future = self._prefetched.popitem(last=False)
+            future.cancel()
+
+    def _clear_prefetched_scenarios(self):
+        for future in self._prefetched.values():
+            future.cancel()
+        self._prefetched = OrderedDict()
+
     def get_metadata(self):
         state = super(ScenarioDataManager, self).get_metadata()
         raw_data = self.current_scenario
@@ -105,7 +152,8 @@ class ScenarioDataManager(BaseManager):
     def sort_scenarios(self):
         """
         TODO(LQY): consider exposing this API to config
-        Sort scenarios to support curriculum training. You are encouraged to customize your own sort method
+        Sort scenarios to support curriculum training. You are encouraged to customize your own sort method.
+        The statistics are read from the difficulty index of the dataset, which is created when it doesn't exist
         :return: sorted scenario list
         """
         if self.engine.max_level == 0:
@@ -113,37 +161,24 @@ class ScenarioDataManager(BaseManager):
         elif self.engine.max_level == 1:
             return
 
+        start = self.start_scenario_index
+        end = self.start_scenario_index + self.num_scenarios
+        difficulty_index = read_difficulty_index(self.directory, self.summary_lookup[start:end])
+
         def _score(scenario_id):
-            file_path = os.path.join(self.directory, self.mapping[scenario_id], scenario_id)
-            scenario = read_scenario_data(file_path, centralize=True)
             obj_weight = 0
+            difficulty = difficulty_index[scenario_id]
+            return difficulty[SD.DIFFICULTY.SDC_MOVING_DIST] * difficulty[SD.DIFFICULTY.CURVATURE] + \
+                difficulty[SD.DIFFICULTY.NUM_MOVING_VEHICLES] * obj_weight
 
-            # calculate curvature
-            ego_car_id = scenario[SD.METADATA][SD.SDC_ID]
-            state_dict = scenario["tracks"][ego_car_id]["state"]
-            valid_track = state_dict["position"][np.where(state_dict["valid"].astype(int))][..., :2]
-
-            dir = valid_track[1:] - valid_track[:-1]
-            dir = np.arctan2(dir[..., 1], dir[..., 0])
-            curvature = sum(abs(dir[1:] - dir[:-1]) / np.pi) + 1
-
-            sdc_moving_dist = SD.sdc_moving_dist(scenario)
-            num_moving_objs = SD.num_moving_object(scenario, object_type=MetaDriveType.VEHICLE)
-            return sdc_moving_dist * curvature + num_moving_objs * obj_weight, scenario
-
-        start = self.start_scenario_index
-        end = self.start_scenario_index + self.num_scenarios
-        id_score_scenarios = [(s_id, *_score(s_id)) for s_id in self.summary_lookup[start:end]]
-        id_score_scenarios = sorted(id_score_scenarios, key=lambda scenario: scenario[-2])
-        self.summary_lookup[start:end] = [id_score_scenario[0] for id_score_scenario in id_score_scenarios]
-        self.scenario_difficulty = {
-            id_score_scenario[0]: id_score_scenario[1]
-            for id_score_scenario in id_score_scenarios
-        }
-        self._scenarios = {i + start: id_score_scenario[-1] for i, id_score_scenario in enumerate(id_score_scenarios)}
+        id_scores = [(s_id, _score(s_id)) for s_id in self.summary_lookup[start:end]]
+        id_scores = sorted(id_scores, key=lambda id_score: id_score[-1])
+        self.summary_lookup[start:end] = [id_score[0] for id_score in id_scores]
+        self.scenario_difficulty = {id_score[0]: id_score[1] for id_score in id_scores}
 
     def clear_stored_scenarios(self):
         self._scenarios = {}
+        self._clear_prefetched_scenarios()
 
     @property
     def current_scenario_difficulty(self):
@@ -168,6 +203,11 @@ class ScenarioDataManager(BaseManager):
         """
         super(ScenarioDataManager, self).destroy()
         self._scenarios = {}
+        # pending prefetches are cancelled, and the running one should finish before clearing the lookup tables
+        self._clear_prefetched_scenarios()
+        if self._prefetch_executor is not None:
+            self._prefetch_executor.shutdown(wait=True)
+            self._prefetch_executor = None
         Config.clear_nested_dict(self.summary_dict)
         self.summary_lookup.clear()
         self.mapping.clear()
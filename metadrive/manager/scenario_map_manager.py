@@ -1,5 +1,6 @@
 import copy
 
+from metadrive.component.map.map_store import MapStore
 from metadrive.component.map.scenario_map import ScenarioMap
 from metadrive.constants import DEFAULT_AGENT
 from metadrive.manager.base_manager import BaseManager
@@ -20,10 +21,7 @@ class ScenarioMapManager(BaseManager):
         self._no_map = self.engine.global_config["no_map"]
         self.map_num = self.engine.global_config["num_scenarios"]
         self.start_scenario_index = self.engine.global_config["start_scenario_index"]
-        self._stored_maps = {
-            i: None
-            for i in range(self.start_scenario_index, self.start_scenario_index + self.map_num)
-        }
+        self._stored_maps = self._create_map_store()
 
         # we put the route searching function here
         self.sdc_start_point = None
@@ -31,6 +29,13 @@ class ScenarioMapManager(BaseManager):
         self.sdc_dest_point = None
         self.current_sdc_route = None
 
+    def _create_map_store(self):
+        return MapStore(
+            range(self.start_scenario_index, self.start_scenario_index + self.map_num),
+            max_num=self.engine.global_config.get("store_map_max_num", None),
+            max_bytes=self.engine.global_config.get("store_map_max_bytes", None)
+        )
+
     def reset(self):
         if not self._no_map:
             seed = self.engine.global_random_seed
@@ -39,13 +44,12 @@ class ScenarioMapManager(BaseManager):
             self.current_sdc_route = None
             self.sdc_dest_point = None
 
-            if self._stored_maps[seed] is None:
+            new_map = self._stored_maps.get(seed)
+            if new_map is None:
                 m_data = self.engine.data_manager.get_scenario(seed, should_copy=False)["map_features"]
                 new_map = ScenarioMap(map_index=seed, map_data=m_data)
                 if self.store_map:
                     self._stored_maps[seed] = new_map
-            else:
-                new_map = self._stored_maps[seed]
             self.load_map(new_map)
         self.update_route()
 
@@ -86,19 +90,18 @@ class ScenarioMapManager(BaseManager):
         self.sdc_start_point = copy.deepcopy(init_position)
         self.sdc_dest_point = copy.deepcopy(last_position)
 
+        # Config.update() copies values, so the arrays of the scenario are not shared
         self.engine.global_config.update(
-            copy.deepcopy(
-                dict(
-                    agent_configs={
-                        DEFAULT_AGENT: dict(
-                            spawn_position_heading=(list(init_position), init_yaw),
-                            spawn_velocity=init_state["velocity"],
-                            width=init_state["width"],
-                            length=init_state["length"],
-                            height=init_state["height"],
-                        )
-                    }
-                )
+            dict(
+                agent_configs={
+                    DEFAULT_AGENT: dict(
+                        spawn_position_heading=(list(init_position), init_yaw),
+                        spawn_velocity=init_state["velocity"],
+                        width=init_state["width"],
+                        length=init_state["length"],
+                        height=init_state["height"],
+                    )
+                }
             )
         )
 
@@ -151,15 +154,14 @@ class ScenarioMapManager(BaseManager):
         self.current_map = None
 
     def clear_stored_maps(self):
-        for m in self._stored_maps.values():
-            if m is not None:
-                m.detach_from_world()
-                m.destroy()
-        self._stored_maps = {
-            i: None
-            for i in range(self.start_scenario_index, self.start_scenario_index + self.map_num)
-        }
+        self._stored_maps.clear()
 
     @property
     def num_stored_maps(self):
-        return sum([1 if m is not None else 0 for m in self.engine.map_manager._stored_maps.values()])
+        return self._stored_maps.num_stored_maps
+
+    def get_map_store_stats(self):
+        """
+        Return hits, misses and evictions of stored maps, as well as the number and estimated bytes of stored maps
+        """
+        return self._stored_maps.get_stats()
@@ -56,6 +56,11 @@ class ScenarioTrafficManager(BaseManager):
         self.idm_policy_count = 0
         self._obj_to_clean_this_frame = []
 
+        # spawn timeline, see _build_spawn_timeline()
+        self._spawn_timeline = []
+        self._track_order = {}
+        self._pending_tracks = set()
+
         # some flags
         self.even_sample_v = self.engine.global_config.get("even_sample_vehicle_class", None)
         if self.even_sample_v is not None:
@@ -92,46 +97,99 @@ class ScenarioTrafficManager(BaseManager):
         self._noise_object_id = set()
         self._non_noise_object_id = set()
         self.idm_policy_count = 0
+        self._build_spawn_timeline()
         for scenario_id, track in self.current_traffic_data.items():
             if scenario_id == self.sdc_scenario_id:
                 continue
-            if track["type"] == MetaDriveType.VEHICLE:
-                self.spawn_vehicle(scenario_id, track)
-            elif track["type"] == MetaDriveType.CYCLIST:
-                self.spawn_cyclist(scenario_id, track)
-            elif track["type"] == MetaDriveType.PEDESTRIAN:
-                self.spawn_pedestrian(scenario_id, track)
-            elif track["type"] in [MetaDriveType.TRAFFIC_CONE, MetaDriveType.TRAFFIC_BARRIER]:
-                cls = TrafficBarrier if track["type"] == MetaDriveType.TRAFFIC_BARRIER else TrafficCone
-                self.spawn_static_object(cls, scenario_id, track)
-            else:
+            if not self._spawn_track(scenario_id, track):
                 logger.warning("Do not support {}".format(track["type"]))
 
+    def _spawn_track(self, scenario_id, track):
+        """
+        Spawn the object of a track if it is valid at current step and not filtered
+        :return: False if the type of this track is not supported
+        """
+        if track["type"] == MetaDriveType.VEHICLE:
+            self.spawn_vehicle(scenario_id, track)
+        elif track["type"] == MetaDriveType.CYCLIST:
+            self.spawn_cyclist(scenario_id, track)
+        elif track["type"] == MetaDriveType.PEDESTRIAN:
+            self.spawn_pedestrian(scenario_id, track)
+        elif track["type"] in [MetaDriveType.TRAFFIC_CONE, MetaDriveType.TRAFFIC_BARRIER]:
+            cls = TrafficBarrier if track["type"] == MetaDriveType.TRAFFIC_BARRIER else TrafficCone
+            self.spawn_static_object(cls, scenario_id, track)
+        else:
+            return False
+        return True
+
+    def _build_spawn_timeline(self):
+        """
+        Compile the valid masks of tracks into a timeline, where self._spawn_timeline[t] lists tracks becoming valid at
+        step t in the order of tracks. Tracks valid at step 0 are spawned in after_reset(). Tracks are only spawned when
+        they are valid, so each step only tries to spawn tracks which appear at this step or are valid but not spawned
+        yet, e.g. filtered for overlapping the ego car, instead of walking through all tracks
+        """
+        length = self.current_scenario_length
+        self._spawn_timeline = [[] for _ in range(length)]
+        self._track_order = {}
+        self._pending_tracks = set()
+        supported_types = [
+            MetaDriveType.VEHICLE, MetaDriveType.CYCLIST, MetaDriveType.PEDESTRIAN, MetaDriveType.TRAFFIC_CONE,
+            MetaDriveType.TRAFFIC_BARRIER
+        ]
+        for order, (scenario_id, track) in enumerate(self.current_traffic_data.items()):
+            if scenario_id == self.sdc_scenario_id or track["type"] not in supported_types:
+                continue
+            self._track_order[scenario_id] = order
+            valid = np.asarray(track["state"]["valid"], dtype=bool).reshape(-1)
+            if len(valid) == 0:
+                continue
+            if len(valid) < length:
+                # the last state is used for steps after the end of a track, see _is_track_valid()
+                valid = np.concatenate([valid, np.repeat(valid[-1], length - len(valid))])
+            if valid[0]:
+                self._pending_tracks.add(scenario_id)
+            for step in np.flatnonzero(valid[1:length] & ~valid[:length - 1]) + 1:
+                self._spawn_timeline[step].append(scenario_id)
+
+    def _is_track_valid(self, scenario_id, step):
+        valid = self.current_traffic_data[scenario_id]["state"]["valid"]
+        # the last state is used for steps after the end of a track, like parse_object_state() does
+        return bool(valid[min(step, len(valid) - 1)])
+
+    def _is_track_filtered(self, scenario_id):
+        """
+        Whether a track is never spawned no matter where the ego car is, i.e. noisy static objects and static vehicles
+        when no_static_vehicles=True
+        """
+        return scenario_id in self._noise_object_id or \
+               (self.engine.global_config["no_static_vehicles"] and scenario_id in self._static_car_id)
+
     def after_step(self, *args, **kwargs):
         if self.episode_step < self.current_scenario_length:
             replay_done = False
-            for scenario_id, track in self.current_traffic_data.items():
-                if scenario_id == self.sdc_scenario_id:
-                    continue
-                if scenario_id not in self._scenario_id_to_obj_id:
-                    if track["type"] == MetaDriveType.VEHICLE:
-                        self.spawn_vehicle(scenario_id, track)
-                    elif track["type"] == MetaDriveType.CYCLIST:
-                        self.spawn_cyclist(scenario_id, track)
-                    elif track["type"] == MetaDriveType.PEDESTRIAN:
-                        self.spawn_pedestrian(scenario_id, track)
-                    elif track["type"] in [MetaDriveType.TRAFFIC_CONE, MetaDriveType.TRAFFIC_BARRIER]:
-                        cls = TrafficBarrier if track["type"] == MetaDriveType.TRAFFIC_BARRIER else TrafficCone
-                        self.spawn_static_object(cls, scenario_id, track)
-                    else:
-                        logger.info("Do not support {}".format(track["type"]))
-                elif self.has_policy(self._scenario_id_to_obj_id[scenario_id], ReplayTrafficParticipantPolicy):
+            # replay spawned objects, objects spawned in this step already act when spawning
+            invalid_tracks = []
+            for scenario_id, obj_id in self._scenario_id_to_obj_id.items():
+                if self.has_policy(obj_id, ReplayTrafficParticipantPolicy):
                     # static object will not be cleaned!
-                    policy = self.get_policy(self._scenario_id_to_obj_id[scenario_id])
+                    policy = self.get_policy(obj_id)
                     if policy.is_current_step_valid:
                         policy.act()
                     else:
-                        self._obj_to_clean_this_frame.append(scenario_id)
+                        invalid_tracks.append(scenario_id)
+            # clean objects in the order of tracks
+            self._obj_to_clean_this_frame += sorted(invalid_tracks, key=self._track_order.__getitem__)
+
+            # spawn tracks appearing at this step and valid tracks not spawned yet
+            step = self.episode_step
+            self._pending_tracks.update(self._spawn_timeline[step])
+            for scenario_id in sorted(self._pending_tracks, key=self._track_order.__getitem__):
+                if scenario_id not in self._scenario_id_to_obj_id and self._is_track_valid(scenario_id, step):
+                    self._spawn_track(scenario_id, self.current_traffic_data[scenario_id])
+                    if scenario_id not in self._scenario_id_to_obj_id and not self._is_track_filtered(scenario_id):
+                        continue
+                self._pending_tracks.discard(scenario_id)
         else:
             replay_done = True
             # clean replay vehicle
@@ -144,6 +202,8 @@ class ScenarioTrafficManager(BaseManager):
             _scenario_id = self._obj_id_to_scenario_id.pop(obj_id)
             assert _scenario_id == scenario_id
             self.clear_objects([obj_id])
+            # the track can be spawned again once it is valid, e.g. vehicles arriving at destinations with IDM policy
+            self._pending_tracks.add(scenario_id)
 
         return dict(default_agent=dict(replay_done=replay_done))
 
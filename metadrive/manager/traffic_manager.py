@@ -10,6 +10,7 @@ from metadrive.component.lane.abs_lane import AbstractLane
 from metadrive.component.map.base_map import BaseMap
 from metadrive.component.road_network import Road
 from metadrive.component.vehicle.base_vehicle import BaseVehicle
+from metadrive.component.vehicle_model.bicycle_model import BicycleModel
 from metadrive.constants import TARGET_VEHICLES, TRAFFIC_VEHICLES, OBJECT_TO_AGENT, AGENT_TO_OBJECT
 from metadrive.manager.base_manager import BaseManager
 from metadrive.utils import merge_dicts
@@ -48,6 +49,13 @@ class PGTrafficManager(BaseManager):
         self.density = self.engine.global_config["traffic_density"]
         self.respawn_lanes = None
 
+        # move traffic vehicles with the bicycle model instead of simulating them in the physics world
+        self.kinematic_traffic = self.engine.global_config.get("kinematic_traffic", False)
+        self._kinematic_models = {}
+
+        # find surrounding objects and compute IDM accelerations for all traffic vehicles together
+        self.batch_traffic_policy = self.engine.global_config.get("batch_traffic_policy", False)
+
     def reset(self):
         """
         Generate traffic on map, according to the mode and density
@@ -86,11 +94,81 @@ class PGTrafficManager(BaseManager):
                     if ego_road == self.block_triggered_vehicles[-1].trigger_road:
                         block_vehicles = self.block_triggered_vehicles.pop()
                         self._traffic_vehicles += list(self.get_objects(block_vehicles.vehicles).values())
-        for v in self._traffic_vehicles:
-            p = self.engine.get_policy(v.name)
-            v.before_step(p.act())
+        if self.batch_traffic_policy:
+            from metadrive.policy.idm_policy import IDMPolicy
+            policies = [self.engine.get_policy(v.name) for v in self._traffic_vehicles]
+            actions = IDMPolicy.batch_act(policies, engine.get_objects().values())
+            for v, action in zip(self._traffic_vehicles, actions):
+                v.before_step(action)
+        else:
+            for v in self._traffic_vehicles:
+                p = self.engine.get_policy(v.name)
+                v.before_step(p.act())
         return dict()
 
+    def step(self, *args, **kwargs):
+        """
+        Advance kinematic traffic vehicles for one physics world step with their latest actions
+        """
+        if not self.kinematic_traffic:
+            return
+        dt = self.engine.global_config["physics_world_step_size"]
+        for v in self._traffic_vehicles:
+            if v.id not in self._kinematic_models:
+                self._add_kinematic_model(v)
+            state = self._kinematic_models[v.id].predict(dt, (v.throttle_brake, v.steering))
+            v.set_position((state["x"], state["y"]))
+            v.set_heading_theta(state["heading_theta"])
+            direction = state["heading_theta"] + state["velocity_dir"]
+            v.set_velocity((math.cos(direction), math.sin(direction)), state["speed"])
+
+    def spawn_object(self, object_class, **kwargs):
+        """
+        In kinematic traffic mode, vehicles become kinematic bodies in the physics world, whose transforms are set by
+        the bicycle model in step()
+        """
+        obj = super(PGTrafficManager, self).spawn_object(object_class, **kwargs)
+        if self.kinematic_traffic and isinstance(obj, BaseVehicle):
+            self._add_kinematic_model(obj)
+        return obj
+
+    def _add_kinematic_model(self, vehicle):
+        # the raycast vehicle is not simulated anymore, while the chassis still collides with the ego vehicle. Removing
+        # the vehicle from the physics world removes its chassis as well, so the chassis is attached again
+        vehicle.dynamic_nodes.remove(vehicle.system)
+        if vehicle.dynamic_nodes.attached:
+            self.engine.physics_world.dynamic_world.remove(vehicle.system)
+            self.engine.physics_world.dynamic_world.attach(vehicle.body)
+        vehicle.body.setKinematic(True)
+        model = BicycleModel()
+        model.reset(*vehicle.position, speed=vehicle.speed, heading_theta=vehicle.heading_theta, velocity_dir=0)
+        self._kinematic_models[vehicle.id] = model
+
+    def _remove_kinematic_model(self, vehicle):
+        vehicle.body.setKinematic(False)
+        # the raycast vehicle is the first dynamic node, see BaseVehicle._create_vehicle_chassis()
+        vehicle.dynamic_nodes.insert(0, vehicle.system)
+        if vehicle.dynamic_nodes.attached:
+            self.engine.physics_world.dynamic_world.attach(vehicle.system)
+
+    def clear_objects(self, filter, *args, **kwargs):
+        # recycled vehicles may be spawned by other managers, so restore them to dynamic bodies before being recycled
+        # or destroyed
+        if isinstance(filter, (list, tuple)):
+            obj_ids = [obj_id for obj_id in filter if obj_id in self._kinematic_models]
+        else:
+            obj_ids = [
+                obj_id for obj_id in self._kinematic_models
+                if obj_id in self.spawned_objects and filter(self.spawned_objects[obj_id])
+            ]
+        for obj_id in obj_ids:
+            if obj_id in self.spawned_objects:
+                self._remove_kinematic_model(self.spawned_objects[obj_id])
+        exclude_objects = super(PGTrafficManager, self).clear_objects(filter, *args, **kwargs)
+        for obj_id in exclude_objects:
+            self._kinematic_models.pop(obj_id, None)
+        return exclude_objects
+
     def after_step(self, *args, **kwargs):
         """
         Update all traffic vehicles' states,
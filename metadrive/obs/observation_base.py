@@ -29,6 +29,17 @@ class BaseObservation(ABC):
     def observe(self, *args, **kwargs):
         raise NotImplementedError
 
+    @classmethod
+    def observe_batch(cls, observations, vehicles):
+        """
+        Observe a batch of vehicles, each with its own observation instance of this class. Override it to share
+        computation among vehicles
+        :param observations: a list of observation instances
+        :param vehicles: a list of vehicles
+        :return: a list of observations
+        """
+        return [observation.observe(vehicle) for observation, vehicle in zip(observations, vehicles)]
+
     def reset(self, env, vehicle=None):
         pass
 
@@ -207,6 +207,59 @@ class LidarStateObservation(BaseObservation):
         ret = self.current_observation
         return ret.astype(np.float32)
 
+    @classmethod
+    def observe_batch(cls, observations, vehicles):
+        """
+        The same as calling observe() for each vehicle. Vehicles with the same lidar config perceive together, so that
+        lidar masks are computed for all vehicles at once and each surrounding vehicle's states are read only once
+        """
+        if len(vehicles) == 0:
+            return []
+        engine = observations[0].engine
+        lidar = engine.get_sensor("lidar")
+        groups = {}
+        for i, vehicle in enumerate(vehicles):
+            config = vehicle.config["lidar"]
+            if config["num_lasers"] > 0 and config["distance"] > 0:
+                key = (
+                    config["num_lasers"], config["distance"], config["num_others"], config["add_others_navi"],
+                    vehicle.config["show_lidar"]
+                )
+                groups.setdefault(key, []).append(i)
+        cloud_points = [None] * len(vehicles)
+        detected_objects = [None] * len(vehicles)
+        other_v_infos = [[] for _ in vehicles]
+        for (num_lasers, distance, num_others, add_others_navi, show), indices in groups.items():
+            group = [vehicles[i] for i in indices]
+            group_cloud_points, group_detected_objects = lidar.perceive_batch(
+                group, engine.physics_world.dynamic_world, num_lasers=num_lasers, distance=distance, show=show
+            )
+            if num_others > 0:
+                group_infos = lidar.get_surrounding_vehicles_info_batch(
+                    group, group_detected_objects, distance, num_others, add_others_navi
+                )
+            else:
+                group_infos = [[] for _ in group]
+            for i, points, objs, info in zip(indices, group_cloud_points, group_detected_objects, group_infos):
+                cloud_points[i], detected_objects[i], other_v_infos[i] = points, objs, info
+
+        ret = []
+        for i, (observation, vehicle) in enumerate(zip(observations, vehicles)):
+            state = observation.state_observe(vehicle)
+            other_v_info = other_v_infos[i]
+            if cloud_points[i] is not None:
+                # noise is added in the order of vehicles, so the random numbers are the same as calling observe()
+                other_v_info = other_v_info + observation._add_noise_to_cloud_points(
+                    cloud_points[i],
+                    gaussian_noise=vehicle.config["lidar"]["gaussian_noise"],
+                    dropout_prob=vehicle.config["lidar"]["dropout_prob"]
+                )
+                observation.cloud_points = cloud_points[i]
+                observation.detected_objects = detected_objects[i]
+            observation.current_observation = np.concatenate((state, np.asarray(other_v_info)))
+            ret.append(observation.current_observation.astype(np.float32))
+        return ret
+
     def state_observe(self, vehicle):
         return self.state_obs.observe(vehicle)
 
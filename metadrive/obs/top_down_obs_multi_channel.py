@@ -1,5 +1,8 @@
-from collections import deque
+import sys
+import weakref
+from collections import deque, OrderedDict
 
+import cv2
 import gymnasium as gym
 import math
 import numpy as np
@@ -88,41 +91,50 @@ class TopDownMultiChannel(TopDownObservation):
         """
         # Setup the maximize size of the canvas
         # scaling and center can be easily found by bounding box
-        b_box = self.road_network.get_bounding_box()
         self.canvas_navigation.fill(COLOR_BLACK)
         self.canvas_ego.fill(COLOR_BLACK)
         self.canvas_road_network.fill(COLOR_BLACK)
         self.canvas_runtime.fill(COLOR_BLACK)
         self.canvas_background.fill(COLOR_BLACK)
         self.canvas_background.set_colorkey(self.canvas_background.BLACK)
+        scaling, centering_pos = self._get_map_scaling_and_center()
+
+        # real-world distance * scaling = pixel in canvas
+        for canvas in [self.canvas_background, self.canvas_runtime, self.canvas_navigation, self.canvas_ego,
+                       self.canvas_road_network]:
+            canvas.scaling = scaling
+            canvas.move_display_window_to(centering_pos)
+
+        self.draw_navigation(self.canvas_background)
+        self.draw_road_lines(self.canvas_background)
+
+        self.canvas_road_network.blit(self.canvas_background, (0, 0))
+        self.obs_window.reset(self.canvas_runtime)
+        self._should_draw_map = False
+
+    def _get_map_scaling_and_center(self):
+        """
+        :return: the scaling (pixel per meter) and center of a canvas in MAP_RESOLUTION containing the whole map
+        """
+        b_box = self.road_network.get_bounding_box()
         x_len = b_box[1] - b_box[0]
         y_len = b_box[3] - b_box[2]
         max_len = max(x_len, y_len) + 20  # Add more 20 meters
         scaling = self.MAP_RESOLUTION[1] / max_len - 0.1
         assert scaling > 0
-
-        # real-world distance * scaling = pixel in canvas
-        self.canvas_background.scaling = scaling
-        self.canvas_runtime.scaling = scaling
-        self.canvas_navigation.scaling = scaling
-        self.canvas_ego.scaling = scaling
-        self.canvas_road_network.scaling = scaling
-
         centering_pos = ((b_box[0] + b_box[1]) / 2, (b_box[2] + b_box[3]) / 2)
-        self.canvas_runtime.move_display_window_to(centering_pos)
-        self.canvas_navigation.move_display_window_to(centering_pos)
-        self.canvas_ego.move_display_window_to(centering_pos)
-        self.canvas_background.move_display_window_to(centering_pos)
-        self.canvas_road_network.move_display_window_to(centering_pos)
+        return scaling, centering_pos
 
+    def draw_navigation(self, canvas):
         if isinstance(self.target_vehicle.navigation, NodeNetworkNavigation):
-            self.draw_navigation_node(self.canvas_background, (64, 64, 64))
+            self.draw_navigation_node(canvas, (64, 64, 64))
         elif isinstance(self.target_vehicle.navigation, EdgeNetworkNavigation):
             # TODO: draw edge network navigation
             pass
         elif isinstance(self.target_vehicle.navigation, TrajectoryNavigation):
-            self.draw_navigation_trajectory(self.canvas_background, (64, 64, 64))
+            self.draw_navigation_trajectory(canvas, (64, 64, 64))
 
+    def draw_road_lines(self, canvas):
         if isinstance(self.road_network, NodeRoadNetwork):
             for _from in self.road_network.graph.keys():
                 decoration = True if _from == Decoration.start else False
@@ -130,18 +142,14 @@ class TopDownMultiChannel(TopDownObservation):
                     for l in self.road_network.graph[_from][_to]:
                         two_side = True if l is self.road_network.graph[_from][_to][-1] or decoration else False
                         LaneGraphics.LANE_LINE_WIDTH = 0.5
-                        LaneGraphics.display(l, self.canvas_background, two_side)
+                        LaneGraphics.display(l, canvas, two_side)
         elif hasattr(self.engine, "map_manager"):
             for data in self.engine.map_manager.current_map.blocks[-1].map_data.values():
                 if ScenarioDescription.POLYLINE in data:
                     LaneGraphics.display_scenario_line(
-                        data[ScenarioDescription.POLYLINE], data[ScenarioDescription.TYPE], self.canvas_background
+                        data[ScenarioDescription.POLYLINE], data[ScenarioDescription.TYPE], canvas
                     )
 
-        self.canvas_road_network.blit(self.canvas_background, (0, 0))
-        self.obs_window.reset(self.canvas_runtime)
-        self._should_draw_map = False
-
     def _refresh(self, canvas, pos, clip_size):
         canvas.set_clip((pos[0] - clip_size[0] / 2, pos[1] - clip_size[1] / 2, clip_size[0], clip_size[1]))
         canvas.fill(COLOR_BLACK)
@@ -305,3 +313,187 @@ class TopDownMultiChannel(TopDownObservation):
             return gym.spaces.Box(-0.0, 1.0, shape=shape, dtype=np.float32)
         else:
             return gym.spaces.Box(0, 255, shape=shape, dtype=np.uint8)
+
+
+class TopDownMultiChannelCV2(TopDownMultiChannel):
+    """
+    The same observation as TopDownMultiChannel, but rasterized with NumPy and OpenCV instead of pygame surfaces.
+    Lane lines are drawn once per map into a grayscale raster, which is cached, and the navigation is drawn once per
+    episode. In each step, the raster is warped to the ego view, and boxes of all objects are filled in one call into a
+    preallocated ring buffer of the history traffic frames. The view is transformed in the same way as
+    ObservationWindow, so the two implementations are interchangeable.
+    """
+    ROAD_RASTER_CACHE_SIZE = 10  # the number of maps whose road rasters are cached
+    TRAFFIC_COLOR = 176  # ObjectGraphics.BLUE in grayscale
+
+    def __init__(self, *args, **kwargs):
+        super(TopDownMultiChannelCV2, self).__init__(*args, **kwargs)
+        self._road_raster_cache = OrderedDict()
+        self._map_raster = None
+        self._pix_to_world = None
+        self._traffic_buffer = np.zeros(
+            (self.stack_traffic_flow.maxlen, self.resolution[1], self.resolution[0]), dtype=np.uint8
+        )
+        self._traffic_index = 0
+        self._road_network_buffer = np.zeros((self.resolution[1] * 2, self.resolution[0] * 2), dtype=np.uint8)
+        self._past_pos_buffer = np.zeros((self.resolution[1], self.resolution[0]), dtype=np.uint8)
+
+    def init_obs_window(self):
+        self.obs_window = None
+
+    def init_canvas(self):
+        # only used to draw lane lines and navigation
+        self.canvas_background = WorldSurface(self.MAP_RESOLUTION, 0, pygame.Surface(self.MAP_RESOLUTION))
+
+    @staticmethod
+    def _to_grayscale(surface):
+        img = np.ascontiguousarray(pygame.surfarray.array3d(surface).transpose((1, 0, 2)))
+        return cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+
+    def _get_road_raster(self):
+        key = id(self.road_network)
+        if key in self._road_raster_cache and self._road_raster_cache[key][0]() is self.road_network:
+            self._road_raster_cache.move_to_end(key)
+            return self._road_raster_cache[key][1]
+        self.canvas_background.fill(COLOR_BLACK)
+        self.draw_road_lines(self.canvas_background)
+        raster = self._to_grayscale(self.canvas_background)
+        self._road_raster_cache[key] = (weakref.ref(self.road_network), raster)
+        if len(self._road_raster_cache) > self.ROAD_RASTER_CACHE_SIZE:
+            self._road_raster_cache.popitem(last=False)
+        return raster
+
+    def draw_map(self):
+        scaling, centering_pos = self._get_map_scaling_and_center()
+        self.canvas_background.scaling = scaling
+        self.canvas_background.move_display_window_to(centering_pos)
+        road_raster = self._get_road_raster()
+
+        # navigation is drawn below lane lines
+        self.canvas_background.fill(COLOR_BLACK)
+        self.draw_navigation(self.canvas_background)
+        self._map_raster = np.where(road_raster > 0, road_raster, self._to_grayscale(self.canvas_background))
+
+        # pixel (col, row) in the raster -> world position
+        origin = self.canvas_background.origin
+        self._pix_to_world = np.array(
+            [
+                [1 / scaling, 0, origin[0]],
+                [0, -1 / scaling, self.MAP_RESOLUTION[1] / scaling + origin[1]],
+                [0, 0, 1],
+            ]
+        )
+        self._should_draw_map = False
+
+    def _world_to_view(self, position, heading, size):
+        """
+        The affine transform from world positions to pixels (col, row) in a view of the given size centered at the
+        ego. It rotates the world in the same way as ObservationWindow
+        """
+        ratio = size / (2 * self.max_distance)
+        sin, cos = math.sin(heading), math.cos(heading)
+        return np.array(
+            [
+                [-ratio * sin, -ratio * cos, size / 2 + ratio * (position[0] * sin + position[1] * cos)],
+                [-ratio * cos, ratio * sin, size / 2 + ratio * (position[0] * cos - position[1] * sin)],
+            ]
+        )
+
+    def _draw_road_network(self, position, heading):
+        size = self._road_network_buffer.shape[0]
+        transform = self._world_to_view(position, heading, size) @ self._pix_to_world
+        cv2.warpAffine(self._map_raster, transform, (size, size), dst=self._road_network_buffer, flags=cv2.INTER_LINEAR)
+        # downsample like pygame.transform.smoothscale, and add the road network to itself to double it with saturation
+        img = cv2.resize(self._road_network_buffer, self.resolution, interpolation=cv2.INTER_AREA)
+        return cv2.add(img, img)
+
+    def _draw_traffic_flow(self, vehicle, position, heading, canvas):
+        canvas.fill(0)
+        objects = [
+            v for v in self.engine.
+            get_objects(lambda o: isinstance(o, BaseVehicle) or isinstance(o, BaseTrafficParticipant)).values()
+            if v is not vehicle
+        ]
+        if len(objects) == 0:
+            return
+        positions = np.array([v.position for v in objects], dtype=np.float64)
+        visible = np.linalg.norm(positions - position, axis=1) < 2 * self.max_distance
+        if not visible.any():
+            return
+        objects = [v for v, v_visible in zip(objects, visible) if v_visible]
+        positions = positions[visible]
+        headings = np.array([v.heading_theta for v in objects])
+        headings[np.abs(headings) <= 2 * np.pi / 180] = 0
+        half_size = np.array([[v.LENGTH / 2, v.WIDTH / 2] for v in objects])
+
+        # corners of boxes in world coordinates, [num_objects, 4, 2]
+        signs = np.array([[-1, -1], [-1, 1], [1, 1], [1, -1]])
+        local = signs[None] * half_size[:, None]
+        sin, cos = np.sin(headings)[:, None], np.cos(headings)[:, None]
+        corners = np.stack(
+            [local[..., 0] * cos - local[..., 1] * sin, local[..., 0] * sin + local[..., 1] * cos], axis=-1
+        ) + positions[:, None]
+
+        transform = self._world_to_view(position, heading, self.resolution[0])
+        pixels = corners @ transform[:, :2].T + transform[:, 2]
+        cv2.fillPoly(canvas, list(np.round(pixels).astype(np.int32)), self.TRAFFIC_COLOR)
+
+    def _draw_past_pos(self, position, heading):
+        self._past_pos_buffer.fill(0)
+        heading = heading if abs(heading) > 2 * np.pi / 180 else 0
+        past_pos = np.array([self.stack_past_pos[i] for i in self._get_stack_indices(len(self.stack_past_pos))])
+        diff = (past_pos - position) * self.scaling
+
+        # the same as rotating pygame.math.Vector2 in TopDownMultiChannel.draw_scene
+        angle = np.deg2rad(np.rad2deg(heading) + 90)
+        sin, cos = math.sin(angle), math.cos(angle)
+        col = diff[:, 1] * sin + diff[:, 0] * cos + self.resolution[0] / 2
+        row = diff[:, 1] * cos - diff[:, 0] * sin + self.resolution[1] / 2
+        col = np.trunc(np.clip(col, -self.resolution[0], self.resolution[0])).astype(int)
+        row = np.trunc(np.clip(row, -self.resolution[1], self.resolution[1])).astype(int)
+        inside = (col >= 0) & (col < self.resolution[0]) & (row >= 0) & (row < self.resolution[1])
+        self._past_pos_buffer[row[inside], col[inside]] = 255
+        return self._past_pos_buffer
+
+    def observe(self, vehicle: BaseVehicle):
+        if self._should_draw_map:
+            self.draw_map()
+        assert len(self.engine.agents) == 1, "Don't support multi-agent top-down observation yet!"
+        vehicle = self.engine.agents[DEFAULT_AGENT]
+        position = np.asarray(vehicle.position, dtype=np.float64)
+        heading = vehicle.heading_theta
+
+        if self._should_fill_stack:
+            self.stack_past_pos.clear()
+        self.stack_past_pos.append(position)
+        self._traffic_index = (self._traffic_index + 1) % len(self._traffic_buffer)
+        self._draw_traffic_flow(vehicle, position, heading, self._traffic_buffer[self._traffic_index])
+        if self._should_fill_stack:
+            self._traffic_buffer[:] = self._traffic_buffer[self._traffic_index]
+            self._should_fill_stack = False
+
+        indices = [
+            (self._traffic_index - i * self.frame_skip) % len(self._traffic_buffer) for i in range(self.frame_stack)
+        ]
+        img = np.stack(
+            [self._draw_road_network(position, heading),
+             self._draw_past_pos(position, heading)] + [self._traffic_buffer[i] for i in indices],
+            axis=2
+        )
+        if self.onscreen:
+            self._display(img)
+        if self.norm_pixel:
+            return img.astype(np.float32) / 255
+        return img
+
+    def _display(self, img):
+        for event in pygame.event.get():
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                sys.exit()
+        screen = np.zeros(img.shape[:2] + (3, ), dtype=np.uint8)
+        screen[img[..., 0] > 0] = COLOR_WHITE[:3]
+        screen[img[..., 2] > 0] = (255, 0, 0)
+        screen[img[..., 1] > 0] = (0, 255, 0)
+        surface = pygame.surfarray.make_surface(screen.transpose((1, 0, 2)))
+        pygame.transform.smoothscale(surface, self.screen.get_size(), self.screen)
+        pygame.display.flip()
@@ -1,7 +1,12 @@
+import bisect
+import copy
+
 import numpy as np
+from metadrive.base_class.base_object import BaseObject
 from metadrive.component.traffic_light.base_traffic_light import BaseTrafficLight
 from metadrive.component.lane.point_lane import PointLane
 from metadrive.component.vehicle.PID_controller import PIDController
+from metadrive.constants import CollisionGroup
 from metadrive.policy.base_policy import BasePolicy
 from metadrive.policy.manual_control_policy import ManualControlPolicy
 from metadrive.utils.math import not_zero, wrap_to_pi, norm
@@ -91,6 +96,8 @@ class FrontBackObjects:
         left_lane = ref_lanes[idx - 1] if ref_lanes is not None and idx > 0 else None
         right_lane = ref_lanes[idx + 1] if ref_lanes is not None and idx + 1 < len(ref_lanes) else None
         lanes = [left_lane, lane, right_lane]
+        if isinstance(objs, LaneOccupancyTable):
+            return objs.find_front_back_objs(lanes, position, max_distance, cls)
 
         min_front_long = [max_distance if lane is not None else None for lane in lanes]
         min_back_long = [max_distance if lane is not None else None for lane in lanes]
@@ -175,6 +182,144 @@ class FrontBackObjects:
         return cls(front_ret, back_ret, min_front_long, min_back_long)
 
 
+class LaneOccupancyTable:
+    """
+    Objects grouped by their lanes and sorted by their longitudinal positions on the lanes. It is built once per step for
+    all traffic vehicles, so that the front/back objects of each vehicle are found by binary search, instead of running a
+    Bullet contact test and calling lane.local_coordinates() for every surrounding object on every lane. It can be passed
+    to FrontBackObjects.get_find_front_back_objs() in place of the surrounding objects.
+
+    Objects on the same lane take precedence over objects on the next/previous lanes, which is what the loop in
+    get_find_front_back_objs() returns as long as objects are located on their lanes. The lidar range is not checked,
+    since objects within max_distance along the lanes are always inside it.
+    """
+    # the same threshold as AbstractLane.is_previous_lane_of()
+    CONNECTION_ERROR_REGION = 1e-1
+
+    def __init__(self, objects):
+        """
+        :param objects: objects having the attribute lane, e.g. vehicles, traffic objects and traffic lights
+        """
+        self.excluded = None
+        lane_objects = {}
+        for obj in objects:
+            lane = getattr(obj, "lane", None)
+            if lane is None:
+                continue
+            _, longs, objs = lane_objects.setdefault(id(lane), (lane, [], []))
+            longs.append(lane.local_coordinates(obj.position)[0])
+            objs.append(obj)
+
+        self.lanes = []
+        self.longs = []
+        self.objects = []
+        self._rows = {}
+        for lane, longs, objs in lane_objects.values():
+            order = sorted(range(len(longs)), key=longs.__getitem__)
+            self._rows[id(lane)] = len(self.lanes)
+            self.lanes.append(lane)
+            self.longs.append([longs[i] for i in order])
+            self.objects.append([objs[i] for i in order])
+        self._starts = np.array([lane.start[:2] for lane in self.lanes], dtype=float).reshape(-1, 2)
+        self._ends = np.array([lane.end[:2] for lane in self.lanes], dtype=float).reshape(-1, 2)
+        self._next_rows = {}
+        self._previous_rows = {}
+
+    def __len__(self):
+        return sum(len(objs) for objs in self.objects)
+
+    def exclude(self, obj):
+        """
+        A view of this table without one object, usually the vehicle asking for its surrounding objects
+        """
+        view = copy.copy(self)
+        view.excluded = obj
+        return view
+
+    def find_front_back_objs(self, lanes, position, max_distance, cls=FrontBackObjects):
+        """
+        Same as FrontBackObjects.get_find_front_back_objs()
+        :param lanes: [left lane, lane, right lane], where left/right lane can be None
+        """
+        min_front_long = [max_distance if lane is not None else None for lane in lanes]
+        min_back_long = [max_distance if lane is not None else None for lane in lanes]
+        front_ret = [None, None, None]
+        back_ret = [None, None, None]
+        for i, lane in enumerate(lanes):
+            if lane is None:
+                continue
+            current_long = lane.local_coordinates(position)[0]
+            front_ret[i], min_front_long[i] = self._find_front(lane, current_long, max_distance)
+            back_ret[i], min_back_long[i] = self._find_back(lane, current_long, max_distance)
+        return cls(front_ret, back_ret, min_front_long, min_back_long)
+
+    def _find_front(self, lane, current_long, max_distance):
+        row = self._rows.get(id(lane))
+        if row is not None:
+            obj, long = self._first_after(row, current_long)
+            if obj is not None and long - current_long < max_distance:
+                return obj, long - current_long
+        ret = None
+        min_long = max_distance
+        left_long = lane.length - current_long
+        for row in self._get_next_rows(lane):
+            obj, long = self._first_after(row, -left_long)
+            if obj is not None and min_long > long + left_long > 0:
+                ret = obj
+                min_long = long + left_long
+        return ret, min_long
+
+    def _find_back(self, lane, current_long, max_distance):
+        row = self._rows.get(id(lane))
+        if row is not None:
+            obj, long = self._last_before(row, current_long)
+            if obj is not None and current_long - long < max_distance:
+                return obj, current_long - long
+        ret = None
+        min_long = max_distance
+        for row in self._get_previous_rows(lane):
+            obj, long = self._last_before(row, None)
+            if obj is not None and min_long > self.lanes[row].length - long + current_long:
+                ret = obj
+                min_long = self.lanes[row].length - long + current_long
+        return ret, min_long
+
+    def _first_after(self, row, long):
+        """
+        The object with the smallest longitudinal position larger than long on a lane
+        """
+        longs, objs = self.longs[row], self.objects[row]
+        i = bisect.bisect_right(longs, long)
+        while i < len(objs) and objs[i] is self.excluded:
+            i += 1
+        return (objs[i], longs[i]) if i < len(objs) else (None, None)
+
+    def _last_before(self, row, long):
+        """
+        The object with the largest longitudinal position smaller than long on a lane. All objects are considered if
+        long is None
+        """
+        longs, objs = self.longs[row], self.objects[row]
+        i = (bisect.bisect_left(longs, long) if long is not None else len(longs)) - 1
+        while i >= 0 and objs[i] is self.excluded:
+            i -= 1
+        return (objs[i], longs[i]) if i >= 0 else (None, None)
+
+    def _get_next_rows(self, lane):
+        if id(lane) not in self._next_rows:
+            dist = np.hypot(*(self._starts - np.asarray(lane.end[:2])).T)
+            rows = np.where(dist < self.CONNECTION_ERROR_REGION)[0]
+            self._next_rows[id(lane)] = [row for row in rows.tolist() if self.lanes[row] is not lane]
+        return self._next_rows[id(lane)]
+
+    def _get_previous_rows(self, lane):
+        if id(lane) not in self._previous_rows:
+            dist = np.hypot(*(self._ends - np.asarray(lane.start[:2])).T)
+            rows = np.where(dist < self.CONNECTION_ERROR_REGION)[0]
+            self._previous_rows[id(lane)] = [row for row in rows.tolist() if self.lanes[row] is not lane]
+        return self._previous_rows[id(lane)]
+
+
 class IDMPolicy(BasePolicy):
     """
     We implement this policy based on the HighwayEnv code base.
@@ -182,6 +327,9 @@ class IDMPolicy(BasePolicy):
 
     DEBUG_MARK_COLOR = (219, 3, 252, 255)
 
+    # batch_act() replaces these methods by the vectorized ones, so it is only used if none of them is overridden
+    BATCH_ACT_METHODS = ("act", "acceleration", "lane_change_policy", "get_acc_front_and_target_lane")
+
     TAU_ACC = 0.6  # [s]
     TAU_HEADING = 0.3  # [s]
     TAU_LATERAL = 0.8  # [s]
@@ -237,6 +385,22 @@ class IDMPolicy(BasePolicy):
         # concat lane
         success = self.move_to_next_road()
         all_objects = self.control_object.lidar.get_surrounding_objects(self.control_object)
+        acc_front_obj, acc_front_dist, steering_target_lane = self.get_acc_front_and_target_lane(success, all_objects)
+
+        # control by PID and IDM
+        steering = self.steering_control(steering_target_lane)
+        acc = self.acceleration(acc_front_obj, acc_front_dist)
+        action = [steering, acc]
+        self.action_info["action"] = action
+        return action
+
+    def get_acc_front_and_target_lane(self, success, all_objects):
+        """
+        Decide the lane to follow and the front object for computing the acceleration
+        :param success: whether the routing target lane is in the current reference lanes
+        :param all_objects: surrounding objects or a LaneOccupancyTable
+        :return: front object, distance to the front object, target lane
+        """
         try:
             if success and self.enable_lane_change:
                 # perform lane change due to routing
@@ -259,13 +423,89 @@ class IDMPolicy(BasePolicy):
             steering_target_lane = self.routing_target_lane
             # logging.warning("IDM bug! fall back")
             # print("IDM bug! fall back")
+        return acc_front_obj, acc_front_dist, steering_target_lane
 
-        # control by PID and IDM
-        steering = self.steering_control(steering_target_lane)
-        acc = self.acceleration(acc_front_obj, acc_front_dist)
-        action = [steering, acc]
-        self.action_info["action"] = action
-        return action
+    @classmethod
+    def batch_act(cls, policies, objects):
+        """
+        Compute actions for a list of policies at once. For IDMPolicy, surrounding objects are found in a
+        LaneOccupancyTable shared by all vehicles and the accelerations are computed together by batch_acceleration().
+        Other policies, including subclasses overriding any method in BATCH_ACT_METHODS, still call their own act().
+        :param policies: a list of policies
+        :param objects: all objects in the scene, e.g. engine.get_objects().values()
+        :return: a list of actions
+        """
+        actions = [None] * len(policies)
+        batch = []
+        for i, policy in enumerate(policies):
+            if cls.can_batch_act(policy):
+                batch.append(i)
+            else:
+                actions[i] = policy.act()
+        if len(batch) == 0:
+            return actions
+
+        # objects which can be detected by the broad phase detector in Lidar.get_surrounding_objects()
+        mask = CollisionGroup.can_be_lidar_detected()
+        table = LaneOccupancyTable(
+            obj for obj in objects if isinstance(obj, BaseObject) and obj.is_attached()
+            and not (obj.origin.node().getIntoCollideMask() & mask).isZero()
+        )
+        batch_policies = [policies[i] for i in batch]
+        plans = []
+        for policy in batch_policies:
+            success = policy.move_to_next_road()
+            plans.append(policy.get_acc_front_and_target_lane(success, table.exclude(policy.control_object)))
+        accelerations = cls.batch_acceleration(batch_policies, [plan[0] for plan in plans], [plan[1] for plan in plans])
+        for i, policy, plan, acc in zip(batch, batch_policies, plans, accelerations):
+            action = [policy.steering_control(plan[2]), acc]
+            policy.action_info["action"] = action
+            actions[i] = action
+        return actions
+
+    @staticmethod
+    def can_batch_act(policy):
+        """
+        Return True if the action of the policy can be computed by batch_act()
+        """
+        return isinstance(policy, IDMPolicy) and all(
+            getattr(type(policy), name) is getattr(IDMPolicy, name) for name in IDMPolicy.BATCH_ACT_METHODS
+        )
+
+    @staticmethod
+    def batch_acceleration(policies, front_objs, dists_to_front):
+        """
+        Vectorized acceleration() for a list of IDMPolicy
+        :param policies: a list of IDMPolicy
+        :param front_objs: front object of each policy, None if there is no front object
+        :param dists_to_front: distance to the front object of each policy
+        :return: a list of accelerations
+        """
+        acc_factor = np.array([p.ACC_FACTOR for p in policies], dtype=float)
+        speed = np.array([p.control_object.speed_km_h for p in policies], dtype=float)
+        target_speed = np.array([p.target_speed for p in policies], dtype=float)
+        delta = np.array([p.DELTA for p in policies], dtype=float)
+        acceleration = acc_factor * (1 - np.power(np.maximum(speed, 0) / target_speed, delta))
+
+        rows = [
+            i for i, (p, front_obj) in enumerate(zip(policies, front_objs))
+            if front_obj and (not p.disable_idm_deceleration)
+        ]
+        if len(rows) > 0:
+            ps = [policies[i] for i in rows]
+            d0 = np.array([p.DISTANCE_WANTED for p in ps], dtype=float)
+            tau = np.array([p.TIME_WANTED for p in ps], dtype=float)
+            ab = np.array([-p.ACC_FACTOR * p.DEACC_FACTOR for p in ps], dtype=float)
+            ego_velocity = np.array([p.control_object.velocity_km_h for p in ps], dtype=float)
+            front_velocity = np.array([front_objs[i].velocity_km_h for i in rows], dtype=float)
+            heading = np.array([p.control_object.heading for p in ps], dtype=float)
+            dv = np.sum((ego_velocity - front_velocity) * heading, axis=1)
+            d_star = d0 + speed[rows] * tau + speed[rows] * dv / (2 * np.sqrt(ab))
+            d = np.array([dists_to_front[i] for i in rows], dtype=float)
+            # not_zero(d)
+            d = np.where(np.abs(d) > 1e-2, d, np.where(d > 0, 1e-2, -1e-2))
+            acceleration[rows] -= acc_factor[rows] * ((d_star / d)**2)
+        return acceleration.tolist()
 
     def move_to_next_road(self):
         # routing target lane is in current ref lanes
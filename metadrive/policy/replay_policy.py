@@ -1,7 +1,7 @@
 import logging
 
 from metadrive.policy.base_policy import BasePolicy
-from metadrive.scenario.parse_object_state import parse_object_state
+from metadrive.scenario.parse_object_state import parse_trajectory
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -22,47 +22,43 @@ class ReplayTrafficParticipantPolicy(BasePolicy):
 
     @property
     def is_current_step_valid(self):
-        return self.traj_info[self.episode_step] is not None
+        index = int(self.episode_step)
+        return 0 <= index < len(self.traj_info["valid"]) and bool(self.traj_info["valid"][index])
 
     def get_trajectory_info(self, track):
-        ret = []
-        for i in range(self.engine.data_manager.current_scenario_length):
-            # a trick for saving computation
-            if i < self.episode_step:
-                ret.append(None)
-            else:
-                state = parse_object_state(track, i)
-                if not state["valid"]:
-                    ret.append(None)
-                else:
-                    ret.append(state)
+        """
+        States of all steps are parsed once into arrays, see parse_trajectory(). Steps before the current one are marked
+        invalid, as they will never be replayed
+        """
+        ret = parse_trajectory(track, length=self.engine.data_manager.current_scenario_length)
+        ret["valid"] = ret["valid"].copy()
+        ret["valid"][:max(int(self.episode_step), 0)] = False
         return ret
 
     def act(self, *args, **kwargs):
         index = max(int(self.episode_step), 0)
-        if index >= len(self.traj_info):
+        info = self.traj_info
+        if index >= len(info["valid"]):
             return None
 
-        info = self.traj_info[index]
-
         # Before step
         # Warning by LQY: Don't call before step here! Before step should be called by manager
         # action = self.traj_info[int(self.episode_step)].get("action", None)
         # self.control_object.before_step(action)
 
-        if not bool(info["valid"]):
+        if not bool(info["valid"][index]):
             return None  # Return None action so the base vehicle will not overwrite the steering & throttle
 
         if "throttle_brake" in info:
             if hasattr(self.control_object, "set_throttle_brake"):
-                self.control_object.set_throttle_brake(float(info["throttle_brake"].item()))
+                self.control_object.set_throttle_brake(float(info["throttle_brake"][index].item()))
         if "steering" in info:
             if hasattr(self.control_object, "set_steering"):
-                self.control_object.set_steering(float(info["steering"].item()))
-        self.control_object.set_position(info["position"])
-        self.control_object.set_velocity(info["velocity"], in_local_frame=self._velocity_local_frame)
-        self.control_object.set_heading_theta(info["heading"])
-        self.control_object.set_angular_velocity(info["angular_velocity"])
+                self.control_object.set_steering(float(info["steering"][index].item()))
+        self.control_object.set_position(info["position"][index])
+        self.control_object.set_velocity(info["velocity"][index], in_local_frame=self._velocity_local_frame)
+        self.control_object.set_heading_theta(float(info["heading"][index]))
+        self.control_object.set_angular_velocity(float(info["angular_velocity"][index]))
 
         # If set_static, then the agent will not "fall from the sky".
         # However, the physics engine will not update the position of the agent.
@@ -80,10 +76,4 @@ class ReplayEgoCarPolicy(ReplayTrafficParticipantPolicy):
         # Directly get trajectory from data manager
         trajectory_data = self.engine.data_manager.current_scenario["tracks"]
         sdc_track_index = str(self.engine.data_manager.current_scenario["metadata"]["sdc_id"])
-        ret = []
-        for i in range(len(trajectory_data[sdc_track_index]["state"]["position"])):
-            ret.append(parse_object_state(
-                trajectory_data[sdc_track_index],
-                i,
-            ))
-        return ret
+        return parse_trajectory(trajectory_data[sdc_track_index])
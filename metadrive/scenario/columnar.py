@@ -0,0 +1,171 @@
+"""
+A memory-mapped columnar storage for scenarios.
+
+A columnar scenario keeps the file name of the original scenario, e.g. `sd_waymo_v1.2_xxx.pkl`, so the dataset summary
+and mapping are reused as they are. The `.pkl` file only stores a small header, which is the scenario dict whose numeric
+arrays are replaced by ColumnRef. The arrays are concatenated by dtype and saved as flat `.npy` files in the folder
+`sd_waymo_v1.2_xxx.columns`. When reading, these files are opened by np.memmap and each array becomes a view of the
+memory map. Thus, only pages of accessed arrays are loaded from the disk, and multiple processes reading the same
+scenario share the page cache.
+
+Scenarios are centralized to the ego car's initial position when converted, so that reading them with centralize=True
+doesn't modify the arrays. The memory maps are opened in copy-on-write mode, so in-place modification still works but
+only changes the memory of the current process.
+
+Example:
+
+    convert_dataset_to_columnar("waymo_dataset", "waymo_dataset_columnar")
+    env = ScenarioEnv(dict(data_directory="waymo_dataset_columnar"))
+"""
+import os
+import pathlib
+import pickle
+import shutil
+from collections import namedtuple
+
+import numpy as np
+
+from metadrive.scenario.scenario_description import ScenarioDescription as SD
+
+COLUMNAR_VERSION = 1
+COLUMNAR_HEADER_KEY = "__metadrive_columnar__"
+COLUMNS_DIR_SUFFIX = ".columns"
+
+# A reference to an array stored in the column file of a dtype
+ColumnRef = namedtuple("ColumnRef", ["dtype", "offset", "shape"])
+
+
+def is_columnar_header(data):
+    """
+    Whether the unpickled data is the header of a columnar scenario
+    """
+    return isinstance(data, dict) and COLUMNAR_HEADER_KEY in data
+
+
+def get_columns_dir(file_path):
+    """
+    The folder storing the column files of a columnar scenario file
+    """
+    file_path = str(file_path)
+    return (file_path[:-len(".pkl")] if file_path.endswith(".pkl") else file_path) + COLUMNS_DIR_SUFFIX
+
+
+def _split_columns(obj, columns):
+    """
+    Replace numeric arrays in a nested dict/list with ColumnRef and collect them by dtype
+    """
+    if isinstance(obj, np.ndarray) and obj.dtype.kind in "biuf" and obj.size > 0:
+        dtype = obj.dtype.name
+        chunks, size = columns.setdefault(dtype, ([], [0]))
+        ref = ColumnRef(dtype, size[0], obj.shape)
+        chunks.append(np.ascontiguousarray(obj).reshape(-1))
+        size[0] += obj.size
+        return ref
+    if isinstance(obj, dict):
+        return {k: _split_columns(v, columns) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_split_columns(v, columns) for v in obj]
+    return obj
+
+
+def _join_columns(obj, memmaps):
+    """
+    Replace ColumnRef in a nested dict/list with views of the memory maps
+    """
+    if isinstance(obj, ColumnRef):
+        size = int(np.prod(obj.shape, dtype=np.int64))
+        return memmaps[obj.dtype][obj.offset:obj.offset + size].reshape(obj.shape)
+    if isinstance(obj, dict):
+        return {k: _join_columns(v, memmaps) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_join_columns(v, memmaps) for v in obj]
+    return obj
+
+
+def write_columnar_scenario(scenario, file_path, centralize=True):
+    """
+    Save a scenario in the columnar format.
+
+    Args:
+        scenario: the scenario description or a scenario dict
+        file_path: the path of the header file, which should be a scenario file name ending with `.pkl`
+        centralize: whether to centralize all elements to the ego car's initial position before saving
+    """
+    assert SD.is_scenario_file(file_path), "File: {} is not scenario file".format(file_path)
+    scenario = SD(scenario)
+    if centralize:
+        scenario = SD.centralize_to_ego_car_initial_position(scenario)
+    columns = {}
+    skeleton = _split_columns(dict(scenario), columns)
+
+    columns_dir = get_columns_dir(file_path)
+    if os.path.exists(columns_dir):
+        shutil.rmtree(columns_dir)
+    os.makedirs(columns_dir)
+    for dtype, (chunks, _) in columns.items():
+        np.save(os.path.join(columns_dir, dtype + ".npy"), np.concatenate(chunks))
+    with open(file_path, "wb") as f:
+        pickle.dump({COLUMNAR_HEADER_KEY: COLUMNAR_VERSION, "scenario": skeleton}, f)
+
+
+def read_columnar_scenario(file_path, header=None):
+    """
+    Read a columnar scenario. Arrays in the returned scenario are copy-on-write views of memory-mapped column files.
+
+    Args:
+        file_path: the path of the header file
+        header: the unpickled header. It will be loaded from file_path if not provided
+
+    Returns:
+        The Scenario Description instance of that scenario.
+    """
+    if header is None:
+        with open(file_path, "rb") as f:
+            header = pickle.load(f)
+    assert is_columnar_header(header), "File: {} is not a columnar scenario".format(file_path)
+    assert header[COLUMNAR_HEADER_KEY] <= COLUMNAR_VERSION, "Please update MetaDrive to read this columnar scenario"
+    columns_dir = get_columns_dir(file_path)
+    memmaps = {}
+    for file in os.listdir(columns_dir):
+        if file.endswith(".npy"):
+            # view as np.ndarray, so that slices behave like arrays loaded from pickle
+            memmaps[file[:-len(".npy")]] = np.load(os.path.join(columns_dir, file), mmap_mode="c").view(np.ndarray)
+    return SD(_join_columns(header["scenario"], memmaps))
+
+
+def convert_dataset_to_columnar(dataset_dir, output_dir, centralize=True):
+    """
+    Convert a ScenarioNet dataset to the columnar format. Scenarios in sub-folders are all saved to output_dir and the
+    dataset summary is copied.
+
+    Args:
+        dataset_dir: the root folder of the dataset, which has dataset_summary.pkl
+        output_dir: the folder to save the columnar dataset
+        centralize: whether to centralize scenarios to the ego car's initial position
+
+    Returns:
+        the number of converted scenarios
+    """
+    from metadrive.scenario.utils import read_dataset_summary, read_scenario_data
+    summary_dict, summary_list, mapping = read_dataset_summary(dataset_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    for file_name in summary_list:
+        scenario = read_scenario_data(os.path.join(dataset_dir, mapping[file_name], file_name))
+        write_columnar_scenario(scenario, os.path.join(output_dir, file_name), centralize=centralize)
+    with open(pathlib.Path(output_dir) / SD.DATASET.SUMMARY_FILE, "wb") as f:
+        pickle.dump(summary_dict, f)
+    with open(pathlib.Path(output_dir) / SD.DATASET.MAPPING_FILE, "wb") as f:
+        pickle.dump({file_name: "" for file_name in summary_list}, f)
+    return len(summary_list)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert a ScenarioNet dataset to the memory-mapped columnar format")
+    parser.add_argument("--dataset_dir", "-d", required=True, help="The root folder of the dataset")
+    parser.add_argument("--output_dir", "-o", required=True, help="The folder to save the columnar dataset")
+    parser.add_argument("--no_centralize", action="store_true", help="Don't centralize scenarios when converting")
+    args = parser.parse_args()
+    num = convert_dataset_to_columnar(args.dataset_dir, args.output_dir, centralize=not args.no_centralize)
+    print("Converted {} scenarios to: {}".format(num, args.output_dir))
@@ -0,0 +1,471 @@
+"""
+A columnar format for recorded episodes.
+
+By default, RecordManager keeps a FrameInfo with the state dict of every object for every physics step, until the
+episode is dumped. When config["record_episode_dir"] is set, the frames of each env step are streamed to a file in this
+format instead, so the memory cost doesn't grow with the episode length.
+
+A columnar episode file is a sequence of pickled dicts. The first one is the header storing the episode information
+except frames, e.g. map_data and global_config. Each following dict is a chunk of frames:
+
+    - Numeric values in the states of objects and policies, like position and heading, are appended to arrays. Each row
+      of the arrays is one object at one frame and is indexed by the frame and the slot of the object.
+    - Other values, like the object class and navigation info, as well as manager states and agent mappings of frames,
+      are stored only when they change.
+    - Spawn info, policy spawn info and clear info are stored for frames having them.
+
+ColumnarEpisode reads the file and can be used in place of the episode dict, i.e. as config["replay_episode"] and the
+input of convert_recorded_scenario_exported. Frames are restored to FrameInfo only when they are accessed.
+
+Example:
+
+    env = MetaDriveEnv(dict(record_episode=True, record_episode_dir="episodes"))
+    ...
+    episode = env.engine.dump_episode("episode.pkl")
+    # or episode = ColumnarEpisode("episode.pkl")
+    scenario = convert_recorded_scenario_exported(episode)
+"""
+import bisect
+import copy
+import pickle
+
+import numpy as np
+
+COLUMNAR_EPISODE_VERSION = 1
+COLUMNAR_EPISODE_KEY = "__metadrive_columnar_episode__"
+
+# Longer lists and tuples are not stored in arrays
+MAX_VECTOR_DIM = 16
+
+# the key order of a dict is stored as a change with this key
+_KEYS = "__keys__"
+_AGENT_KEYS = ("agents", "agent_to_object", "object_to_agent")
+_SPARSE_FIELDS = ("spawn_info", "policy_spawn_info", "clear_info")
+
+_SCALAR_SIGNATURES = {
+    bool: ("scalar", "bool", 1),
+    int: ("scalar", "int64", 1),
+    float: ("scalar", "float64", 1),
+    np.bool_: ("npscalar", "bool", 1),
+    np.int32: ("npscalar", "int32", 1),
+    np.int64: ("npscalar", "int64", 1),
+    np.float32: ("npscalar", "float32", 1),
+    np.float64: ("npscalar", "float64", 1),
+}
+_BOOL_TYPES = {bool, np.bool_}
+_INT_TYPES = {int, np.int32, np.int64}
+_NUMBER_TYPES = _INT_TYPES | {float, np.float32, np.float64}
+_INT64_MIN, _INT64_MAX = np.iinfo(np.int64).min, np.iinfo(np.int64).max
+
+
+def _numeric_signature(value):
+    """
+    The signature (container, dtype, dim) of a value stored in arrays, or None if the value is not numeric
+    """
+    signature = _SCALAR_SIGNATURES.get(type(value), None)
+    if signature is not None:
+        return signature if type(value) is not int or _INT64_MIN <= value <= _INT64_MAX else None
+    if isinstance(value, np.ndarray):
+        if value.ndim == 1 and 0 < value.size <= MAX_VECTOR_DIM and value.dtype.kind in "biuf":
+            return "ndarray", value.dtype.str, value.size
+        return None
+    if isinstance(value, (list, tuple)) and 0 < len(value) <= MAX_VECTOR_DIM:
+        container = "list" if isinstance(value, list) else "tuple"
+        types = set(map(type, value))
+        if types <= _BOOL_TYPES:
+            return container, "bool", len(value)
+        if types <= _INT_TYPES:
+            if int not in types or _INT64_MIN <= min(value) and max(value) <= _INT64_MAX:
+                return container, "int64", len(value)
+            return None
+        if types <= _NUMBER_TYPES:
+            return container, "float64", len(value)
+    return None
+
+
+def _restore_value(value, signature):
+    container = signature[0]
+    if container == "scalar":
+        return value[0].item()
+    if container == "npscalar":
+        return value[0]
+    if container == "list":
+        return value.tolist()
+    if container == "tuple":
+        return tuple(value.tolist())
+    return value.copy()
+
+
+def _is_same(old, new):
+    """
+    Whether two values are the same, including types, dtypes and the key order of dicts
+    """
+    if old is new:
+        return True
+    if type(old) is not type(new):
+        return False
+    if isinstance(old, np.ndarray):
+        return old.dtype == new.dtype and old.shape == new.shape and np.array_equal(old, new)
+    if isinstance(old, (list, tuple)):
+        return len(old) == len(new) and all(_is_same(a, b) for a, b in zip(old, new))
+    if isinstance(old, dict):
+        return list(old.keys()) == list(new.keys()) and all(_is_same(old[k], new[k]) for k in old)
+    try:
+        return bool(old == new)
+    except (ValueError, TypeError):
+        return False
+
+
+def is_columnar_episode(data):
+    """
+    Whether the unpickled data is the header of a columnar episode
+    """
+    return isinstance(data, dict) and COLUMNAR_EPISODE_KEY in data
+
+
+class _Changes:
+    """
+    Record dicts of owners, e.g. object slots, by storing the key order and values only when they change
+    """
+    def __init__(self):
+        self.last = {}
+        self.records = []
+
+    def record(self, frame, owner, keys, items):
+        last = self.last.setdefault(owner, {})
+        if last.get(_KEYS, None) != keys:
+            last[_KEYS] = keys
+            self.records.append((frame, owner, _KEYS, keys))
+        for key, value in items:
+            if key not in last or not _is_same(last[key], value):
+                value = copy.deepcopy(value)
+                last[key] = value
+                self.records.append((frame, owner, key, value))
+
+    def pop_records(self):
+        ret = self.records
+        self.records = []
+        return ret
+
+
+class _ChangeIndex:
+    def __init__(self, records):
+        self._index = {}
+        for frame, owner, key, value in records:
+            frames, values = self._index.setdefault((owner, key), ([], []))
+            frames.append(frame)
+            values.append(value)
+
+    def get(self, owner, key, frame, default=None):
+        """
+        The value of the key at the frame, i.e. the value of the latest change before or at the frame
+        """
+        if (owner, key) not in self._index:
+            return default
+        frames, values = self._index[(owner, key)]
+        i = bisect.bisect_right(frames, frame) - 1
+        return values[i] if i >= 0 else default
+
+
+class _StateTable:
+    """
+    States of objects or policies in frames. Numeric values are appended to columns, one row for one object at one
+    frame, and other values are recorded when they change. Columns are buffered as lists, since appending to lists is
+    much cheaper than writing array elements one by one, and converted to arrays once per chunk
+    """
+    def __init__(self):
+        self.frame = []
+        self.slot = []
+        # (key, signature) -> (rows, values)
+        self.columns = {}
+        self.changes = _Changes()
+
+    def add(self, frame, slot, state):
+        row = len(self.frame)
+        self.frame.append(frame)
+        self.slot.append(slot)
+        others = []
+        for key, value in state.items():
+            signature = _numeric_signature(value)
+            if signature is None:
+                others.append((key, value))
+                continue
+            column = self.columns.get((key, signature), None)
+            if column is None:
+                column = self.columns[(key, signature)] = ([], [])
+            column[0].append(row)
+            column[1].append(value)
+        self.changes.record(frame, slot, tuple(state.keys()), others)
+
+    def pop_chunk(self):
+        """
+        Return the rows added since the last call. Only rows having values are stored for each column
+        """
+        columns = {
+            (key, signature):
+            (np.asarray(rows, dtype=np.int64), np.asarray(values, dtype=signature[1]).reshape(len(rows), signature[2]))
+            for (key, signature), (rows, values) in self.columns.items()
+        }
+        chunk = dict(
+            frame=np.asarray(self.frame, dtype=np.int64),
+            slot=np.asarray(self.slot, dtype=np.int64),
+            columns=columns,
+            changes=self.changes.pop_records()
+        )
+        self.frame = []
+        self.slot = []
+        self.columns = {}
+        return chunk
+
+
+class _StateTableReader:
+    def __init__(self, chunks):
+        self.frame = np.concatenate([np.zeros(0, dtype=np.int64)] + [c["frame"] for c in chunks])
+        self.slot = np.concatenate([np.zeros(0, dtype=np.int64)] + [c["slot"] for c in chunks])
+        columns = {}
+        offset = 0
+        for chunk in chunks:
+            for key, (rows, values) in chunk["columns"].items():
+                columns.setdefault(key, ([], []))
+                columns[key][0].append(rows + offset)
+                columns[key][1].append(values)
+            offset += len(chunk["frame"])
+        self.columns = {key: (np.concatenate(rows), np.concatenate(values)) for key, (rows, values) in columns.items()}
+        for array in [self.frame, self.slot] + [a for v in self.columns.values() for a in v]:
+            array.flags.writeable = False
+        self.changes = _ChangeIndex([record for chunk in chunks for record in chunk["changes"]])
+
+    def get_states(self, frame, names):
+        """
+        Restore state dicts of all objects at a frame
+        :return: a dict mapping object name to state dict
+        """
+        lo, hi = (int(i) for i in np.searchsorted(self.frame, [frame, frame + 1]))
+        numeric = [dict() for _ in range(hi - lo)]
+        for (key, signature), (rows, values) in self.columns.items():
+            start, end = np.searchsorted(rows, [lo, hi])
+            for i in range(start, end):
+                numeric[rows[i] - lo][key] = _restore_value(values[i], signature)
+        ret = {}
+        for row in range(lo, hi):
+            slot = int(self.slot[row])
+            values = numeric[row - lo]
+            ret[names[slot]] = {
+                key: values[key] if key in values else copy.deepcopy(self.changes.get(slot, key, frame))
+                for key in self.changes.get(slot, _KEYS, frame, ())
+            }
+        return ret
+
+
+class ColumnarEpisodeWriter:
+    """
+    Stream frames of an episode to a columnar episode file. Frames are buffered and written every chunk_size frames
+    """
+    def __init__(self, file_path, episode_info, chunk_size=500):
+        """
+        :param file_path: the file to write
+        :param episode_info: the episode information except frames, e.g. map_data and global_config
+        :param chunk_size: the number of frames in one chunk
+        """
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.num_frames = 0
+        self.num_groups = 0
+        self._file = open(file_path, "wb")
+        pickle.dump(
+            {
+                COLUMNAR_EPISODE_KEY: COLUMNAR_EPISODE_VERSION,
+                "episode_info": episode_info
+            },
+            self._file,
+            protocol=pickle.HIGHEST_PROTOCOL
+        )
+
+        self._slots = {}
+        self._objects = _StateTable()
+        self._policies = _StateTable()
+        self._frame_changes = _Changes()
+        self._clear_chunk()
+
+    def _clear_chunk(self):
+        self._chunk_start = self.num_frames
+        self._new_names = []
+        self._episode_step = []
+        self._group = []
+        self._sparse = []
+
+    def _get_slot(self, name):
+        if name not in self._slots:
+            self._slots[name] = len(self._slots)
+            self._new_names.append(name)
+        return self._slots[name]
+
+    def add_frames(self, frames):
+        """
+        Add the frames of one env.step(), or the reset frame, which are restored as one list by ColumnarEpisode
+        :param frames: a list of FrameInfo
+        """
+        for frame_info in frames:
+            self._add_frame(frame_info)
+        self.num_groups += 1
+        if self.num_frames - self._chunk_start >= self.chunk_size:
+            self.flush()
+
+    def _add_frame(self, frame_info):
+        frame = self.num_frames
+        self._episode_step.append(frame_info.episode_step)
+        self._group.append(self.num_groups)
+        for field in _SPARSE_FIELDS:
+            value = getattr(frame_info, field)
+            if len(value) > 0:
+                self._sparse.append((frame, field, copy.deepcopy(value)))
+        for name, state in frame_info.step_info.items():
+            self._objects.add(frame, self._get_slot(name), state)
+        for name, state in frame_info.policy_info.items():
+            self._policies.add(frame, self._get_slot(name), state)
+        manager_info = frame_info.manager_info
+        self._frame_changes.record(frame, "manager_info", tuple(manager_info.keys()), manager_info.items())
+        agents = (frame_info.agents, frame_info._agent_to_object, frame_info._object_to_agent)
+        self._frame_changes.record(frame, "agents", _AGENT_KEYS, zip(_AGENT_KEYS, agents))
+        self.num_frames += 1
+
+    def flush(self):
+        """
+        Write the buffered frames to the file
+        """
+        if self.num_frames == self._chunk_start:
+            return
+        chunk = dict(
+            names=self._new_names,
+            episode_step=np.asarray(self._episode_step, dtype=np.int64),
+            group=np.asarray(self._group, dtype=np.int64),
+            sparse=self._sparse,
+            objects=self._objects.pop_chunk(),
+            policies=self._policies.pop_chunk(),
+            frame_changes=self._frame_changes.pop_records(),
+        )
+        pickle.dump(chunk, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._file.flush()
+        self._clear_chunk()
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+
+class _FrameGroups:
+    """
+    A list-like view of frames in a columnar episode. Each item is the list of FrameInfo of one env.step(), which is
+    restored when it is accessed. Like the list of frames in the episode dict, it supports reverse() and pop()
+    """
+    def __init__(self, episode):
+        self._episode = episode
+        self._order = list(range(episode.num_groups))
+
+    def __len__(self):
+        return len(self._order)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._episode.get_frame_group(i) for i in self._order[index]]
+        return self._episode.get_frame_group(self._order[index])
+
+    def __iter__(self):
+        for i in self._order:
+            yield self._episode.get_frame_group(i)
+
+    def reverse(self):
+        self._order.reverse()
+
+    def pop(self, index=-1):
+        return self._episode.get_frame_group(self._order.pop(index))
+
+
+class ColumnarEpisode:
+    """
+    A recorded episode loaded from a columnar episode file. It has the same keys as the episode dict returned by
+    engine.dump_episode(), where episode["frame"] restores FrameInfo on access. Deep copies share the loaded data,
+    which is not modified.
+    """
+    def __init__(self, file_path):
+        with open(file_path, "rb") as f:
+            header = pickle.load(f)
+            assert is_columnar_episode(header), "File: {} is not a columnar episode".format(file_path)
+            assert header[COLUMNAR_EPISODE_KEY] <= COLUMNAR_EPISODE_VERSION, \
+                "Please update MetaDrive to read this columnar episode"
+            chunks = []
+            while True:
+                try:
+                    chunks.append(pickle.load(f))
+                except EOFError:
+                    break
+        self.file_path = file_path
+        self.episode_info = header["episode_info"]
+        self.names = [name for chunk in chunks for name in chunk["names"]]
+        self.episode_step = np.concatenate([np.zeros(0, dtype=np.int64)] + [c["episode_step"] for c in chunks])
+        group = np.concatenate([np.zeros(0, dtype=np.int64)] + [c["group"] for c in chunks])
+        self.num_frames = len(group)
+        self.num_groups = int(group[-1]) + 1 if self.num_frames > 0 else 0
+        # frames of the i-th group are in [group_start[i], group_start[i + 1])
+        self.group_start = np.searchsorted(group, np.arange(self.num_groups + 1))
+        self._sparse = {}
+        for chunk in chunks:
+            for frame, field, value in chunk["sparse"]:
+                self._sparse.setdefault(frame, {})[field] = value
+        self._objects = _StateTableReader([c["objects"] for c in chunks])
+        self._policies = _StateTableReader([c["policies"] for c in chunks])
+        self._frame_changes = _ChangeIndex([record for chunk in chunks for record in chunk["frame_changes"]])
+        self.frame = _FrameGroups(self)
+
+    def get_frame(self, index):
+        """
+        Restore the FrameInfo of a frame
+        """
+        from metadrive.manager.record_manager import FrameInfo
+        frame_info = FrameInfo(int(self.episode_step[index]))
+        sparse = self._sparse.get(index, {})
+        frame_info.spawn_info = copy.deepcopy(sparse.get("spawn_info", {}))
+        frame_info.policy_spawn_info = copy.deepcopy(sparse.get("policy_spawn_info", {}))
+        frame_info.clear_info = copy.deepcopy(sparse.get("clear_info", []))
+        frame_info.step_info = self._objects.get_states(index, self.names)
+        frame_info.policy_info = self._policies.get_states(index, self.names)
+        frame_info.manager_info = {
+            k: copy.deepcopy(self._frame_changes.get("manager_info", k, index))
+            for k in self._frame_changes.get("manager_info", _KEYS, index, ())
+        }
+        frame_info.agents, frame_info._agent_to_object, frame_info._object_to_agent = (
+            copy.deepcopy(self._frame_changes.get("agents", k, index)) for k in _AGENT_KEYS
+        )
+        return frame_info
+
+    def get_frame_group(self, index):
+        """
+        Restore the frames of the index-th env.step(), where index 0 is the reset frame
+        :return: a list of FrameInfo
+        """
+        return [self.get_frame(i) for i in range(self.group_start[index], self.group_start[index + 1])]
+
+    def get_last_frames(self):
+        """
+        Restore the last frame of each env.step(), which is what convert_recorded_scenario_exported needs
+        """
+        return [self.get_frame(self.group_start[i + 1] - 1) for i in range(self.num_groups)]
+
+    def __getitem__(self, key):
+        return self.frame if key == "frame" else self.episode_info[key]
+
+    def __contains__(self, key):
+        return key == "frame" or key in self.episode_info
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        return list(self.episode_info.keys()) + ["frame"]
+
+    def __deepcopy__(self, memo):
+        ret = copy.copy(self)
+        ret.frame = _FrameGroups(ret)
+        return ret
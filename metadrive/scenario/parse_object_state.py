@@ -1,9 +1,11 @@
 import copy
+import importlib
 import warnings
 
+import numpy as np
+
 from metadrive.component.lane.point_lane import PointLane
 from metadrive.utils.math import compute_angular_velocity
-from metadrive.utils.math import norm
 
 
 def get_max_valid_indicis(track, current_index):
@@ -38,12 +40,7 @@ def parse_object_state(object_dict, time_idx, check_last_state=False, sim_time_i
     if time_idx >= len(states["position"]):
         time_idx = len(states["position"]) - 1
     if check_last_state:
-        for current_idx in range(time_idx):
-            p_1 = states["position"][current_idx][:2]
-            p_2 = states["position"][current_idx + 1][:2]
-            if norm(p_1[0] - p_2[0], p_1[1] - p_2[1]) > 100:
-                time_idx = current_idx
-                break
+        time_idx = min(time_idx, get_trajectory_break_index(states["position"]))
 
     ret = {k: v[time_idx] for k, v in states.items()}
 
@@ -78,7 +75,6 @@ def parse_object_state(object_dict, time_idx, check_last_state=False, sim_time_i
     ret["vehicle_class"] = None
     if "spawn_info" in object_dict["metadata"]:
         type_module, type_cls_name = object_dict["metadata"]["spawn_info"]["type"]
-        import importlib
         module = importlib.import_module(type_module)
         cls = getattr(module, type_cls_name)
         ret["vehicle_class"] = cls
@@ -86,19 +82,73 @@ def parse_object_state(object_dict, time_idx, check_last_state=False, sim_time_i
     return ret
 
 
+def get_trajectory_break_index(positions):
+    """
+    The index of the first step moving more than 100m in one step, which is usually caused by broken data. The length of
+    the trajectory is returned if there is no such step
+    """
+    positions = np.asarray(positions)
+    if len(positions) < 2:
+        return len(positions)
+    displacement = np.diff(positions[:, :2], axis=0)
+    jumps = np.flatnonzero(np.hypot(displacement[:, 0], displacement[:, 1]) > 100)
+    return int(jumps[0]) if len(jumps) > 0 else len(positions)
+
+
+def parse_trajectory(object_dict, length=None, sim_time_interval=0.1, include_z_position=False):
+    """
+    Parse object states of all time steps at once. It is the vectorized version of calling parse_object_state() for
+    each step, and returns a dict of arrays whose first dimension is the time step, instead of a list of dicts.
+
+    Args:
+        object_dict: the track of an object
+        length: the number of steps to parse. Steps after the end of the track repeat the last state like
+            parse_object_state() does. Default to the length of the track
+        sim_time_interval: the time interval between two steps, used for computing angular velocity
+        include_z_position: whether to keep the z coordinate of position
+
+    Returns:
+        A dict with position [T, 2] or [T, 3], heading [T], velocity [T, 2], angular_velocity [T] and valid [T], the
+        other state arrays of the track, e.g. length/width/height and throttle_brake/steering if recorded, and the
+        vehicle_class of this object
+    """
+    states = object_dict["state"]
+    epi_length = len(states["position"])
+    if length is None or length == epi_length:
+        index = slice(None)
+    else:
+        index = np.minimum(np.arange(length), epi_length - 1)
+
+    ret = {k: np.asarray(v)[index] for k, v in states.items()}
+    position = np.asarray(states["position"], dtype=float)
+    ret["position"] = np.ascontiguousarray(position[index] if include_z_position else position[index, :2])
+    ret["velocity"] = np.ascontiguousarray(np.asarray(states["velocity"], dtype=float)[index])
+    heading = np.asarray(states["heading"], dtype=float).reshape(epi_length)
+    ret["heading"] = ret["heading_theta"] = heading[index]
+    valid = np.asarray(states["valid"], dtype=bool).reshape(epi_length)
+    ret["valid"] = valid[index]
+
+    # angular velocity at step i is computed from heading i and i+1, and is 0 if either of them is invalid
+    angular_velocity = np.zeros(epi_length)
+    both_valid = valid[:-1] & valid[1:]
+    angular_velocity[:-1][both_valid] = compute_angular_velocity(
+        initial_heading=heading[:-1][both_valid], final_heading=heading[1:][both_valid], dt=sim_time_interval
+    )
+    ret["angular_velocity"] = angular_velocity[index]
+
+    ret["vehicle_class"] = None
+    if "spawn_info" in object_dict["metadata"]:
+        type_module, type_cls_name = object_dict["metadata"]["spawn_info"]["type"]
+        ret["vehicle_class"] = getattr(importlib.import_module(type_module), type_cls_name)
+    return ret
+
+
 def parse_full_trajectory(object_dict):
     """
     Parse object states for a whole trajectory
     """
     positions = object_dict["state"]["position"]
-    index = len(positions)
-    for current_idx in range(len(positions) - 1):
-        p_1 = positions[current_idx][:2]
-        p_2 = positions[current_idx + 1][:2]
-        if norm(p_1[0] - p_2[0], p_1[1] - p_2[1]) > 100:
-            index = current_idx
-            break
-    positions = positions[:index]
+    positions = positions[:get_trajectory_break_index(positions)]
     trajectory = copy.deepcopy(positions[:, :2])
 
     return trajectory
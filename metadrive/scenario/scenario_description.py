@@ -196,6 +196,12 @@ class ScenarioDescription(dict):
     class DATASET:
         SUMMARY_FILE = "dataset_summary.pkl"  # dataset summary file name
         MAPPING_FILE = "dataset_mapping.pkl"  # store the relative path of summary file and each scenario
+        DIFFICULTY_FILE = "dataset_difficulty.pkl"  # cached statistics for sorting scenarios by difficulty
+
+    class DIFFICULTY:
+        SDC_MOVING_DIST = "sdc_moving_dist"
+        CURVATURE = "curvature"
+        NUM_MOVING_VEHICLES = "num_moving_vehicles"
 
     @classmethod
     def sanity_check(cls, scenario_dict, check_self_type=False, valid_check=False):
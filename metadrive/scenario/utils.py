@@ -1,8 +1,10 @@
 import copy
+import multiprocessing
 import os
 import pathlib
 import pickle
 
+import filelock
 import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib.pyplot import figure
@@ -15,6 +17,8 @@ from metadrive.component.vehicle.base_vehicle import BaseVehicle
 from metadrive.constants import DATA_VERSION, DEFAULT_AGENT
 from metadrive.engine import get_logger
 from metadrive.scenario import ScenarioDescription as SD
+from metadrive.scenario.columnar import is_columnar_header, read_columnar_scenario
+from metadrive.scenario.columnar_episode import ColumnarEpisode
 from metadrive.scenario.scenario_description import ScenarioDescription
 from metadrive.type import MetaDriveType
 from metadrive.utils.math import wrap_to_pi
@@ -116,7 +120,7 @@ def convert_recorded_scenario_exported(record_episode, scenario_log_interval=0.1
     We call this lane sampling rate, which is 0.2m in MetaDrive but might different in other datasets.
 
     Args:
-        record_episode: the internal data structure from MetaDrive run.
+        record_episode: the internal data structure from MetaDrive run, i.e. the episode dict or a ColumnarEpisode.
         scenario_log_interval: the time interval for one step.
         to_dict: whether to return a python dict or a ScenarioDescription object.
 
@@ -137,7 +141,11 @@ def convert_recorded_scenario_exported(record_episode, scenario_log_interval=0.1
     if scenario_log_interval != 0.1:
         raise ValueError("We don't support varying the scenario log interval yet.")
 
-    frames = [step_frame_list[-1] for step_frame_list in record_episode["frame"]]
+    if isinstance(record_episode, ColumnarEpisode):
+        # only restore the frames in use
+        frames = record_episode.get_last_frames()
+    else:
+        frames = [step_frame_list[-1] for step_frame_list in record_episode["frame"]]
 
     episode_len = len(frames)
     assert frames[-1].episode_step == episode_len - 1, "Length mismatch"
@@ -351,6 +359,8 @@ def convert_recorded_scenario_exported(record_episode, scenario_log_interval=0.1
 def read_scenario_data(file_path, centralize=False):
     """Read a scenario pkl file and return the Scenario Description instance.
 
+    Scenarios saved in the memory-mapped columnar format (see metadrive.scenario.columnar) are also supported.
+
     Args:
         file_path: the path to a scenario file (usually ends with `.pkl`).
         centralize: whether to centralize all elements to the ego car's initial position
@@ -362,6 +372,8 @@ def read_scenario_data(file_path, centralize=False):
     with open(file_path, "rb") as f:
         # unpickler = CustomUnpickler(f)
         data = pickle.load(f)
+    if is_columnar_header(data):
+        data = read_columnar_scenario(file_path, header=data)
     data = ScenarioDescription(data)
     if centralize:
         data = ScenarioDescription.centralize_to_ego_car_initial_position(data)
@@ -481,6 +493,122 @@ def save_dataset(scenario_list, dataset_name, dataset_version, dataset_dir):
     )
 
 
+def get_scenario_difficulty(scenario):
+    """Compute the statistics measuring how difficult a scenario is, which are used for curriculum learning.
+
+    Args:
+        scenario: the Scenario Description instance.
+
+    Returns:
+        A dict with the SDC moving distance, the curvature of the SDC trajectory and the number of moving vehicles.
+    """
+    ego_car_id = scenario[SD.METADATA][SD.SDC_ID]
+    state_dict = scenario[SD.TRACKS][ego_car_id][SD.STATE]
+    valid_track = state_dict["position"][np.where(state_dict["valid"].astype(int))][..., :2]
+
+    direction = valid_track[1:] - valid_track[:-1]
+    direction = np.arctan2(direction[..., 1], direction[..., 0])
+    curvature = sum(abs(direction[1:] - direction[:-1]) / np.pi) + 1
+    return {
+        SD.DIFFICULTY.SDC_MOVING_DIST: float(SD.sdc_moving_dist(scenario)),
+        SD.DIFFICULTY.CURVATURE: float(curvature),
+        SD.DIFFICULTY.NUM_MOVING_VEHICLES: int(SD.num_moving_object(scenario, object_type=MetaDriveType.VEHICLE))
+    }
+
+
+def _get_scenario_file_difficulty(file_path):
+    return get_scenario_difficulty(read_scenario_data(file_path))
+
+
+def _get_file_stat(file_path):
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _load_difficulty_index(index_file):
+    if not os.path.isfile(index_file):
+        return {}
+    with open(index_file, "rb") as f:
+        return pickle.load(f)
+
+
+def _get_outdated_files(index, file_stats):
+    # entries of changed files and entries saved by older versions without file stats are outdated
+    return [
+        file_name for file_name, file_stat in file_stats.items()
+        if not isinstance(index.get(file_name), tuple) or index[file_name][0] != file_stat
+    ]
+
+
+def read_difficulty_index(dataset_path, scenario_files=None, num_processes=None):
+    """Read the difficulty statistics of scenarios from the dataset_difficulty.pkl stored next to the dataset summary.
+    Statistics of scenarios missing in this file are computed with a process pool and then saved to this file, so
+    scenarios are only loaded once for the whole dataset. The modification time and size of each scenario file are
+    stored with its statistics, which are computed again if the file is changed. Computing and saving statistics are
+    guarded by a lock file, so when many environments read the index at the same time, only one of them computes the
+    missing statistics and the others wait for it.
+
+    Args:
+        dataset_path: the root folder of the dataset.
+        scenario_files: file names of scenarios to read. If None, all scenarios in the dataset summary are read.
+        num_processes: the number of processes to compute missing statistics. Default to the number of CPUs.
+
+    Returns:
+        A dict mapping from the scenario file name to the statistics returned by get_scenario_difficulty.
+    """
+    index_file = str(pathlib.Path(dataset_path) / SD.DATASET.DIFFICULTY_FILE)
+    # file name -> (file stat, statistics)
+    index = _load_difficulty_index(index_file)
+
+    _, summary_list, mapping = read_dataset_summary(dataset_path, check_file_existence=False)
+    scenario_files = summary_list if scenario_files is None else scenario_files
+    file_paths = {file_name: os.path.join(dataset_path, mapping[file_name], file_name) for file_name in scenario_files}
+    file_stats = {file_name: _get_file_stat(file_path) for file_name, file_path in file_paths.items()}
+    if len(_get_outdated_files(index, file_stats)) == 0:
+        return {file_name: entry[1] for file_name, entry in index.items() if isinstance(entry, tuple)}
+
+    lock = filelock.FileLock("{}.lock".format(index_file))
+    try:
+        lock.acquire()
+    except OSError as e:
+        logger.warning("Can not lock the difficulty index {}: {}, it won't be saved".format(index_file, e))
+        lock = None
+    try:
+        if lock is not None:
+            # other processes may have saved these statistics when waiting for the lock
+            index = _load_difficulty_index(index_file)
+        missing = _get_outdated_files(index, file_stats)
+        num_processes = min(num_processes or os.cpu_count() or 1, max(len(missing), 1))
+        # daemonic processes, like Rllib workers, are not allowed to have children
+        if num_processes > 1 and not multiprocessing.current_process().daemon:
+            with multiprocessing.Pool(num_processes) as pool:
+                results = pool.map(
+                    _get_scenario_file_difficulty, [file_paths[file_name] for file_name in missing],
+                    chunksize=max(len(missing) // (4 * num_processes), 1)
+                )
+        else:
+            results = [_get_scenario_file_difficulty(file_paths[file_name]) for file_name in missing]
+        new_entries = {file_name: (file_stats[file_name], result) for file_name, result in zip(missing, results)}
+        index.update(new_entries)
+
+        if lock is not None and len(new_entries) > 0:
+            try:
+                # merge with the index on disk, so that entries saved by others are never overwritten
+                index = _load_difficulty_index(index_file)
+                index.update(new_entries)
+                # write to a temporary file first, so other processes never read an incomplete index
+                tmp_file = "{}.{}.tmp".format(index_file, os.getpid())
+                with open(tmp_file, "wb") as f:
+                    pickle.dump(index, f)
+                os.replace(tmp_file, index_file)
+            except OSError as e:
+                logger.warning("Can not save the difficulty index to {}: {}".format(index_file, e))
+    finally:
+        if lock is not None:
+            lock.release()
+    return {file_name: entry[1] for file_name, entry in index.items() if isinstance(entry, tuple)}
+
+
 def get_number_of_scenarios(dataset_path):
     _, files, _ = read_dataset_summary(dataset_path)
     return len(files)
@@ -0,0 +1,306 @@
+"""
+Benchmark step throughput, reset latency, map generation time and peak memory of MetaDrive environments.
+
+Each case runs in a fresh subprocess, since only one engine can exist in a process and the peak RSS should belong to one
+case only. Seeds and actions are fixed, so results of two runs are comparable. Results are saved as JSON, and can be
+compared with a baseline result. The exit code is 1 if any case regresses beyond the tolerance, so it can gate upgrades.
+
+Example:
+
+    # save a baseline
+    python benchmark_suite.py --output baseline.json
+    # compare with the baseline
+    python benchmark_suite.py --output result.json --baseline baseline.json --tolerance 0.1
+    # run some cases only
+    python benchmark_suite.py --cases metadrive_density_0.1 scenario_waymo
+"""
+import argparse
+import json
+import multiprocessing as mp
+import platform
+import resource
+import sys
+import time
+import traceback
+from queue import Empty
+
+import numpy as np
+
+SEED = 0
+ACTION = [0.0, 0.5]
+
+
+def _metadrive_env(traffic_density, **config):
+    def make_env():
+        from metadrive.envs.metadrive_env import MetaDriveEnv
+        return MetaDriveEnv(dict(num_scenarios=100, start_seed=SEED, traffic_density=traffic_density, **config))
+
+    return make_env
+
+
+def _scenario_env(dataset):
+    def make_env():
+        from metadrive.engine.asset_loader import AssetLoader
+        from metadrive.envs.scenario_env import ScenarioEnv
+        return ScenarioEnv(dict(data_directory=AssetLoader.file_path(dataset, unix_style=False), num_scenarios=3))
+
+    return make_env
+
+
+def _marl_env(class_name):
+    def make_env():
+        from metadrive.envs import marl_envs
+        from metadrive.envs.marl_envs.marl_bidirection import MultiAgentBidirectionEnv
+        from metadrive.envs.marl_envs.marl_racing_env import MultiAgentRacingEnv
+        env_classes = dict(MultiAgentBidirectionEnv=MultiAgentBidirectionEnv, MultiAgentRacingEnv=MultiAgentRacingEnv)
+        env_class = env_classes[class_name] if class_name in env_classes else getattr(marl_envs, class_name)
+        return env_class(dict(num_scenarios=1, start_seed=SEED))
+
+    return make_env
+
+
+def _top_down_env(rasterizer):
+    def make_env():
+        from metadrive.envs.top_down_env import TopDownMetaDrive
+        return TopDownMetaDrive(dict(num_scenarios=100, start_seed=SEED, traffic_density=0.1, rasterizer=rasterizer))
+
+    return make_env
+
+
+def _lidar_env():
+    from metadrive.envs.metadrive_env import MetaDriveEnv
+    return MetaDriveEnv(
+        dict(
+            num_scenarios=100,
+            start_seed=SEED,
+            traffic_density=0.3,
+            vehicle_config=dict(
+                lidar=dict(num_lasers=240, distance=50, num_others=4),
+                lane_line_detector=dict(num_lasers=12, distance=50),
+                side_detector=dict(num_lasers=160, distance=50),
+            ),
+        )
+    )
+
+
+def _image_env():
+    from metadrive.component.sensors.rgb_camera import RGBCamera
+    from metadrive.envs.metadrive_env import MetaDriveEnv
+    return MetaDriveEnv(
+        dict(
+            num_scenarios=100,
+            start_seed=SEED,
+            traffic_density=0.1,
+            image_observation=True,
+            vehicle_config=dict(image_source="rgb_camera"),
+            sensors=dict(rgb_camera=(RGBCamera, 84, 84)),
+            interface_panel=[],
+        )
+    )
+
+
+CASES = {
+    "metadrive_density_0": _metadrive_env(0.0),
+    "metadrive_density_0.1": _metadrive_env(0.1),
+    "metadrive_density_0.3": _metadrive_env(0.3),
+    # dense traffic simulated in the physics world or moved by the bicycle model, see PGTrafficManager.step()
+    "metadrive_density_0.5": _metadrive_env(0.5, traffic_mode="respawn"),
+    "metadrive_density_0.5_kinematic": _metadrive_env(0.5, traffic_mode="respawn", kinematic_traffic=True),
+    "scenario_nuscenes": _scenario_env("nuscenes"),
+    "scenario_waymo": _scenario_env("waymo"),
+    "marl_metadrive": _marl_env("MultiAgentMetaDrive"),
+    "marl_tollgate": _marl_env("MultiAgentTollgateEnv"),
+    "marl_bottleneck": _marl_env("MultiAgentBottleneckEnv"),
+    "marl_intersection": _marl_env("MultiAgentIntersectionEnv"),
+    "marl_roundabout": _marl_env("MultiAgentRoundaboutEnv"),
+    "marl_parking_lot": _marl_env("MultiAgentParkingLotEnv"),
+    "marl_tiny_inter": _marl_env("MultiAgentTinyInter"),
+    "marl_bidirection": _marl_env("MultiAgentBidirectionEnv"),
+    "marl_racing": _marl_env("MultiAgentRacingEnv"),
+    "top_down": _top_down_env("pygame"),
+    "top_down_cv2": _top_down_env("cv2"),
+    "lidar_state_observation": _lidar_env,
+    "image_observation": _image_env,
+}
+
+# metric name, True if larger is better
+COMPARED_METRICS = [
+    ("steps_per_second", True),
+    ("reset_latency_p50", False),
+    ("map_generation_mean", False),
+    ("peak_rss_mb", False),
+]
+
+
+def _percentiles(values, prefix):
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return {}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {
+        prefix + "_mean": float(values.mean()),
+        prefix + "_p50": float(p50),
+        prefix + "_p90": float(p90),
+        prefix + "_p99": float(p99),
+    }
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(name, num_steps, num_resets):
+    """
+    Run one benchmark case in the current process
+    :return: a dict of metrics, time unit: [s]
+    """
+    from metadrive.engine.step_profiler import StepProfiler
+    env = CASES[name]()
+    try:
+        # the first reset launches the engine
+        start = time.perf_counter()
+        env.reset(seed=env.config["start_seed"] if "start_seed" in env.config else None)
+        launch_time = time.perf_counter() - start
+
+        # reset latency. Seeds are visited in order, so maps are generated unless there are fewer scenarios than resets
+        profiler = StepProfiler(window=num_resets)
+        profiler.instrument(env.engine.map_manager, "reset", "map")
+        start_index = env.engine.gets_start_index(env.config)
+        for i in range(num_resets):
+            profiler.begin_step()
+            env.reset(seed=start_index + (i + 1) % env.config["num_scenarios"])
+            profiler.end_step()
+        reset_latency = list(profiler.records[StepProfiler.TOTAL])
+        map_generation = list(profiler.records["map"])
+
+        # step throughput, resets are excluded
+        env.reset(seed=start_index)
+        step_time = 0
+        for i in range(num_steps):
+            actions = ACTION if not env.is_multi_agent else {agent_id: ACTION for agent_id in env.agents}
+            start = time.perf_counter()
+            _, _, terminated, truncated, _ = env.step(actions)
+            step_time += time.perf_counter() - start
+            if env.is_multi_agent:
+                terminated, truncated = terminated["__all__"], truncated["__all__"]
+            if terminated or truncated:
+                env.reset(seed=start_index + (i + 1) % env.config["num_scenarios"])
+    finally:
+        env.close()
+    ret = dict(
+        steps_per_second=num_steps / step_time, launch_time=launch_time, num_steps=num_steps, num_resets=num_resets
+    )
+    ret.update(_percentiles(reset_latency, "reset_latency"))
+    ret.update(_percentiles(map_generation, "map_generation"))
+    ret["peak_rss_mb"] = _peak_rss_mb()
+    return ret
+
+
+def _run_case_in_process(name, num_steps, num_resets, queue):
+    try:
+        queue.put(run_case(name, num_steps, num_resets))
+    except Exception:
+        queue.put(dict(error=traceback.format_exc()))
+
+
+def _wait_for_result(process, queue, poll_interval=1.0):
+    """
+    Wait for the result of a case, or an error if the process exits without a result, e.g. killed by a segfault or OOM
+    """
+    while True:
+        try:
+            return queue.get(timeout=poll_interval)
+        except Empty:
+            if not process.is_alive():
+                break
+    # the result may be put right before the process exits
+    try:
+        return queue.get(timeout=poll_interval)
+    except Empty:
+        return dict(error="exit code {}".format(process.exitcode))
+
+
+def run_benchmark(cases, num_steps=1000, num_resets=20):
+    """
+    Run cases one by one, each in a new process
+    :return: benchmark result, which can be dumped to JSON
+    """
+    from metadrive.version import VERSION
+    ctx = mp.get_context("spawn")
+    results = {}
+    for name in cases:
+        queue = ctx.Queue()
+        process = ctx.Process(target=_run_case_in_process, args=(name, num_steps, num_resets, queue))
+        process.start()
+        results[name] = _wait_for_result(process, queue)
+        process.join()
+        print("{}: {}".format(name, results[name] if "error" not in results[name] else "failed"))
+    metadata = dict(
+        metadrive_version=VERSION,
+        python=platform.python_version(),
+        platform=platform.platform(),
+        processor=platform.processor(),
+        time=time.strftime("%Y-%m-%d %H:%M:%S"),
+        seed=SEED,
+        num_steps=num_steps,
+        num_resets=num_resets,
+    )
+    return dict(metadata=metadata, results=results)
+
+
+def compare_with_baseline(result, baseline, tolerance=0.1):
+    """
+    Compare metrics of cases existing in both result and baseline
+    :param tolerance: relative change allowed before a metric is considered regressed
+    :return: a list of (case, metric, baseline value, current value, relative change, regressed)
+    """
+    ret = []
+    for name, current in result["results"].items():
+        if name not in baseline["results"]:
+            continue
+        base = baseline["results"][name]
+        for metric, larger_is_better in COMPARED_METRICS:
+            if metric not in current or metric not in base or base[metric] == 0:
+                continue
+            change = (current[metric] - base[metric]) / base[metric]
+            regressed = change < -tolerance if larger_is_better else change > tolerance
+            ret.append((name, metric, base[metric], current[metric], change, regressed))
+    return ret
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark MetaDrive environments")
+    parser.add_argument("--cases", nargs="+", default=list(CASES.keys()), choices=list(CASES.keys()))
+    parser.add_argument("--num_steps", type=int, default=1000, help="The number of steps for measuring throughput")
+    parser.add_argument("--num_resets", type=int, default=20, help="The number of resets for measuring latency")
+    parser.add_argument("--output", default="benchmark_result.json", help="The path to save the result")
+    parser.add_argument("--baseline", default=None, help="A saved result to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Relative change allowed in comparison")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.cases, args.num_steps, args.num_resets)
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print("Result is saved at: {}".format(args.output))
+
+    failed = [name for name, metrics in result["results"].items() if "error" in metrics]
+    for name in failed:
+        print("Case {} failed:\n{}".format(name, result["results"][name]["error"]))
+
+    if args.baseline is not None:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        comparison = compare_with_baseline(result, baseline, args.tolerance)
+        print("{:<30}{:<25}{:>12}{:>12}{:>10}".format("case", "metric", "baseline", "current", "change"))
+        for name, metric, base, current, change, regressed in comparison:
+            print(
+                "{:<30}{:<25}{:>12.3f}{:>12.3f}{:>9.1f}%{}".format(
+                    name, metric, base, current, change * 100, " REGRESSED" if regressed else ""
+                )
+            )
+        if any(c[-1] for c in comparison) or len(failed) > 0:
+            sys.exit(1)
+    elif len(failed) > 0:
+        sys.exit(1)
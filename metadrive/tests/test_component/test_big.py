@@ -0,0 +1,46 @@
+import numpy as np
+from panda3d.core import NodePath
+
+from metadrive.component.algorithm.BIG import BIG, BigGenerateMethod
+from metadrive.component.road_network.node_road_network import NodeRoadNetwork
+from metadrive.engine.core.physics_world import PhysicsWorld
+
+
+class _BuildEachBlockBIG(BIG):
+    """
+    Create every sampled block in world before checking it, which is how BIG worked before the two-phase search
+    """
+    def construct(self, block) -> bool:
+        success = block.construct_block(self._render_node_path, self._physics_world)
+        lane_num = max([len(socket.get_positive_lanes(self._global_network)) for socket in block._sockets.values()])
+        if lane_num < self.block_dist_config.MIN_LANE_NUM or lane_num > self.block_dist_config.MAX_LANE_NUM:
+            success = False
+        return success
+
+
+def _generate(big_class, seed, block_num):
+    network = NodeRoadNetwork()
+    big = big_class(3, 3.5, network, NodePath("render"), PhysicsWorld(), random_seed=seed)
+    big.generate(BigGenerateMethod.BLOCK_NUM, block_num)
+    lanes = [
+        (_from, _to, np.round(lane.position(0, 0), 6).tolist(), np.round(lane.position(lane.length, 0), 6).tolist())
+        for _from, to_dict in sorted(network.graph.items()) for _to, lanes in sorted(to_dict.items()) for lane in lanes
+    ]
+    return big.blocks, lanes
+
+
+def test_big_two_phase_search():
+    for seed in [0, 3]:
+        blocks, lanes = _generate(BIG, seed, 7)
+        expected_blocks, expected_lanes = _generate(_BuildEachBlockBIG, seed, 7)
+        assert lanes == expected_lanes
+        assert [b.ID for b in blocks] == [b.ID for b in expected_blocks]
+        for block, expected in zip(blocks, expected_blocks):
+            assert block.get_config().is_identical(expected.get_config())
+            assert block.is_attached()
+            assert len(block.static_nodes) == len(expected.static_nodes)
+            assert len(block.dynamic_nodes) == len(expected.dynamic_nodes)
+
+
+if __name__ == '__main__':
+    test_big_two_phase_search()
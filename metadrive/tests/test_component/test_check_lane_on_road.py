@@ -0,0 +1,88 @@
+import math
+
+import numpy as np
+from panda3d.core import NodePath
+
+from metadrive.component.algorithm.BIG import BIG, BigGenerateMethod
+from metadrive.component.lane.circular_lane import CircularLane
+from metadrive.component.lane.straight_lane import StraightLane
+from metadrive.component.road_network.node_road_network import NodeRoadNetwork
+from metadrive.constants import Decoration
+from metadrive.engine.core.physics_world import PhysicsWorld
+from metadrive.utils.pg.utils import check_lane_on_road, get_lanes_bounding_box
+
+
+def _check_lane_on_road_one_by_one(road_network, lane, positive=0, ignored=None):
+    """
+    Test sample points one by one, which is how check_lane_on_road worked before vectorization
+    """
+    for _from, to_dict in road_network.graph.items():
+        for _to, lanes in to_dict.items():
+            if ignored and (_from, _to) == ignored:
+                continue
+            if (_from, _to) == (Decoration.start, Decoration.end):
+                continue
+            if len(lanes) == 0:
+                continue
+            x_max_1, x_min_1, y_max_1, y_min_1 = get_lanes_bounding_box(lanes)
+            x_max_2, x_min_2, y_max_2, y_min_2 = get_lanes_bounding_box([lane])
+            if x_min_1 > x_max_2 or x_min_2 > x_max_1 or y_min_1 > y_max_2 or y_min_2 > y_max_1:
+                continue
+            for l in lanes:
+                for i in range(1, int(lane.length), 1):
+                    sample_point = lane.position(i, positive * lane.width_at(i) / 2.0)
+                    longitudinal, lateral = l.local_coordinates(sample_point)
+                    if math.fabs(lateral) <= l.width_at(longitudinal) / 2.0 and 0 <= longitudinal <= l.length:
+                        return True
+    return False
+
+
+def test_check_lane_on_road():
+    network = NodeRoadNetwork()
+    big = BIG(2, 3.5, network, NodePath("render"), PhysicsWorld(), random_seed=1)
+    big.generate(BigGenerateMethod.BLOCK_NUM, 5)
+
+    rng = np.random.default_rng(0)
+    existing_lanes = [(road, l) for road, to_dict in network.graph.items() for l in sum(to_dict.values(), [])]
+    new_lanes = []
+    for _ in range(200):
+        start = rng.uniform(-100, 400, size=2)
+        if rng.uniform() < 0.5:
+            new_lanes.append(StraightLane(start, start + rng.uniform(-80, 80, size=2), width=3.5))
+        else:
+            new_lanes.append(
+                CircularLane(start, rng.uniform(10, 60), rng.uniform(-4, 4), rng.uniform(0.3, 3),
+                             rng.uniform() < 0.5)
+            )
+    # lanes next to existing lanes share boundaries with them
+    for _, l in existing_lanes:
+        if isinstance(l, StraightLane):
+            for lateral in [-l.width, l.width]:
+                new_lanes.append(StraightLane(l.position(0, lateral), l.position(l.length, lateral), width=l.width))
+        elif isinstance(l, CircularLane):
+            for lateral in [-l.width, l.width]:
+                new_lanes.append(
+                    CircularLane(l.center, l.radius + lateral, l.start_phase, l.angle, l.is_clockwise(), width=l.width)
+                )
+
+    results = []
+    for lane in new_lanes:
+        for positive in [0, 0.95, -0.95, 1, -1, 3.2]:
+            expected = _check_lane_on_road_one_by_one(network, lane, positive)
+            assert check_lane_on_road(network, lane, positive, ignore_intersection_checking=False) == expected
+            results.append(expected)
+    assert any(results) and not all(results)
+
+    # ignored road and lanes changed in the network
+    road, lane = existing_lanes[-1]
+    for positive in [0, 1, -1]:
+        ignored = (road, lane.index[1]) if lane.index is not None else None
+        assert check_lane_on_road(network, lane, positive, ignored, ignore_intersection_checking=False) == \
+            _check_lane_on_road_one_by_one(network, lane, positive, ignored)
+    network.graph.clear()
+    assert not check_lane_on_road(network, new_lanes[0], ignore_intersection_checking=False)
+    assert check_lane_on_road(network, new_lanes[0], ignore_intersection_checking=True)
+
+
+if __name__ == '__main__':
+    test_check_lane_on_road()
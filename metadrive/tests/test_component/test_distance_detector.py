@@ -1,3 +1,4 @@
+import numpy as np
 from metadrive.component.vehicle.base_vehicle import BaseVehicle
 from metadrive.component.pgblock.first_block import FirstPGBlock
 from metadrive.component.vehicle.vehicle_type import DefaultVehicle
@@ -6,6 +7,7 @@ from metadrive.constants import DEFAULT_AGENT
 from metadrive.envs.metadrive_env import MetaDriveEnv
 from metadrive.utils import setup_logger
 from metadrive.component.sensors.lidar import Lidar
+from metadrive.component.sensors.analytic_lidar import AnalyticLidar
 
 
 def test_original_lidar(render=False):
@@ -126,6 +128,95 @@ def test_lidar_with_mask(render=False):
         env.close()
 
 
+def test_batch_ray_test_consistency():
+    env = MetaDriveEnv(
+        {
+            "num_scenarios": 1,
+            "traffic_density": 0.3,
+            "vehicle_config": {
+                "side_detector": dict(num_lasers=120, distance=50),
+                "lane_line_detector": dict(num_lasers=120, distance=20),
+            },
+            "map": "XXX"
+        }
+    )
+    try:
+        env.reset()
+        for i in range(1, 100):
+            env.step([0, 1])
+            for name, world in [("lidar", env.engine.physics_world.dynamic_world),
+                                ("side_detector", env.engine.physics_world.static_world),
+                                ("lane_line_detector", env.engine.physics_world.static_world)]:
+                sensor = env.engine.get_sensor(name)
+                ret = []
+                for batch in [False, True]:
+                    sensor.batch_ray_test = batch
+                    ret.append(sensor.perceive(env.agent, world, num_lasers=120, distance=50))
+                sensor.batch_ray_test = False
+                assert ret[0][0] == ret[1][0], "{} cloud points mismatch".format(name)
+                if name != "lidar":
+                    assert [o.getNode() for o in ret[0].detected_objects] == \
+                           [o.getNode() for o in ret[1].detected_objects]
+                else:
+                    assert ret[0][1] == ret[1][1]
+    finally:
+        env.close()
+
+
+def test_analytic_lidar():
+    env = MetaDriveEnv({"num_scenarios": 1, "traffic_density": 0.3, "map": "XXX"})
+    try:
+        env.reset()
+        lidar = env.engine.get_sensor("lidar")
+        analytic_lidar = AnalyticLidar(env.engine)
+        close_enough = 0
+        for i in range(1, 100):
+            env.step([0, 1])
+            expected, expected_objs = lidar.perceive(
+                env.agent, env.engine.physics_world.dynamic_world, num_lasers=240, distance=50
+            )
+            ret, objs = analytic_lidar.perceive(
+                env.agent, env.engine.physics_world.dynamic_world, num_lasers=240, distance=50
+            )
+            assert objs == expected_objs
+            close_enough += np.mean(np.abs(np.array(expected) - np.array(ret)) < 0.01)
+        assert close_enough / 99 > 0.99, "Analytic lidar doesn't match Bullet lidar"
+        analytic_lidar.destroy()
+    finally:
+        env.close()
+
+
+def test_lidar_surrounding_vehicles_from_state_table():
+    env = MetaDriveEnv(
+        {
+            "num_scenarios": 1,
+            "traffic_density": 0.3,
+            "map": "XXX",
+            "use_object_state_table": True,
+            "vehicle_config": dict(lidar=dict(num_others=4))
+        }
+    )
+    try:
+        env.reset()
+        lidar = env.engine.get_sensor("lidar")
+        table = env.engine.object_state_table
+        found = False
+        for i in range(1, 100):
+            env.step([0, 1])
+            assert env.agent.id in table
+            np.testing.assert_almost_equal(table.position[table.rows[env.agent.id]], env.agent.position)
+            _, objs = lidar.perceive(env.agent, env.engine.physics_world.dynamic_world, num_lasers=240, distance=50)
+            ret = lidar.get_surrounding_vehicles_info(env.agent, objs, 50, 4, add_others_navi=False)
+            env.engine.object_state_table = None
+            expected = lidar.get_surrounding_vehicles_info(env.agent, objs, 50, 4, add_others_navi=False)
+            env.engine.object_state_table = table
+            np.testing.assert_almost_equal(ret, expected, decimal=4)
+            found = found or any(v != 0 for v in expected)
+        assert found, "No surrounding vehicles are detected"
+    finally:
+        env.close()
+
+
 if __name__ == "__main__":
     # test_lidar_with_mask(render=True)
     test_original_lidar(render=False)
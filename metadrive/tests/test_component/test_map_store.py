@@ -0,0 +1,129 @@
+import os
+import pickle
+from types import SimpleNamespace
+
+from metadrive.component.map.map_store import MapStore
+from metadrive.engine.asset_loader import AssetLoader
+from metadrive.envs.scenario_env import ScenarioEnv
+from metadrive.manager.pg_map_manager import PGMapManager
+
+
+class _FakeMap:
+    def __init__(self, size):
+        self.size = size
+        self.destroyed = False
+        self.num_estimates = 0
+
+    def estimate_memory_size(self):
+        self.num_estimates += 1
+        return self.size
+
+    def detach_from_world(self):
+        pass
+
+    def destroy(self):
+        self.destroyed = True
+
+    def get_meta_data(self):
+        assert not self.destroyed
+        return dict(size=self.size)
+
+
+class _DumpMapManager(PGMapManager):
+    """
+    Maps are fake ones and no engine is launched
+    """
+    engine = None
+
+    def __init__(self, num_scenarios, **config):
+        self.engine = SimpleNamespace(
+            global_config=dict(start_seed=0, num_scenarios=num_scenarios, **config), seed=lambda seed: None
+        )
+        self.start_seed, self.env_num = 0, num_scenarios
+        self.maps = self._create_map_store(range(num_scenarios))
+        self.generated_maps = []
+
+    def generate_map(self, seed):
+        map = _FakeMap(seed)
+        self.generated_maps.append(map)
+        return map
+
+
+def test_map_store_lru():
+    store = MapStore(range(10), max_num=2)
+    maps = [_FakeMap(100) for _ in range(10)]
+    assert store.get(0) is None and store[0] is None
+    store[0] = maps[0]
+    store[1] = maps[1]
+    assert store.get(0) is maps[0]
+    # 1 is the least recently used map
+    store[2] = maps[2]
+    assert maps[1].destroyed and not maps[0].destroyed
+    assert store[1] is None and store[0] is maps[0] and store[2] is maps[2]
+    assert all(m.num_estimates == 0 for m in maps), "sizes are only estimated with max_bytes or for stats"
+    assert store.get_stats() == dict(hits=1, misses=1, evictions=1, num_stored_maps=2, stored_bytes=200)
+    assert len(store) == 10 and list(store.keys()) == list(range(10))
+    assert [m for m in store.values() if m is not None] == [maps[0], maps[2]]
+
+    # budget by bytes, the newly stored map is kept even if it exceeds the budget alone
+    store = MapStore(range(10), max_bytes=250)
+    for i in range(3):
+        store[i] = maps[i + 3]
+    assert store.num_stored_maps == 2 and store.stored_bytes == 200 and store.evictions == 1
+    big_map = _FakeMap(1000)
+    store[5] = big_map
+    assert store.num_stored_maps == 1 and store[5] is big_map and not big_map.destroyed
+    store.clear()
+    assert big_map.destroyed and store.num_stored_maps == 0 and store.stored_bytes == 0
+
+    # no budget
+    store = MapStore(range(10))
+    for i in range(10):
+        store[i] = _FakeMap(10)
+    assert store.num_stored_maps == 10 and store.evictions == 0
+
+
+def test_dump_maps_with_budget(tmp_path):
+    for budget in [dict(store_map_max_num=2), dict(store_map_max_bytes=1), dict()]:
+        manager = _DumpMapManager(5, **budget)
+        stored_map = _FakeMap(0)
+        manager.maps[0] = stored_map
+        file_name = os.path.join(str(tmp_path), "maps.pkl")
+        ret = manager.dump_all_maps(file_name)
+        assert ret == {seed: dict(size=seed) for seed in range(5)}
+        with open(file_name, "rb") as file:
+            assert pickle.load(file) == ret
+        # the stored map is reused and never evicted by maps generated for dumping
+        assert len(manager.generated_maps) == 4
+        assert manager.maps[0] is stored_map and not stored_map.destroyed
+        if budget:
+            assert manager.maps.num_stored_maps == 1 and manager.maps.evictions == 0
+            assert all(m.destroyed for m in manager.generated_maps)
+        else:
+            assert manager.maps.num_stored_maps == 5
+
+
+def test_scenario_map_store():
+    env = ScenarioEnv(
+        dict(
+            data_directory=AssetLoader.file_path("nuscenes", unix_style=False),
+            num_scenarios=3,
+            store_map=True,
+            store_map_max_num=2,
+        )
+    )
+    try:
+        for seed in [0, 1, 0, 2, 1, 0]:
+            env.reset(seed=seed)
+            env.step([0, 0])
+            assert env.engine.map_manager.num_stored_maps <= 2
+        stats = env.engine.map_manager.get_map_store_stats()
+        assert stats["hits"] == 1 and stats["misses"] == 5 and stats["evictions"] == 3
+        assert stats["stored_bytes"] > 0
+    finally:
+        env.close()
+
+
+if __name__ == '__main__':
+    test_map_store_lru()
+    test_scenario_map_store()
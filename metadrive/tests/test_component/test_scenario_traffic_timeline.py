@@ -0,0 +1,272 @@
+"""
+ScenarioTrafficManager spawns tracks by a timeline of valid masks. This test checks that the spawn, replay and clean
+orders are the same as the previous after_step() walking through all tracks at every step. In random scenarios,
+spawning functions are replaced by fake ones, so no engine is launched. Objects in real scenarios are checked as well.
+"""
+from collections import defaultdict
+from types import SimpleNamespace
+
+import numpy as np
+
+from metadrive.component.static_object.traffic_object import TrafficCone, TrafficBarrier
+from metadrive.engine.asset_loader import AssetLoader
+from metadrive.envs.scenario_env import ScenarioEnv
+from metadrive.manager.scenario_traffic_manager import ScenarioTrafficManager
+from metadrive.policy.idm_policy import TrajectoryIDMPolicy
+from metadrive.policy.replay_policy import ReplayEgoCarPolicy, ReplayTrafficParticipantPolicy
+from metadrive.type import MetaDriveType
+
+SDC_ID = "sdc"
+
+
+class _FakeReplayPolicy:
+    def __init__(self, manager, scenario_id):
+        self.manager = manager
+        self.scenario_id = scenario_id
+
+    @property
+    def is_current_step_valid(self):
+        valid = self.manager.current_traffic_data[self.scenario_id]["state"]["valid"]
+        step = self.manager.episode_step
+        return 0 <= step < len(valid) and bool(valid[step])
+
+    def act(self):
+        self.manager.log.append((self.manager.episode_step, "act", self.scenario_id))
+
+
+class _TimelineManager(ScenarioTrafficManager):
+    """
+    Objects are recorded instead of created. A vehicle overlapping the ego car is not spawned at steps in overlaps
+    """
+    engine = None
+    episode_step = 0
+    current_traffic_data = None
+    sdc_scenario_id = SDC_ID
+    current_scenario_length = 0
+
+    def __init__(self, tracks, length, no_static_vehicles, static_tracks, idm_tracks, overlaps):
+        self.engine = SimpleNamespace(global_config=dict(no_static_vehicles=no_static_vehicles))
+        self.current_traffic_data = tracks
+        self.current_scenario_length = length
+        self.static_tracks = static_tracks
+        self.idm_tracks = idm_tracks
+        self.overlaps = overlaps
+        self.log = []
+        self.policies = {}
+        self._obj_to_clean_this_frame = []
+        self._static_car_id = set()
+        self._moving_car_id = set()
+        self._noise_object_id = set()
+        self._non_noise_object_id = set()
+        self.after_reset()
+
+    def _spawn(self, scenario_id, track, policy):
+        valid = track["state"]["valid"]
+        step = self.episode_step
+        if not valid[min(step, len(valid) - 1)] or (scenario_id, step) in self.overlaps:
+            return
+        obj_id = "{}-{}".format(scenario_id, step)
+        self._scenario_id_to_obj_id[scenario_id] = obj_id
+        self._obj_id_to_scenario_id[obj_id] = scenario_id
+        self.log.append((step, "spawn", obj_id))
+        self.policies[obj_id] = policy
+        if policy == "replay":
+            self.get_policy(obj_id).act()
+
+    def spawn_vehicle(self, v_id, track):
+        if v_id not in self._static_car_id and v_id not in self._moving_car_id:
+            set_to_add = self._static_car_id if v_id in self.static_tracks else self._moving_car_id
+            set_to_add.add(v_id)
+        if self.engine.global_config["no_static_vehicles"] and v_id in self._static_car_id:
+            return
+        self._spawn(v_id, track, "idm" if v_id in self.idm_tracks else "replay")
+
+    def spawn_pedestrian(self, scenario_id, track):
+        self._spawn(scenario_id, track, "replay")
+
+    def spawn_cyclist(self, scenario_id, track):
+        self._spawn(scenario_id, track, "replay")
+
+    def spawn_static_object(self, cls, scenario_id, track):
+        if scenario_id not in self._noise_object_id and scenario_id not in self._non_noise_object_id:
+            valid_length = np.sum(track["state"]["valid"])
+            set_to_add = self._noise_object_id if valid_length < self.MIN_VALID_FRAME_LEN else self._non_noise_object_id
+            set_to_add.add(scenario_id)
+        if scenario_id in self._noise_object_id:
+            return
+        self._spawn(scenario_id, track, None)
+
+    def has_policy(self, object_id, policy_cls=None):
+        policy = self.policies[object_id]
+        return (policy == "replay" and policy_cls is ReplayTrafficParticipantPolicy) or \
+               (policy == "idm" and policy_cls is TrajectoryIDMPolicy)
+
+    def get_policy(self, object_id):
+        return _FakeReplayPolicy(self, self._obj_id_to_scenario_id[object_id])
+
+    def is_static_object(self, obj_id):
+        return self.policies[obj_id] is None
+
+    def clear_objects(self, object_ids, *args, **kwargs):
+        for obj_id in object_ids:
+            self.log.append((self.episode_step, "clean", obj_id))
+            self.policies.pop(obj_id)
+
+
+def _loop_after_step(self, *args, **kwargs):
+    """
+    The after_step() before the spawn timeline, which tries to spawn all tracks not spawned at every step
+    """
+    if self.episode_step < self.current_scenario_length:
+        replay_done = False
+        for scenario_id, track in self.current_traffic_data.items():
+            if scenario_id == self.sdc_scenario_id:
+                continue
+            if scenario_id not in self._scenario_id_to_obj_id:
+                if track["type"] == MetaDriveType.VEHICLE:
+                    self.spawn_vehicle(scenario_id, track)
+                elif track["type"] == MetaDriveType.CYCLIST:
+                    self.spawn_cyclist(scenario_id, track)
+                elif track["type"] == MetaDriveType.PEDESTRIAN:
+                    self.spawn_pedestrian(scenario_id, track)
+                elif track["type"] in [MetaDriveType.TRAFFIC_CONE, MetaDriveType.TRAFFIC_BARRIER]:
+                    cls = TrafficBarrier if track["type"] == MetaDriveType.TRAFFIC_BARRIER else TrafficCone
+                    self.spawn_static_object(cls, scenario_id, track)
+            elif self.has_policy(self._scenario_id_to_obj_id[scenario_id], ReplayTrafficParticipantPolicy):
+                policy = self.get_policy(self._scenario_id_to_obj_id[scenario_id])
+                if policy.is_current_step_valid:
+                    policy.act()
+                else:
+                    self._obj_to_clean_this_frame.append(scenario_id)
+    else:
+        replay_done = True
+        for scenario_id, obj_id in self._scenario_id_to_obj_id.items():
+            if self.has_policy(obj_id, ReplayTrafficParticipantPolicy) and not self.is_static_object(obj_id):
+                self._obj_to_clean_this_frame.append(scenario_id)
+
+    for scenario_id in list(self._obj_to_clean_this_frame):
+        obj_id = self._scenario_id_to_obj_id.pop(scenario_id)
+        _scenario_id = self._obj_id_to_scenario_id.pop(obj_id)
+        assert _scenario_id == scenario_id
+        self.clear_objects([obj_id])
+
+    return dict(default_agent=dict(replay_done=replay_done))
+
+
+class _LoopManager(_TimelineManager):
+    after_step = _loop_after_step
+
+
+def _random_valid_mask(np_random, length):
+    mask = np.zeros(length, dtype=bool)
+    step = np_random.randint(0, 5)
+    while step < length:
+        duration = np_random.randint(1, 30)
+        mask[step:step + duration] = True
+        step += duration + np_random.randint(1, 15)
+    return mask
+
+
+def _random_scenario(seed):
+    np_random = np.random.RandomState(seed)
+    length = np_random.randint(30, 90)
+    types = [
+        MetaDriveType.VEHICLE, MetaDriveType.VEHICLE, MetaDriveType.VEHICLE, MetaDriveType.CYCLIST,
+        MetaDriveType.PEDESTRIAN, MetaDriveType.TRAFFIC_CONE, MetaDriveType.TRAFFIC_BARRIER, "UNKNOWN"
+    ]
+    tracks = {SDC_ID: dict(type=MetaDriveType.VEHICLE, state=dict(valid=np.ones(length, dtype=bool)))}
+    static_tracks, idm_tracks = set(), set()
+    for i in range(40):
+        scenario_id = str(i)
+        # some tracks are shorter than the scenario
+        track_length = np_random.randint(1, length) if np_random.rand() < 0.3 else length
+        track_type = types[np_random.randint(len(types))]
+        tracks[scenario_id] = dict(type=track_type, state=dict(valid=_random_valid_mask(np_random, track_length)))
+        if track_type == MetaDriveType.VEHICLE:
+            if np_random.rand() < 0.2:
+                static_tracks.add(scenario_id)
+            elif np_random.rand() < 0.3:
+                idm_tracks.add(scenario_id)
+    # vehicles can't be spawned at these steps for overlapping the ego car
+    overlaps = set(
+        (str(i), step) for i, step in zip(np_random.randint(40, size=200), np_random.randint(length, size=200))
+    )
+    # vehicles with IDM policy arrive at destinations at these steps
+    arrivals = set(
+        (str(i), step) for i, step in zip(np_random.randint(40, size=100), np_random.randint(length, size=100))
+    )
+    return tracks, length, bool(np_random.rand() < 0.5), static_tracks, idm_tracks, overlaps, arrivals
+
+
+def _run(manager_cls, tracks, length, no_static_vehicles, static_tracks, idm_tracks, overlaps, arrivals):
+    manager = manager_cls(tracks, length, no_static_vehicles, static_tracks, idm_tracks, overlaps)
+    replay_done = []
+    for step in range(1, length + 2):
+        manager.episode_step = step
+        # like before_step(), vehicles arriving at destinations are cleaned
+        manager._obj_to_clean_this_frame = [
+            scenario_id for scenario_id, obj_id in manager._scenario_id_to_obj_id.items()
+            if manager.policies[obj_id] == "idm" and (scenario_id, step) in arrivals
+        ]
+        replay_done.append(manager.after_step()["default_agent"]["replay_done"])
+    # objects spawned and cleaned in the same order, while the order of replayed objects doesn't matter
+    events = defaultdict(list)
+    for step, event, name in manager.log:
+        events[(step, event)].append(name)
+    for key in events:
+        if key[1] == "act":
+            events[key].sort()
+    return dict(events), replay_done, manager._scenario_id_to_obj_id
+
+
+def test_spawn_timeline_same_as_loop():
+    for seed in range(30):
+        scenario = _random_scenario(seed)
+        timeline_result = _run(_TimelineManager, *scenario)
+        loop_result = _run(_LoopManager, *scenario)
+        assert timeline_result == loop_result, "Different results for seed {}".format(seed)
+        assert any(event == "spawn" for _, event in timeline_result[0])
+
+
+def _run_scenarios(num_scenarios):
+    """
+    Return the scenario ids and positions of traffic objects alive at each step
+    """
+    env = ScenarioEnv(
+        {
+            "agent_policy": ReplayEgoCarPolicy,
+            "data_directory": AssetLoader.file_path("waymo", unix_style=False),
+            "num_scenarios": num_scenarios
+        }
+    )
+    ret = []
+    try:
+        for seed in range(num_scenarios):
+            env.reset(seed=seed)
+            manager = env.engine.traffic_manager
+            for _ in range(manager.current_scenario_length + 1):
+                alive = {}
+                for scenario_id, obj_id in manager._scenario_id_to_obj_id.items():
+                    obj = manager.spawned_objects[obj_id]
+                    alive[scenario_id] = (type(obj).__name__, np.round(obj.position, 3).tolist())
+                ret.append((seed, manager.episode_step, alive))
+                _, _, terminated, truncated, _ = env.step([0, 0])
+                if terminated or truncated:
+                    break
+    finally:
+        env.close()
+    return ret
+
+
+def test_real_objects_same_as_loop(monkeypatch):
+    timeline_result = _run_scenarios(3)
+    monkeypatch.setattr(ScenarioTrafficManager, "after_step", _loop_after_step)
+    loop_result = _run_scenarios(3)
+    assert len(timeline_result) == len(loop_result)
+    for timeline_step, loop_step in zip(timeline_result, loop_result):
+        assert timeline_step == loop_step, "Different objects in scenario {} at step {}".format(*loop_step[:2])
+    assert any(len(alive) > 0 for _, _, alive in timeline_result)
+
+
+if __name__ == '__main__':
+    test_spawn_timeline_same_as_loop()
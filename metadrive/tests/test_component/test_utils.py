@@ -17,5 +17,31 @@ def test_utils():
         assert distance_greater(pos, (0, 0), 0.5) == (abs(np.linalg.norm(pos, ord=2)) > 0.5)
 
 
+def test_interpolating_line():
+    from metadrive.utils.interpolating_line import InterpolatingLine
+
+    heading = np.cumsum(np.random.uniform(-0.2, 0.2, size=(50, )))
+    points = np.cumsum(np.stack([np.cos(heading), np.sin(heading)], axis=1) * 1.5, axis=0)
+    line = InterpolatingLine(points)
+    assert np.isclose(line.length, np.sum(np.linalg.norm(points[1:] - points[:-1], axis=1)))
+
+    longitudinals = np.random.uniform(-2, line.length + 2, size=(100, ))
+    batched_points = line.get_points(longitudinals, 0.5)
+    for long, point in zip(longitudinals, batched_points):
+        assert np.allclose(line.get_point(long, 0.5), point)
+
+    positions = points[:-1] + np.random.normal(0, 1, size=(len(points) - 1, 2))
+    longs, lats = line.local_coordinates_many(positions)
+    for position, long, lat in zip(positions, longs, lats):
+        assert np.allclose(line.local_coordinates(position), (long, lat))
+
+    segment_points = [seg["start_point"] for seg in line.segment_property] + [line.segment_property[-1]["end_point"]]
+    assert np.array_equal(line.segment_points, segment_points)
+
+    static_line = InterpolatingLine([(1, 1), (1, 1)])
+    assert static_line.length == 0.1 and static_line.get_heading_theta(0) == 0
+
+
 if __name__ == '__main__':
     test_utils()
+    test_interpolating_line()
@@ -1,3 +1,4 @@
+import cv2
 import numpy as np
 from metadrive.envs.scenario_env import ScenarioEnv, AssetLoader
 from metadrive.envs.top_down_env import TopDownSingleFrameMetaDriveEnv, TopDownMetaDrive, TopDownMetaDriveEnvV2
@@ -39,6 +40,42 @@ def test_top_down_rendering():
             env.close()
 
 
+def test_top_down_cv2_rasterizer():
+    observations = {}
+    for rasterizer in ["pygame", "cv2"]:
+        env = TopDownMetaDrive(
+            dict(num_scenarios=1, map="C", traffic_density=0.3, frame_stack=3, frame_skip=2, rasterizer=rasterizer)
+        )
+        try:
+            o, _ = env.reset(seed=0)
+            obs = [o]
+            for i in range(30):
+                o, *_ = env.step([-0.05 if i > 15 else 0, 1])
+                assert env.observation_space.contains(o)
+                obs.append(o)
+            observations[rasterizer] = np.stack(obs)
+        finally:
+            env.close()
+    assert observations["pygame"].shape == observations["cv2"].shape
+    # the same scene is drawn, while pygame blurs images when rotating them
+    for c in range(observations["cv2"].shape[-1]):
+        assert np.mean(observations["cv2"][..., c]) > 0.0
+        assert abs(np.mean(observations["pygame"][..., c]) - np.mean(observations["cv2"][..., c])) < 0.02
+        # pixels drawn by one rasterizer are drawn by the other one as well, allowing 1-pixel offsets
+        assert _coverage(observations["cv2"][..., c], observations["pygame"][..., c]) > 0.95
+        assert _coverage(observations["pygame"][..., c], observations["cv2"][..., c]) > 0.95
+
+
+def _coverage(images, other_images):
+    """
+    The ratio of non-zero pixels in images, which are also non-zero in other_images dilated by 1 pixel
+    """
+    kernel = np.ones((3, 3), dtype=np.uint8)
+    drawn = images > 0
+    other_drawn = np.stack([cv2.dilate((image > 0).astype(np.uint8), kernel).astype(bool) for image in other_images])
+    return np.sum(drawn & other_drawn) / max(np.sum(drawn), 1)
+
+
 def _vis_top_down_with_panda_render():
     env = TopDownMetaDrive(dict(use_render=True))
     try:
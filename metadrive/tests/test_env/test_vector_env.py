@@ -0,0 +1,30 @@
+import numpy as np
+
+from metadrive.envs.metadrive_env import MetaDriveEnv
+from metadrive.envs.vector_env import SubprocVectorEnv
+
+
+def test_subproc_vector_env():
+    num_envs = 2
+    env = SubprocVectorEnv(MetaDriveEnv, dict(num_scenarios=4, start_seed=0, horizon=20), num_envs=num_envs)
+    try:
+        obs, infos = env.reset()
+        assert obs.shape == (num_envs, ) + env.single_observation_space.shape
+        assert env.observation_space.contains(obs)
+        # scenarios are split among workers
+        seed_0, seed_1 = env.call("current_seed")
+        assert 0 <= seed_0 < 2 and 2 <= seed_1 < 4
+        for _ in range(30):
+            obs, rewards, terminateds, truncateds, infos = env.step(env.action_space.sample())
+            assert obs.shape == (num_envs, ) + env.single_observation_space.shape
+            assert rewards.shape == terminateds.shape == truncateds.shape == (num_envs, )
+            for done, info in zip(np.logical_or(terminateds, truncateds), infos):
+                if done:
+                    assert "final_observation" in info and "final_info" in info
+        assert np.all(np.array(env.call("episode_step")) <= 20)
+    finally:
+        env.close()
+
+
+if __name__ == '__main__':
+    test_subproc_vector_env()
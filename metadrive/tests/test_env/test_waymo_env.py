@@ -1,11 +1,18 @@
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
 import numpy as np
 import pytest
 
 from metadrive.constants import get_color_palette
 from metadrive.engine.asset_loader import AssetLoader
 from metadrive.envs.scenario_env import ScenarioEnv
+from metadrive.manager.scenario_data_manager import ScenarioDataManager
 from metadrive.policy.idm_policy import TrajectoryIDMPolicy
 from metadrive.policy.replay_policy import ReplayEgoCarPolicy
+from metadrive.scenario.scenario_description import ScenarioDescription as SD
 
 
 @pytest.mark.parametrize("policy", [TrajectoryIDMPolicy, ReplayEgoCarPolicy])
@@ -88,6 +95,70 @@ def test_store_map_memory_leakage(render=False):
         env.close()
 
 
+def test_prefetch_scenarios():
+    env = ScenarioEnv(
+        {
+            "agent_policy": ReplayEgoCarPolicy,
+            "store_data": False,
+            "sequential_seed": True,
+            "prefetch_scenarios": 2,
+            "data_directory": AssetLoader.file_path("waymo", unix_style=False),
+            "num_scenarios": 3
+        }
+    )
+    try:
+        for _ in range(6):
+            env.reset()
+            data_manager = env.engine.data_manager
+            seed = env.engine.global_random_seed
+            assert set(data_manager._prefetched.keys()) == {(seed + 1) % 3, (seed + 2) % 3}
+            scenario = data_manager.current_scenario
+            assert scenario[SD.METADATA][SD.SDC_ID] in scenario[SD.TRACKS]
+            for _ in range(10):
+                env.step([0, 0])
+    finally:
+        env.close()
+
+
+class _SlowDataManager(ScenarioDataManager):
+    """
+    Reading a scenario takes a while, and no engine is launched
+    """
+    engine = None
+
+    def __init__(self):
+        self.engine = SimpleNamespace(clear_objects=lambda *args, **kwargs: [])
+        self.spawned_objects = {}
+        self.np_random = None
+        self.num_prefetch = 2
+        self._scenarios = {}
+        self._prefetch_executor = None
+        self._prefetched = OrderedDict()
+        self.summary_dict, self.summary_lookup, self.mapping = {}, ["a", "b", "c"], {"a": "", "b": "", "c": ""}
+        self.started = threading.Event()
+        self.loaded = []
+
+    def _upcoming_scenario_indices(self, i):
+        return [1, 2]
+
+    def _get_scenario(self, i):
+        self.started.set()
+        scenario_id = self.summary_lookup[i]
+        time.sleep(0.2)
+        self.loaded.append(self.mapping[scenario_id] + scenario_id)
+
+
+def test_destroy_while_prefetching():
+    manager = _SlowDataManager()
+    manager._prefetch(0)
+    futures = list(manager._prefetched.values())
+    manager.started.wait()
+    manager.destroy()
+    # the running prefetch finishes before lookup tables are cleared, and the pending one is cancelled
+    assert futures[0].done() and futures[0].exception() is None and futures[1].cancelled()
+    assert manager.loaded == ["b"] and manager.mapping is None
+
+
 if __name__ == "__main__":
     test_store_map_memory_leakage(render=True)
     # test_waymo_env(policy=TrajectoryIDMPolicy, render=True)
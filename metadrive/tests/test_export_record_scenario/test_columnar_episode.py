@@ -0,0 +1,142 @@
+import os
+
+import numpy as np
+
+from metadrive.component.traffic_participants.pedestrian import Pedestrian
+from metadrive.component.vehicle.vehicle_type import DefaultVehicle
+from metadrive.envs.metadrive_env import MetaDriveEnv
+from metadrive.manager.record_manager import FrameInfo
+from metadrive.policy.idm_policy import IDMPolicy
+from metadrive.scenario.columnar_episode import ColumnarEpisode, ColumnarEpisodeWriter
+from metadrive.scenario.utils import convert_recorded_scenario_exported
+from metadrive.utils import recursive_equal
+from metadrive.utils.math import wrap_to_pi
+
+FRAME_ATTRIBUTES = [
+    "episode_step", "spawn_info", "policy_info", "policy_spawn_info", "step_info", "clear_info", "manager_info",
+    "agents", "_agent_to_object", "_object_to_agent"
+]
+
+
+def _make_frame(episode_step, t, names):
+    frame = FrameInfo(episode_step)
+    for i, name in enumerate(names):
+        frame.step_info[name] = {
+            "position": [float(t), float(i), 0.5],
+            "heading_theta": np.float64(t * 0.1),
+            "velocity": np.array([t, i], dtype=np.float32),
+            "type": DefaultVehicle,
+            "crash_vehicle": t % 7 == 0,
+            "size": (4.5, 1.8, 1.5),
+            "spawn_road": ("a", "b", 0),
+            "destination": ("c", "d") if t < 20 else ("e", "f"),
+            "navigation": [np.ones(2) * i],
+        }
+        frame.policy_info[name] = {"action": [0.1, float(t)]} if i == 0 else {}
+    frame.step_info["pedestrian"] = {"position": [1, 2, 3], "heading_theta": 1, "type": Pedestrian}
+    frame.manager_info = {"TrafficManager": {"obj_id_to_original_id": {name: name for name in names}}}
+    frame.agents = ["default_agent"]
+    frame._agent_to_object = {"default_agent": names[0]}
+    frame._object_to_agent = {names[0]: "default_agent"}
+    if t % 10 == 3:
+        frame.spawn_info[names[-1]] = {"class": DefaultVehicle, "kwargs": {"vehicle_config": {"max_speed": 10}}}
+        frame.clear_info.append(names[-1])
+    return frame
+
+
+def _assert_same_frame(frame, restored):
+    for attr in FRAME_ATTRIBUTES:
+        value, restored_value = getattr(frame, attr), getattr(restored, attr)
+        assert recursive_equal(value, restored_value, need_assert=True), attr
+    for name, state in frame.step_info.items():
+        assert list(state.keys()) == list(restored.step_info[name].keys())
+        for key, value in state.items():
+            assert type(value) == type(restored.step_info[name][key]), (name, key)
+
+
+def test_columnar_episode_round_trip(tmp_path):
+    groups = [[_make_frame(0, 0, ["v0", "v1"])]]
+    for step in range(1, 40):
+        names = ["v0"] + (["v1"] if step % 3 else []) + (["v2"] if step > 20 else [])
+        groups.append([_make_frame(step, step * 5 + k, names) for k in range(5)])
+
+    file_path = str(tmp_path / "episode.pkl")
+    writer = ColumnarEpisodeWriter(file_path, dict(map_data=dict(map_type="test"), scenario_index=0), chunk_size=37)
+    for frames in groups[:20]:
+        writer.add_frames(frames)
+    writer.flush()
+    # the written frames can be read when recording
+    assert len(ColumnarEpisode(file_path)["frame"]) == 20
+    for frames in groups[20:]:
+        writer.add_frames(frames)
+    writer.close()
+
+    episode = ColumnarEpisode(file_path)
+    assert episode["map_data"] == dict(map_type="test") and episode["scenario_index"] == 0
+    assert len(episode["frame"]) == len(groups)
+    for frames, restored_frames in zip(groups, episode["frame"]):
+        assert len(frames) == len(restored_frames)
+        for frame, restored in zip(frames, restored_frames):
+            _assert_same_frame(frame, restored)
+    for frames, restored in zip(groups, episode.get_last_frames()):
+        _assert_same_frame(frames[-1], restored)
+
+    # frames can be popped as a list
+    episode["frame"].reverse()
+    assert episode["frame"].pop()[0].episode_step == 0
+    assert len(episode["frame"]) == len(groups) - 1
+
+
+def test_record_replay_columnar_episode(tmp_path):
+    env = MetaDriveEnv(
+        dict(
+            num_scenarios=1,
+            start_seed=0,
+            traffic_density=0.1,
+            agent_policy=IDMPolicy,
+            record_episode=True,
+            record_episode_dir=str(tmp_path),
+            record_chunk_size=50,
+            horizon=300,
+        )
+    )
+    try:
+        env.reset()
+        step_info = []
+        episode = None
+        for i in range(1, 2000):
+            step_info.append({name: obj.position for name, obj in env.engine._spawned_objects.items()})
+            o, r, tm, tc, info = env.step([0, 1])
+            if tm or tc:
+                episode = env.engine.dump_episode(str(tmp_path / "episode.pkl"))
+                break
+        assert isinstance(episode, ColumnarEpisode)
+        assert os.path.exists(str(tmp_path / "episode.pkl"))
+        assert len(episode["frame"]) == len(step_info) + 1
+
+        scenario = convert_recorded_scenario_exported(episode)
+        assert scenario["length"] == len(episode["frame"])
+
+        env.config["replay_episode"] = ColumnarEpisode(str(tmp_path / "episode.pkl"))
+        env.config["record_episode"] = False
+        env.reset()
+        for i in range(0, 2000):
+            for old_id, new_id in env.engine.replay_manager.record_name_to_current_name.items():
+                obj = env.engine.replay_manager.spawned_objects[new_id]
+                pos = obj.position
+                record_state = env.engine.replay_manager.current_frame.step_info[old_id]
+                assert np.isclose(np.array([pos[0], pos[1], obj.get_z()]), np.array(record_state["position"])).all()
+                assert abs(wrap_to_pi(obj.heading_theta - record_state["heading_theta"])) < 1e-2
+                assert np.isclose(np.array(pos), np.array(step_info[i][old_id]), 1e-2, 1e-2).all()
+            o, r, tm, tc, info = env.step([0, 1])
+            if info.get("replay_done", False):
+                break
+    finally:
+        env.close()
+
+
+if __name__ == '__main__':
+    import pathlib
+    import tempfile
+    test_columnar_episode_round_trip(pathlib.Path(tempfile.mkdtemp()))
+    test_record_replay_columnar_episode(pathlib.Path(tempfile.mkdtemp()))
@@ -0,0 +1,33 @@
+import numpy as np
+
+from metadrive.envs.marl_envs import MultiAgentRoundaboutEnv
+
+
+def _rollout(batch_observation, num_steps=100):
+    env = MultiAgentRoundaboutEnv(dict(num_agents=20, batch_observation=batch_observation))
+    ret = []
+    try:
+        obs, _ = env.reset(seed=0)
+        ret.append(obs)
+        for _ in range(num_steps):
+            obs, _, tm, tc, _ = env.step({agent_id: [0.0, 1.0] for agent_id in env.agents})
+            ret.append(obs)
+            if tm["__all__"] or tc["__all__"]:
+                break
+    finally:
+        env.close()
+    return ret
+
+
+def test_batch_observation():
+    observations = _rollout(False)
+    batch_observations = _rollout(True)
+    assert len(observations) == len(batch_observations)
+    for obs, batch_obs in zip(observations, batch_observations):
+        assert list(obs.keys()) == list(batch_obs.keys())
+        for agent_id in obs:
+            np.testing.assert_array_equal(obs[agent_id], batch_obs[agent_id])
+
+
+if __name__ == '__main__':
+    test_batch_observation()
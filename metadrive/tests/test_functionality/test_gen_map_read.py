@@ -1,11 +1,25 @@
 import pickle
 
 import tqdm
+from panda3d.core import NodePath
 
+from metadrive.component.algorithm.BIG import BIG, BigGenerateMethod
+from metadrive.component.map.pg_map import PGMap
+from metadrive.component.road_network.node_road_network import NodeRoadNetwork
+from metadrive.engine.core.physics_world import PhysicsWorld
 from metadrive.envs.metadrive_env import MetaDriveEnv
+from metadrive.manager.pg_map_manager import search_block_sequence
 from metadrive.utils import recursive_equal, setup_logger
 
 
+def _lanes(road_network):
+    return [
+        (_from, _to, lane.position(0, 0).tolist(), lane.position(lane.length, 0).tolist(), lane.width)
+        for _from, to_dict in sorted(road_network.graph.items()) for _to, lanes in sorted(to_dict.items())
+        for lane in lanes
+    ]
+
+
 def test_gen_map_read():
     env_num = 3
     generate_config = {"num_scenarios": env_num, "start_seed": 0}
@@ -45,5 +59,62 @@ def test_gen_map_read():
         env.close()
 
 
+def test_search_block_sequence():
+    for seed in range(4):
+        map_config = {
+            PGMap.GENERATE_TYPE: BigGenerateMethod.BLOCK_NUM,
+            PGMap.GENERATE_CONFIG: 5,
+            PGMap.LANE_WIDTH: 3.5,
+            PGMap.LANE_NUM: 3,
+            "exit_length": 50,
+            PGMap.SEED: seed
+        }
+        big = BIG(3, 3.5, NodeRoadNetwork(), NodePath("render"), PhysicsWorld(), random_seed=seed)
+        big.generate(BigGenerateMethod.BLOCK_NUM, 5)
+        recursive_equal(
+            search_block_sequence(map_config, big.block_dist_config),
+            PGMap.get_block_sequence(big.blocks),
+            need_assert=True
+        )
+
+
+def test_gen_map_read_lazy():
+    env_num = 3
+    config = {"num_scenarios": env_num, "start_seed": 0, "map": 5, "random_lane_width": True}
+    lanes = {}
+    try:
+        env = MetaDriveEnv(config)
+        env.reset()
+        data = env.engine.map_manager.dump_all_maps(file_name="test_10maps.pickle")
+        for seed in range(env_num):
+            env.reset(seed=seed)
+            lanes[seed] = _lanes(env.current_map.road_network)
+        env.close()
+
+        # block sequences searched in processes are the same
+        env = MetaDriveEnv(config)
+        env.reset(seed=0)
+        env.engine.map_manager.clear_stored_maps()
+        searched_data = env.engine.map_manager.dump_all_maps(file_name="test_10maps_searched.pickle", num_workers=2)
+        env.close()
+        for seed in range(env_num):
+            recursive_equal(searched_data[seed]["block_sequence"], data[seed]["block_sequence"], need_assert=True)
+
+        # maps are created from the file when they are used
+        env = MetaDriveEnv(dict(pg_map_file="test_10maps_searched.pickle", **config))
+        env.reset(seed=0)
+        assert env.engine.map_manager.maps.num_stored_maps == 1
+        for seed in range(env_num):
+            env.reset(seed=seed)
+            assert env.current_map.config[PGMap.GENERATE_TYPE] == "pg_map_file"
+            assert _lanes(env.current_map.road_network) == lanes[seed]
+            for _ in range(10):
+                env.step(env.action_space.sample())
+    finally:
+        env.close()
+
+
 if __name__ == "__main__":
     test_gen_map_read()
+    test_search_block_sequence()
+    test_gen_map_read_lazy()
@@ -1,3 +1,5 @@
+import numpy as np
+
 from metadrive.envs.metadrive_env import MetaDriveEnv
 
 
@@ -29,5 +31,22 @@ def test_get_lane_index(use_render=False):
         env.close()
 
 
+def test_lane_spatial_index():
+    env = MetaDriveEnv({"map": 7, "num_scenarios": 1, "traffic_density": 0.})
+    try:
+        env.reset()
+        road_network = env.current_map.road_network
+        x_min, x_max, y_min, y_max = road_network.get_bounding_box()
+        for x in np.linspace(x_min - 20, x_max + 20, 30):
+            for y in np.linspace(y_min - 20, y_max + 20, 30):
+                all_res = road_network.get_closest_lane_index((x, y), True)
+                index, dist = road_network.get_closest_lane_index((x, y))
+                assert abs(all_res[0][0] - dist) < 1e-6 and road_network.get_lane(index).distance((x, y)) == dist
+                k_res = road_network.get_k_closest_lane_indices((x, y), 3)
+                assert np.allclose([d for d, _ in k_res], [d for d, _ in all_res[:3]])
+    finally:
+        env.close()
+
+
 if __name__ == "__main__":
     test_get_lane_index(False)
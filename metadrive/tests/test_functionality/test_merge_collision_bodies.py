@@ -0,0 +1,47 @@
+import numpy as np
+
+from metadrive.envs.metadrive_env import MetaDriveEnv
+
+
+def _rollout(merge_collision_bodies):
+    env = MetaDriveEnv(
+        dict(
+            map="SCrRX",
+            traffic_density=0.,
+            merge_collision_bodies=merge_collision_bodies,
+            vehicle_config=dict(
+                lane_line_detector=dict(num_lasers=60, distance=20), side_detector=dict(num_lasers=60, distance=50)
+            ),
+        )
+    )
+    try:
+        obs, _ = env.reset(seed=0)
+        num_ghosts = env.engine.physics_world.static_world.getNumGhosts()
+        observations, states = [obs], []
+        for i in range(300):
+            obs, _, tm, tc, info = env.step([0.3 if i < 150 else -0.3, 0.5])
+            agent = env.agent
+            observations.append(obs)
+            states.append(
+                (
+                    agent.on_white_continuous_line, agent.on_yellow_continuous_line, agent.on_broken_line,
+                    agent.crash_sidewalk, info["out_of_road"], agent.navigation.current_lane.index
+                )
+            )
+            if tm or tc:
+                break
+        return num_ghosts, np.asarray(observations), states
+    finally:
+        env.close()
+
+
+def test_merge_collision_bodies():
+    num_ghosts, observations, states = _rollout(False)
+    merged_num_ghosts, merged_observations, merged_states = _rollout(True)
+    assert merged_num_ghosts < num_ghosts
+    assert states == merged_states
+    np.testing.assert_allclose(observations, merged_observations, atol=1e-4)
+
+
+if __name__ == '__main__':
+    test_merge_collision_bodies()
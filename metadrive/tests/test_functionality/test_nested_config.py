@@ -1,3 +1,5 @@
+import numpy as np
+
 from metadrive.utils.config import Config
 
 
@@ -75,6 +77,70 @@ def test_dict_as_attribute():
     assert hasattr(c, "ff")
 
 
+def test_copy_and_update_isolation():
+    value = [1, 2]
+    array = np.zeros(3)
+    c = Config({"aa": {"bb": value, "cc": array, "dd": "str"}, "ee": 1.0})
+    d = c.copy()
+    # immutable values are shared, others are copied
+    assert d.aa.dd is c.aa.dd
+    assert d.aa is not c.aa and d.aa.bb is not c.aa.bb and d.aa.cc is not c.aa.cc
+    assert c.aa.bb is not value and c.aa.cc is not array
+    d.aa.bb.append(3)
+    d.aa.cc[0] = 1
+    d.update({"aa": {"dd": "new"}})
+    assert c.aa.bb == [1, 2] and c.aa.cc[0] == 0 and c.aa.dd == "str"
+
+    new_value = {"ff": [1]}
+    c.update({"gg": new_value, "aa": {"bb": [4]}})
+    new_value["ff"].append(2)
+    assert isinstance(c.gg, Config) and c.gg.ff == [1]
+    assert d.aa.bb == [1, 2, 3]
+
+    # type check and unknown keys
+    try:
+        d.update({"ee": "str"}, allow_add_new_key=False)
+    except AssertionError:
+        pass
+    else:
+        raise ValueError()
+    try:
+        d.update({"aa": {"hh": 1}}, allow_add_new_key=False)
+    except KeyError:
+        pass
+    else:
+        raise ValueError()
+
+
+def test_frozen_config():
+    c = Config({"aa": {"bb": {"cc": 100}}, "dd": 1})
+    f = c.frozen()
+    assert isinstance(f, Config)
+    assert f.aa.bb.cc == 100 and f["dd"] == 1 and f.get("dd") == 1
+    assert f.is_identical(c)
+
+    # the view reflects modification of the original config
+    c.update({"aa": {"bb": {"cc": 101}}, "dd": 2})
+    assert f.aa.bb.cc == 101 and f.dd == 2
+    assert f.get_dict() == c.get_dict()
+
+    for modify in [lambda: f.__setitem__("dd", 3), lambda: f.update({"dd": 3}), lambda: f.aa.bb.update({"cc": 3}),
+                   lambda: setattr(f.aa.bb, "cc", 3), lambda: f.force_set("dd", 3), lambda: f.pop("dd"),
+                   lambda: dict(f.items())["aa"].update({"bb": 3})]:
+        try:
+            modify()
+        except ValueError:
+            pass
+        else:
+            raise ValueError()
+    assert c.aa.bb.cc == 101 and c.dd == 2
+
+    # a copy of the view is a normal config
+    d = f.copy()
+    d.update({"dd": 3})
+    assert d.dd == 3 and c.dd == 2
+
+
 if __name__ == '__main__':
     # test_recursive_config()
     # test_partially_update()
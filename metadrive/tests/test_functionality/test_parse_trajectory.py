@@ -0,0 +1,52 @@
+import numpy as np
+
+from metadrive.scenario.parse_object_state import parse_object_state, parse_trajectory, parse_full_trajectory
+
+
+def _make_track(length=50, seed=0):
+    rng = np.random.default_rng(seed)
+    position = np.cumsum(rng.uniform(0, 2, size=(length, 3)), axis=0)
+    # a broken step
+    position[length - 10:] += 500
+    valid = rng.uniform(size=length) > 0.2
+    return dict(
+        type="VEHICLE",
+        state=dict(
+            position=position,
+            heading=rng.uniform(-np.pi, np.pi, size=length),
+            velocity=rng.uniform(-10, 10, size=(length, 2)),
+            valid=valid,
+            length=np.full((length, 1), 4.5),
+            width=np.full((length, 1), 2.0),
+            height=np.full((length, 1), 1.5),
+            throttle_brake=rng.uniform(-1, 1, size=(length, 1)),
+        ),
+        metadata=dict(),
+    )
+
+
+def test_parse_trajectory():
+    track = _make_track()
+    length = len(track["state"]["position"])
+    for scenario_length in [None, length, length + 5]:
+        trajectory = parse_trajectory(track, length=scenario_length, include_z_position=True)
+        assert len(trajectory["valid"]) == (scenario_length or length)
+        for i in range(scenario_length or length):
+            state = parse_object_state(track, i, include_z_position=True)
+            assert bool(trajectory["valid"][i]) == bool(state["valid"])
+            np.testing.assert_allclose(trajectory["position"][i], state["position"])
+            np.testing.assert_allclose(trajectory["velocity"][i], state["velocity"])
+            np.testing.assert_allclose(trajectory["heading"][i], state["heading"])
+            np.testing.assert_allclose(trajectory["angular_velocity"][i], state["angular_velocity"])
+            np.testing.assert_allclose(trajectory["throttle_brake"][i], state["throttle_brake"])
+            assert trajectory["vehicle_class"] is state["vehicle_class"]
+    assert parse_trajectory(track)["position"].shape == (length, 2)
+
+    # the step before the broken one is the last state, and the full trajectory ends before it
+    assert len(parse_full_trajectory(track)) == length - 11
+    last_state = parse_object_state(track, -1, check_last_state=True)
+    np.testing.assert_allclose(last_state["position"], track["state"]["position"][length - 11, :2])
+
+
+if __name__ == '__main__':
+    test_parse_trajectory()
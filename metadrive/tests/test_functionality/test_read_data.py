@@ -1,3 +1,5 @@
+import os
+
 from metadrive.engine.asset_loader import AssetLoader
 from metadrive.scenario.utils import read_dataset_summary, read_scenario_data
 
@@ -16,3 +18,87 @@ def test_read_nuscenes_data():
         data = read_scenario_data(AssetLoader.file_path("nuscenes", mapping[p], p, unix_style=False))
         data.sanity_check(data, check_self_type=False, valid_check=False)
         print("Finish: ", p)
+
+
+def test_read_columnar_data(tmp_path):
+    from metadrive.scenario.columnar import convert_dataset_to_columnar
+    from metadrive.scenario.scenario_description import ScenarioDescription as SD
+    import numpy as np
+    dataset_path = AssetLoader.file_path("nuscenes", unix_style=False)
+    output_path = str(tmp_path / "nuscenes_columnar")
+    convert_dataset_to_columnar(dataset_path, output_path)
+    summary_dict, summary_list, mapping = read_dataset_summary(dataset_path)
+    _, columnar_list, columnar_mapping = read_dataset_summary(output_path)
+    assert summary_list == columnar_list
+    for p in summary_list:
+        data = read_scenario_data(AssetLoader.file_path("nuscenes", mapping[p], p, unix_style=False), centralize=True)
+        columnar_data = read_scenario_data(os.path.join(output_path, columnar_mapping[p], p), centralize=True)
+        columnar_data.sanity_check(columnar_data, check_self_type=False, valid_check=False)
+        assert data[SD.TRACKS].keys() == columnar_data[SD.TRACKS].keys()
+        for track_id, track in data[SD.TRACKS].items():
+            for k, state in track[SD.STATE].items():
+                np.testing.assert_array_equal(state, columnar_data[SD.TRACKS][track_id][SD.STATE][k])
+        for feature_id, feature in data[SD.MAP_FEATURES].items():
+            if SD.POLYLINE in feature:
+                np.testing.assert_array_equal(
+                    feature[SD.POLYLINE], columnar_data[SD.MAP_FEATURES][feature_id][SD.POLYLINE]
+                )
+
+
+def test_read_difficulty_index(tmp_path):
+    import pickle
+    import shutil
+    from metadrive.scenario.scenario_description import ScenarioDescription as SD
+    from metadrive.scenario.utils import read_difficulty_index, get_scenario_difficulty
+    dataset_path = str(tmp_path / "nuscenes")
+    shutil.copytree(AssetLoader.file_path("nuscenes", unix_style=False), dataset_path)
+    index = read_difficulty_index(dataset_path, num_processes=2)
+    assert os.path.isfile(os.path.join(dataset_path, SD.DATASET.DIFFICULTY_FILE))
+    summary_dict, summary_list, mapping = read_dataset_summary(dataset_path)
+    assert set(index.keys()) == set(summary_list)
+    for p in summary_list:
+        assert index[p] == get_scenario_difficulty(read_scenario_data(os.path.join(dataset_path, mapping[p], p)))
+    assert read_difficulty_index(dataset_path, summary_list[:2]) == index
+
+    # the statistics are computed again for a changed file
+    changed, unchanged = summary_list[0], summary_list[1]
+    changed_path = os.path.join(dataset_path, mapping[changed], changed)
+    scenario = read_scenario_data(os.path.join(dataset_path, mapping[unchanged], unchanged))
+    with open(changed_path, "wb") as f:
+        pickle.dump(scenario, f)
+    new_index = read_difficulty_index(dataset_path, num_processes=1)
+    assert new_index[changed] == new_index[unchanged] == index[unchanged]
+
+
+def _read_difficulty_index_and_count(dataset_path, scenario_files, log_file):
+    from metadrive.scenario import utils
+    from metadrive.scenario.utils import get_scenario_difficulty
+
+    def _get_scenario_file_difficulty(file_path):
+        with open(log_file, "a") as f:
+            f.write(file_path + "\n")
+        return get_scenario_difficulty(read_scenario_data(file_path))
+
+    utils._get_scenario_file_difficulty = _get_scenario_file_difficulty
+    return utils.read_difficulty_index(dataset_path, scenario_files, num_processes=1)
+
+
+def test_read_difficulty_index_concurrently(tmp_path):
+    import multiprocessing
+    import pickle
+    import shutil
+    from metadrive.scenario.scenario_description import ScenarioDescription as SD
+    dataset_path = str(tmp_path / "nuscenes")
+    log_file = str(tmp_path / "computed.txt")
+    shutil.copytree(AssetLoader.file_path("nuscenes", unix_style=False), dataset_path)
+    _, summary_list, _ = read_dataset_summary(dataset_path)
+    subsets = [summary_list[i::3] for i in range(3)] + [summary_list] * 3
+    with multiprocessing.get_context("fork").Pool(len(subsets)) as pool:
+        indices = pool.starmap(_read_difficulty_index_and_count, [(dataset_path, s, log_file) for s in subsets])
+    # each scenario is computed once and no process overwrites entries saved by others
+    with open(log_file) as f:
+        assert sorted(os.path.basename(p) for p in f.read().split()) == sorted(summary_list)
+    with open(os.path.join(dataset_path, SD.DATASET.DIFFICULTY_FILE), "rb") as f:
+        assert set(pickle.load(f).keys()) == set(summary_list)
+    for index, scenario_files in zip(indices, subsets):
+        assert set(scenario_files) <= set(index.keys())
@@ -0,0 +1,33 @@
+from metadrive.envs.metadrive_env import MetaDriveEnv
+
+
+def test_step_profiler():
+    env = MetaDriveEnv(dict(profile_step=True, profile_window=5, profile_step_info=True, traffic_density=0.1))
+    try:
+        env.reset()
+        for _ in range(10):
+            _, _, _, _, info = env.step([0, 0])
+        profiler = env.engine.step_profiler
+        for key in ["total", "physics_world", "before_step/agent_manager", "after_step/traffic_manager", "sensor/lidar",
+                    "observation/LidarStateObservation", "reward_function", "done_function"]:
+            assert key in info["profile"], key
+            assert len(profiler.records[key]) == 5
+        statistics = profiler.get_statistics()
+        assert statistics["total"]["mean"] >= statistics["physics_world"]["mean"]
+        counts, _ = profiler.get_histogram("total", bins=3)
+        assert counts.sum() == 5
+    finally:
+        env.close()
+
+    env = MetaDriveEnv(dict(traffic_density=0.1))
+    try:
+        env.reset()
+        _, _, _, _, info = env.step([0, 0])
+        assert env.engine.step_profiler is None
+        assert "profile" not in info
+    finally:
+        env.close()
+
+
+if __name__ == '__main__':
+    test_step_profiler()
@@ -0,0 +1,167 @@
+import math
+
+import cv2
+import numpy as np
+from panda3d.core import NodePath
+
+from metadrive.component.algorithm.BIG import BIG, BigGenerateMethod
+from metadrive.component.map.pg_map import PGMap
+from metadrive.component.road_network.node_road_network import NodeRoadNetwork
+from metadrive.constants import MapTerrainSemanticColor, MetaDriveType, PGDrivableAreaProperty
+from metadrive.engine.core.physics_world import PhysicsWorld
+from metadrive.envs.metadrive_env import MetaDriveEnv
+from metadrive.utils.shapely_utils.geom import find_longest_edge
+
+
+def _to_points(polygon, center_p, pixels_per_meter, size):
+    return [
+        [int((x - center_p[0]) * pixels_per_meter + size / 2),
+         int((y - center_p[1]) * pixels_per_meter) + size / 2] for x, y in polygon
+    ]
+
+
+def _reference_semantic_map(
+    m,
+    center_p,
+    size=512,
+    pixels_per_meter=8,
+    color_setting=MapTerrainSemanticColor,
+    line_sample_interval=2,
+    yellow_line_thickness=1,
+    white_line_thickness=1,
+    layer=("lane_line", "lane")
+):
+    """
+    BaseMap.get_semantic_map() converting and drawing points one by one, before the rasterization inputs are cached
+    """
+    all_lanes = m.get_map_features(interval=line_sample_interval)
+    polygons = []
+    polylines = []
+    points_to_skip = math.floor(PGDrivableAreaProperty.STRIPE_LENGTH * 2 / line_sample_interval)
+    for obj in all_lanes.values():
+        if MetaDriveType.is_lane(obj["type"]) and "lane" in layer:
+            polygons.append((obj["polygon"], color_setting.get_color(obj["type"])))
+        elif "lane_line" in layer and (MetaDriveType.is_road_line(obj["type"])
+                                       or MetaDriveType.is_road_boundary_line(obj["type"])):
+            if MetaDriveType.is_broken_line(obj["type"]):
+                for index in range(0, len(obj["polyline"]) - 1, points_to_skip * 2):
+                    if index + points_to_skip < len(obj["polyline"]):
+                        polylines.append(
+                            (
+                                [obj["polyline"][index],
+                                 obj["polyline"][index + points_to_skip]], color_setting.get_color(obj["type"])
+                            )
+                        )
+            else:
+                polylines.append((obj["polyline"], color_setting.get_color(obj["type"])))
+
+    size = int(size * pixels_per_meter)
+    mask = np.zeros([size, size, 1], dtype=np.uint8)
+    mask[..., 0] = color_setting.get_color(MetaDriveType.GROUND)
+    for polygon, color in polygons:
+        points = _to_points(polygon, center_p, pixels_per_meter, size)
+        cv2.fillPoly(mask, np.array([points]).astype(np.int32), color=color)
+    for line, color in polylines:
+        points = _to_points(line, center_p, pixels_per_meter, size)
+        thickness = yellow_line_thickness if color == MapTerrainSemanticColor.YELLOW else white_line_thickness
+        cv2.polylines(mask, np.array([points]).astype(np.int32), False, color, thickness)
+    if "crosswalk" in layer:
+        for sidewalk in m.crosswalks.values():
+            polygon = sidewalk["polygon"]
+            points = _to_points(polygon, center_p, pixels_per_meter, size)
+            p_1, p_2 = find_longest_edge(polygon)[0]
+            dir = (p_2[0] - p_1[0], p_2[1] - p_1[1])
+            angle = np.arctan2(*dir) / np.pi * 180 + 180
+            angle = int(angle / 2) + color_setting.get_color(MetaDriveType.CROSSWALK)
+            cv2.fillPoly(mask, np.array([points]).astype(np.int32), color=angle)
+    return mask
+
+
+def _reference_height_map(m, center_p, size=2048, pixels_per_meter=1, extension=2, height=1):
+    """
+    BaseMap.get_height_map() converting points one by one, before the polygons are cached
+    """
+    extension = max(1, extension)
+    polygons = [obj["polygon"] for obj in m.get_map_features().values() if MetaDriveType.is_lane(obj["type"])]
+    polygons += [sidewalk["polygon"] for sidewalk in m.sidewalks.values()]
+    size = int(size * pixels_per_meter)
+    mask = np.zeros([size, size, 1])
+    for polygon in polygons:
+        points = _to_points(polygon, center_p, pixels_per_meter, size)
+        cv2.fillPoly(mask, np.asarray([points]).astype(np.int32), color=[height])
+    if abs(extension - 1) > 1e-1:
+        kernel = np.ones(((extension + 1) * pixels_per_meter, (extension + 1) * pixels_per_meter), np.uint8)
+        mask = cv2.dilate(mask, kernel, iterations=1)
+        mask = np.expand_dims(mask, axis=-1)
+    return mask
+
+
+def _create_map(seed, block_num):
+    """
+    Create a PG map without engine, with crosswalks at random places
+    """
+    network = NodeRoadNetwork()
+    big = BIG(3, 3.5, network, NodePath("render"), PhysicsWorld(), random_seed=seed)
+    big.generate(BigGenerateMethod.BLOCK_NUM, block_num)
+    m = object.__new__(PGMap)
+    m.road_network, m.blocks, m.sidewalks, m.crosswalks, m.terrain_cache = network, big.blocks, {}, {}, {}
+    for block in big.blocks:
+        m.sidewalks.update(block.sidewalks)
+        m.crosswalks.update(block.crosswalks)
+    np_random = np.random.RandomState(seed)
+    for i in range(20):
+        center = np_random.uniform(-100, 100, 2)
+        angle = np_random.uniform(0, 2 * np.pi)
+        d_1 = np.array([np.cos(angle), np.sin(angle)]) * 8
+        d_2 = np.array([-np.sin(angle), np.cos(angle)]) * 3
+        m.crosswalks["random_crosswalk_{}".format(i)] = dict(
+            type=MetaDriveType.CROSSWALK, polygon=[center, center + d_1, center + d_1 + d_2, center + d_2]
+        )
+    return m
+
+
+def test_terrain_same_as_reference():
+    for seed in range(3):
+        m = _create_map(seed, 5)
+        for center in [[0, 0], [37.3, -12.7]]:
+            for kwargs in [dict(size=256, pixels_per_meter=4, layer=["lane", "lane_line", "crosswalk"]),
+                           dict(size=512, pixels_per_meter=3, white_line_thickness=2, yellow_line_thickness=3)]:
+                reference = _reference_semantic_map(m, center, **kwargs)
+                # the second call uses cached inputs
+                for _ in range(2):
+                    assert np.array_equal(m.get_semantic_map(center, **kwargs), reference)
+            for args in [(1024, 1, 3), (512, 2, 1)]:
+                reference = _reference_height_map(m, center, *args)
+                assert reference.sum() > 0
+                for _ in range(2):
+                    assert np.array_equal(m.get_height_map(center, *args), reference)
+
+
+def test_terrain_cache():
+    env = MetaDriveEnv(dict(num_scenarios=2, start_seed=0, map="XCOST", use_mesh_terrain=True))
+    try:
+        env.reset(seed=0)
+        m = env.current_map
+        assert any(key[0] == "drivable_region" for key in m.terrain_cache if isinstance(key, tuple))
+        region = env.engine.terrain.get_drivable_region([0, 0])
+        layer = ["lane", "lane_line", "crosswalk"]
+        semantics = m.get_semantic_map([0, 0], size=256, pixels_per_meter=4, layer=layer)
+
+        env.reset(seed=1)
+        env.reset(seed=0)
+        assert env.current_map is m
+        assert np.array_equal(env.engine.terrain.get_drivable_region([0, 0]), region)
+
+        # the cached terrain is the same as the one rasterized again
+        m.terrain_cache.clear()
+        assert np.array_equal(m.get_semantic_map([0, 0], size=256, pixels_per_meter=4, layer=layer), semantics)
+        assert np.array_equal(env.engine.terrain.get_drivable_region([0, 0]), region)
+        for _ in range(10):
+            env.step([0, 0])
+    finally:
+        env.close()
+
+
+if __name__ == '__main__':
+    test_terrain_same_as_reference()
+    test_terrain_cache()
@@ -1,4 +1,13 @@
+from types import SimpleNamespace
+
+import numpy as np
+from panda3d.bullet import BulletWorld, BulletRigidBodyNode, BulletBoxShape, BulletVehicle
+from panda3d.core import Vec3
+
+from metadrive.base_class.base_object import PhysicsNodeList
+from metadrive.component.vehicle.base_vehicle import BaseVehicle
 from metadrive.envs.metadrive_env import MetaDriveEnv
+from metadrive.manager.traffic_manager import PGTrafficManager
 
 
 def test_traffic_mode(render=False):
@@ -32,5 +41,172 @@ def test_traffic_mode(render=False):
         env.close()
 
 
+def test_kinematic_traffic(render=False):
+    env = MetaDriveEnv(
+        {
+            "num_scenarios": 1,
+            "traffic_density": 0.2,
+            "traffic_mode": "respawn",
+            "kinematic_traffic": True,
+            "start_seed": 22,
+            "use_render": render,
+            "map": "SCS",
+        }
+    )
+    try:
+        env.reset()
+        traffic_manager = env.engine.traffic_manager
+        assert len(traffic_manager._traffic_vehicles) != 0
+        start_positions = {v.id: v.position for v in traffic_manager._traffic_vehicles}
+        for s in range(1, 100):
+            env.step([0, 0])
+            for v in traffic_manager._traffic_vehicles:
+                assert v.id in traffic_manager._kinematic_models
+                assert v.body.isKinematic()
+                lane = v.navigation.current_lane
+                assert lane.distance(v.position) < lane.width
+        # only the ego vehicle is simulated as a raycast vehicle
+        assert env.engine.physics_world.dynamic_world.getNumVehicles() == 1
+        moved = [
+            np.linalg.norm(v.position - start_positions[v.id]) > 1 for v in traffic_manager._traffic_vehicles
+            if v.id in start_positions
+        ]
+        assert any(moved)
+        env.reset()
+        assert len(traffic_manager._kinematic_models) == len(traffic_manager._traffic_vehicles)
+    finally:
+        env.close()
+
+
+def _check_kinematic_models(traffic_manager, dying_objects):
+    """
+    Vehicles of the traffic manager are kinematic bodies without raycast vehicles, while recycled vehicles are restored
+    """
+    vehicles = [obj for obj in traffic_manager.spawned_objects.values() if isinstance(obj, BaseVehicle)]
+    assert set(traffic_manager._kinematic_models.keys()) == {v.id for v in vehicles}
+    for v in vehicles:
+        assert v.body.isKinematic() and v.system not in v.dynamic_nodes
+    for v in dying_objects:
+        assert not v.body.isKinematic() and list(v.dynamic_nodes) == [v.system, v.body]
+
+
+def test_kinematic_traffic_reset():
+    for mode in ["respawn", "trigger"]:
+        env = MetaDriveEnv(
+            {
+                "num_scenarios": 3,
+                "traffic_density": 0.3,
+                "traffic_mode": mode,
+                "kinematic_traffic": True,
+                "map": "SCS",
+            }
+        )
+        try:
+            for seed in [0, 1, 2, 0, 1]:
+                env.reset(seed=seed)
+                env.agent.set_velocity([1, 0], 20)
+                for s in range(200):
+                    env.step([0, 1])
+                    if s % 20 == 0:
+                        _check_kinematic_models(
+                            env.engine.traffic_manager, [
+                                obj for objs in env.engine._dying_objects.values()
+                                for obj in objs if isinstance(obj, BaseVehicle)
+                            ]
+                        )
+                assert env.engine.physics_world.dynamic_world.getNumVehicles() == 1
+        finally:
+            env.close()
+
+
+class _FakeVehicle(BaseVehicle):
+    position = (0, 0)
+    speed = 0
+    heading_theta = 0
+
+    def __init__(self, world, name):
+        self.id = self.name = name
+        self._body = BulletRigidBodyNode(name)
+        self._body.addShape(BulletBoxShape(Vec3(2, 1, 0.5)))
+        self._body.setMass(1000)
+        self.system = BulletVehicle(world, self._body)
+        self.dynamic_nodes = PhysicsNodeList()
+        self.dynamic_nodes.append(self.system)
+        self.dynamic_nodes.append(self.body)
+
+
+class _FakeEngine:
+    """
+    Spawn, recycle and destroy vehicles in a physics world like BaseEngine
+    """
+    def __init__(self):
+        self.physics_world = SimpleNamespace(dynamic_world=BulletWorld())
+        self.spawned_objects = {}
+        self.dying_objects = []
+        self.count = 0
+
+    def spawn_object(self, object_class, **kwargs):
+        if len(self.dying_objects) > 0:
+            obj = self.dying_objects.pop(0)
+        else:
+            obj = _FakeVehicle(self.physics_world.dynamic_world, str(self.count))
+            self.count += 1
+        obj.dynamic_nodes.attach_to_physics_world(self.physics_world.dynamic_world)
+        self.spawned_objects[obj.id] = obj
+        return obj
+
+    def clear_objects(self, filter, force_destroy=False):
+        if isinstance(filter, (list, tuple)):
+            obj_ids = list(filter)
+        else:
+            obj_ids = [obj_id for obj_id, obj in self.spawned_objects.items() if filter(obj)]
+        for obj_id in obj_ids:
+            obj = self.spawned_objects.pop(obj_id)
+            obj.dynamic_nodes.detach_from_physics_world(self.physics_world.dynamic_world)
+            if not force_destroy:
+                self.dying_objects.append(obj)
+        return obj_ids
+
+
+class _KinematicTrafficManager(PGTrafficManager):
+    engine = None
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.spawned_objects = {}
+        self.kinematic_traffic = True
+        self._kinematic_models = {}
+
+
+def test_kinematic_models_bookkeeping():
+    engine = _FakeEngine()
+    world = engine.physics_world.dynamic_world
+    manager = _KinematicTrafficManager(engine)
+    rng = np.random.RandomState(0)
+    for _ in range(300):
+        op = rng.randint(5)
+        if op < 2:
+            manager.spawn_object(_FakeVehicle)
+        elif op == 2 and len(manager.spawned_objects) > 0:
+            manager.clear_objects([list(manager.spawned_objects.keys())[rng.randint(len(manager.spawned_objects))]])
+        elif op == 3:
+            # filtered by a function like engine.clear_objects()
+            remainder = rng.randint(3)
+            manager.clear_objects(lambda obj: int(obj.id) % 3 == remainder)
+        elif rng.rand() < 0.3:
+            # reset
+            manager.clear_objects(list(manager.spawned_objects.keys()))
+        else:
+            # recycled vehicles spawned by another manager are raycast vehicles again
+            other = engine.spawn_object(_FakeVehicle)
+            assert not other.body.isKinematic() and other.system in other.dynamic_nodes
+            assert world.getNumVehicles() == 1
+            engine.clear_objects([other.id])
+        _check_kinematic_models(manager, engine.dying_objects)
+        assert world.getNumVehicles() == 0 and world.getNumRigidBodies() == len(manager.spawned_objects)
+
+
 if __name__ == "__main__":
     test_traffic_mode()
+    test_kinematic_traffic()
+    test_kinematic_traffic_reset()
@@ -1,12 +1,15 @@
+from types import SimpleNamespace
+
 import numpy as np
 import pytest
 
+from metadrive.component.lane.straight_lane import StraightLane
 from metadrive.component.vehicle.vehicle_type import DefaultVehicle
 from metadrive.engine.engine_utils import initialize_engine
 from metadrive.envs import MetaDriveEnv
 from metadrive.envs.base_env import BASE_DEFAULT_CONFIG
 from metadrive.envs.metadrive_env import METADRIVE_DEFAULT_CONFIG
-from metadrive.policy.idm_policy import IDMPolicy
+from metadrive.policy.idm_policy import IDMPolicy, FrontBackObjects, LaneOccupancyTable
 from metadrive.utils import Config
 
 
@@ -77,6 +80,77 @@ def test_idm_policy_is_moving(use_mesh_terrain, render=False, in_test=True):
         env.close()
 
 
+def test_lane_occupancy_table():
+    # 3 roads with 3 lanes each, connected one by one
+    roads = []
+    for r in range(3):
+        lanes = []
+        for k in range(3):
+            lane = StraightLane((50 * r, 3.5 * k), (50 * (r + 1), 3.5 * k), 3.5)
+            lane.index = (str(r), str(r + 1), k)
+            lanes.append(lane)
+        roads.append(lanes)
+    all_lanes = [lane for lanes in roads for lane in lanes]
+    rng = np.random.RandomState(0)
+    for _ in range(200):
+        objs = []
+        for i in range(rng.randint(1, 30)):
+            lane = all_lanes[rng.randint(len(all_lanes))]
+            position = np.asarray(lane.position(rng.uniform(0, lane.length), rng.uniform(-1, 1)))
+            objs.append(SimpleNamespace(lane=lane, position=position))
+        ego = objs[rng.randint(len(objs))]
+        ref_lanes = roads[int(ego.lane.index[0])]
+        for lanes in [None, ref_lanes]:
+            expected = FrontBackObjects.get_find_front_back_objs(
+                [obj for obj in objs if obj is not ego], ego.lane, ego.position, 30, lanes
+            )
+            ret = FrontBackObjects.get_find_front_back_objs(
+                LaneOccupancyTable(objs).exclude(ego), ego.lane, ego.position, 30, lanes
+            )
+            for i in range(3):
+                assert ret.front_objs[i] is expected.front_objs[i]
+                assert ret.back_objs[i] is expected.back_objs[i]
+                assert ret.front_dist[i] == pytest.approx(expected.front_dist[i])
+                assert ret.back_dist[i] == pytest.approx(expected.back_dist[i])
+
+
+class _AccelerationIDMPolicy(IDMPolicy):
+    def acceleration(self, front_obj, dist_to_front) -> float:
+        return 0.0
+
+
+class _LaneChangeIDMPolicy(IDMPolicy):
+    def lane_change_policy(self, all_objects):
+        return None, 5, self.routing_target_lane
+
+
+def test_batch_act_fallback():
+    assert IDMPolicy.can_batch_act(object.__new__(IDMPolicy))
+    assert not IDMPolicy.can_batch_act(object.__new__(_LaneChangeIDMPolicy))
+    # the overridden acceleration() is used by calling act() of the policy
+    policy = object.__new__(_AccelerationIDMPolicy)
+    policy.act = lambda: [0.1, policy.acceleration(None, 5)]
+    assert not IDMPolicy.can_batch_act(policy)
+    assert IDMPolicy.batch_act([policy], []) == [[0.1, 0.0]]
+
+
+def test_batch_traffic_policy():
+    config = {"traffic_mode": "respawn", "map": "SCS", "traffic_density": 0.3, "batch_traffic_policy": True}
+    env = MetaDriveEnv(config)
+    try:
+        env.reset(seed=0)
+        start_pos = {v.id: v.position for v in env.engine.traffic_manager.traffic_vehicles}
+        for t in range(100):
+            env.step([0, 0])
+        moved = [
+            np.linalg.norm(v.position - start_pos[v.id]) > 1 for v in env.engine.traffic_manager.traffic_vehicles
+            if v.id in start_pos
+        ]
+        assert any(moved)
+    finally:
+        env.close()
+
+
 if __name__ == '__main__':
     # test_idm_policy_briefly()
     test_idm_policy_is_moving(False, render=True, in_test=False)
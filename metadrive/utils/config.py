@@ -51,6 +51,22 @@ def _recursive_check_keys(new_config, old_config, prefix=""):
                 _recursive_check_keys(new, old, new_prefix)
 
 
+# values of these types are immutable, so they are shared between a config and its copies instead of being deep copied
+_IMMUTABLE_TYPES = (int, float, bool, str, bytes, type(None), type)
+
+
+def _copy_value(value, dict_to_config=True):
+    """
+    Copy a value to be stored in Config. Configs and dicts become new Configs, unless dict_to_config is False, immutable
+    values are shared and other values are deep copied
+    """
+    if isinstance(value, Config) or (dict_to_config and isinstance(value, dict)):
+        return Config(value)
+    if isinstance(value, _IMMUTABLE_TYPES):
+        return value
+    return copy.deepcopy(value)
+
+
 def config_to_dict(config: Union[Any, dict, "Config"], serializable=False) -> dict:
     # Return the flatten and json-able dict
     if not isinstance(config, (dict, Config)):
@@ -75,15 +91,16 @@ class Config:
     Besides, the value type will also be checked, but sometimes the value type is not unique (maybe Union[str, int]).
     For these <key, value> items, use Config["your key"] = None to init your PgConfig, then it will not implement
     type check at the first time. key "config" in map.py and key "force_fps" in world.py are good examples.
+
+    Creating, copying or updating a Config copies each input value once. Immutable values, like numbers, strings and
+    classes, are shared instead of being deep copied. Use frozen() to get a read-only view without copying.
     """
     def __init__(self, config: Union["Config", dict], unchangeable=False):
         self._unchangeable = False
-        if isinstance(config, Config):
-            config = config.get_dict()
-        self._config = self._internal_dict_to_config(copy.deepcopy(config))
+        self._config = {k: self._normalize_value(_copy_value(v)) for k, v in (config or dict()).items()}
         self._types = dict()
-        for k, v in self._config.items():
-            self._set_item(k, v, allow_overwrite=True)
+        # the same as calling self._set_item(k, v, allow_overwrite=True) for all items, where no type is checked
+        self.__dict__.update(self._config)
         self._unchangeable = unchangeable
 
     def clear(self):
@@ -134,7 +151,6 @@ class Config:
         if len(new_dict) == 0:
             return self
         stop_recursive_update = stop_recursive_update or []
-        new_dict = copy.deepcopy(new_dict)
         if not allow_add_new_key:
             old_keys = set(self._config)
             new_keys = set(new_dict)
@@ -146,20 +162,22 @@ class Config:
                         diff, self._config.keys()
                     )
                 )
+        # values are copied where they are stored, so that new_dict is copied only once
         for k, v in new_dict.items():
             if k not in self:
-                if isinstance(v, dict):
-                    v = Config(v)
-                self._config[k] = v  # Placeholder
-            success = False
-            if isinstance(self._config[k], (dict, Config)):
+                self._config[k] = None  # Placeholder
+                self._set_item(k, _copy_value(v), allow_add_new_key)
+                success = True
+            elif isinstance(self._config[k], (dict, Config)):
                 if k not in stop_recursive_update:
                     success = self._update_dict_item(k, v, allow_add_new_key)
                 else:
-                    self._set_item(k, v, allow_add_new_key)
+                    self._set_item(k, _copy_value(v, dict_to_config=False), allow_add_new_key)
                     success = True
+            else:
+                success = False
             if not success:
-                self._update_single_item(k, v, allow_add_new_key)
+                self._update_single_item(k, _copy_value(v), allow_add_new_key)
             if k in self._config and not hasattr(self, k):
                 self.__setattr__(k, self._config[k])
         return self
@@ -197,16 +215,6 @@ class Config:
         self._config.pop(key)
         self.__delattr__(key)
 
-    @classmethod
-    def _internal_dict_to_config(cls, d: dict) -> dict:
-        ret = dict()
-        d = d or dict()
-        for k, v in d.items():
-            if isinstance(v, dict):
-                v = cls(v)
-            ret[k] = v
-        return ret
-
     def _check_and_raise_key_error(self, key):
         if key not in self._config:
             raise KeyError(
@@ -222,14 +230,20 @@ class Config:
             unchangeable = self._unchangeable
         return Config(self, unchangeable)
 
+    def frozen(self):
+        """
+        Return a read-only view of this config. It shares the storage with this config, so it is created without copying
+        and reflects later modification of this config. Modifying the view raises ValueError.
+        """
+        return FrozenConfig(self)
+
     def __getitem__(self, item):
         self._check_and_raise_key_error(item)
         ret = self._config[item]
         return ret
 
-    def _set_item(self, key, value, allow_overwrite):
-        """A helper function to replace __setattr__ and __setitem__!"""
-        self._check_and_raise_key_error(key)
+    @staticmethod
+    def _normalize_value(value):
         if isinstance(value, np.ndarray) and len(value) == 1:
             # handle 1-d box shape sample
             value = value[0]
@@ -239,6 +253,12 @@ class Config:
                 value = int(value)
         if isinstance(value, pathlib.Path):
             value = str(value)
+        return value
+
+    def _set_item(self, key, value, allow_overwrite):
+        """A helper function to replace __setattr__ and __setitem__!"""
+        self._check_and_raise_key_error(key)
+        value = self._normalize_value(value)
         if self._unchangeable:
             raise ValueError("This config is not changeable!")
         if (not allow_overwrite) and (self._config[key] is not None and value is not None):
@@ -326,6 +346,65 @@ class Config:
         self._unchangeable = unchangeable
 
 
+class FrozenConfig(Config):
+    """
+    A read-only view of a Config, which is returned by Config.frozen(). The storage is shared with the original config
+    and nested configs are returned as read-only views as well. Note that values are not copied, so mutable values like
+    lists can still be modified in place.
+    """
+    def __init__(self, config: Config):
+        super(Config, self).__setattr__("_source", config)
+
+    @property
+    def _config(self):
+        return self._source._config
+
+    @property
+    def _types(self):
+        return self._source._types
+
+    @property
+    def _unchangeable(self):
+        return True
+
+    @staticmethod
+    def _view(value):
+        return value.frozen() if isinstance(value, Config) else value
+
+    def __getattr__(self, item):
+        # only called when the attribute is not found, since keys are not stored as attributes of the view
+        if item.startswith("__") or item == "_source":
+            raise AttributeError(item)
+        try:
+            return self[item]
+        except KeyError:
+            raise AttributeError(item)
+
+    def __getitem__(self, item):
+        return self._view(self._source[item])
+
+    def get(self, key, *args):
+        return self._view(self._source.get(key, *args))
+
+    def items(self):
+        return [(k, self._view(v)) for k, v in self._source.items()]
+
+    def values(self):
+        return [self._view(v) for v in self._source.values()]
+
+    def copy(self, unchangeable=None):
+        """Return a copy of the original config"""
+        return self._source.copy(unchangeable)
+
+    def frozen(self):
+        return self
+
+    def _raise_unchangeable(self, *args, **kwargs):
+        raise ValueError("This config is a read-only view!")
+
+    update = force_update = force_set = set_unchangeable = pop = clear = register_type = _raise_unchangeable
+
+
 def _is_identical(k1, v1, k2, v2):
     if k1 != k2:
         return False
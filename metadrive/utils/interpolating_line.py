@@ -7,13 +7,30 @@ from metadrive.utils.math import norm, get_vertical_vector
 
 class InterpolatingLine:
     """
-    This class provides point set with interpolating function
+    This class provides point set with interpolating function. Segments are stored in arrays, so that the segment of a
+    longitudinal position can be found by binary search on the cumulative length.
     """
     def __init__(self, points):
         points = np.asarray(points)[..., :2]
-        self.segment_property, self._start_points, self._end_points = self._get_properties(points)
+        self._start_points, self._end_points = self._get_properties(points)
         self._distance_b_a = self._end_points - self._start_points
-        self.length = sum([seg["length"] for seg in self.segment_property])
+        self._seg_lengths = np.array([self.points_distance(a, b) for a, b in zip(self._start_points, self._end_points)])
+        self._directions = self._distance_b_a / self._seg_lengths[:, None]
+        self._lateral_directions = np.stack([self._directions[:, 1], -self._directions[:, 0]], axis=1)
+        self._headings = np.array([self.points_heading(a, b) for a, b in zip(self._start_points, self._end_points)])
+        if self._is_static:
+            self._seg_lengths[0] = 0.1
+            self._directions[0] = (1, 0)
+            self._lateral_directions[0] = (0, 1)
+            self._headings[0] = 0
+        # the same as accumulating the length of segments one by one
+        self._accumulate_lengths = np.concatenate([[0.], np.cumsum(self._seg_lengths)])
+        self._accumulate_ends_with_tolerance = self._accumulate_lengths[1:] + 0.1
+        # normalized tangent vectors used by min_lineseg_dist
+        self._d_ba_unit = np.divide(
+            self._distance_b_a, (np.hypot(self._distance_b_a[:, 0], self._distance_b_a[:, 1]).reshape(-1, 1))
+        )
+        self.length = float(self._accumulate_lengths[-1])
 
     def position(self, longitudinal: float, lateral: float) -> np.ndarray:
         return self.get_point(longitudinal, lateral)
@@ -21,91 +38,49 @@ class InterpolatingLine:
     def local_coordinates(self, position, only_in_lane_point=False):
         """
         Finding the local coordinate of a given point when projected to this interpolating line.
-        We will iterate over all segments, from start to end, and compute the relative position of the point
-        w.r.t. the start point of the segment.
-        Since each line segment is straight, the relative position of the position to the start point is exactly
-        the local coordination.
-        If the point is not fall into this line segment, then we will increment the "longitudinal position" by the
-        length of this line segment, and then computing next line segment.
-
-        Here we provide two implementations.
-
-        Option 1: Iterate over all segments, and when finding the longitudinal position of the point w.r.t. the
-        start point of the segment is negative, stop iteration and return current "accumulated longitudinal position"
-        and lateral position.
-        This option assumes the longitudinal position is accumulating increasingly when iterating over segments.
-        Option 1 might be problematic in the case of extremely curved road.
-        (PZH: But I can't image such case and why it fails option 1.)
-
-        Option 2: Iterate over all segments and never stop the iteration until all segments are visited. Compute the
-        "accumulated longitudinal position" and lateral position of the point in each segment when assuming the point
-        is exactly falling into the segment. Then, search all reported coordinates in all segments, find the one
-        with minimal lateral position, and report the value.
-        This option is problematic as raised by PZH that the return value might be wrong.
-        Let's say there is a correct segment A where the position is falling into, and there exists another segment
-        B where the lateral position of the point in segment B is 0, but segment B is far away from A in longitudinal.
-        In this case, the option 2 algorithm will return segment B because it has minimal lateral, but it is wrong.
-
-        We will use Option 1.
+        The point is projected to the closest line segment. The longitudinal position is the accumulated length of
+        segments before the closest one plus the projection on the closest segment, and the lateral position is the
+        projection on the lateral direction of the closest segment.
         """
-        min_dists = self.min_lineseg_dist(position, self._start_points, self._end_points, self._distance_b_a)
-        target_segment_idx = np.argmin(min_dists)
-
-        long = 0
-        for idx, seg in enumerate(self.segment_property):
-            if idx != target_segment_idx:
-                long += seg["length"]
-            else:
-                delta_x = position[0] - seg["start_point"][0]
-                delta_y = position[1] - seg["start_point"][1]
-                long += delta_x * seg["direction"][0] + delta_y * seg["direction"][1]
-                lateral = delta_x * seg["lateral_direction"][0] + delta_y * seg["lateral_direction"][1]
-                return long, lateral
-
-        # deprecated content
-        # Four elements:
-        #   accumulated longitude,
-        #   segment-related longitude,
-        #   segment-related lateral,
-        # ret = []
-        # exclude_ret = []
-        # accumulate_len = 0
-        #
-        # # _debug = []
-        #
-        # for seg in self.segment_property:
-        #     delta_x = position[0] - seg["start_point"][0]
-        #     delta_y = position[1] - seg["start_point"][1]
-        #     longitudinal = delta_x * seg["direction"][0] + delta_y * seg["direction"][1]
-        #     lateral = delta_x * seg["lateral_direction"][0] + delta_y * seg["lateral_direction"][1]
-        #     # _debug.append(longitudinal)
-        #
-        #     if longitudinal < 0.0:
-        #         dist_square = norm(delta_x, delta_y)
-        #         if dist_square < seg["length"] * 2:
-        #             current_long = accumulate_len + longitudinal
-        #             current_lat = lateral
-        #             return current_long, current_lat
-        #
-        #     if not only_in_lane_point:
-        #         ret.append([accumulate_len + longitudinal, longitudinal, lateral])
-        #     else:
-        #         if abs(lateral) <= self.width / 2 and -1. <= accumulate_len + longitudinal <= self.length + 1:
-        #             ret.append([accumulate_len + longitudinal, longitudinal, lateral])
-        #         else:
-        #             exclude_ret.append([accumulate_len + longitudinal, longitudinal, lateral])
-        #     accumulate_len += seg["length"]
-        # if len(ret) == 0:
-        #     # for corner case
-        #     ret = exclude_ret
-        # ret.sort(key=lambda seg: abs(seg[-1]))
-        # return ret[0][0], ret[0][-1]
+        min_dists = self.min_lineseg_dist(
+            position, self._start_points, self._end_points, self._distance_b_a, d=self._d_ba_unit
+        )
+        idx = np.argmin(min_dists)
+        delta_x = position[0] - self._start_points[idx][0]
+        delta_y = position[1] - self._start_points[idx][1]
+        long = self._accumulate_lengths[idx]
+        long += delta_x * self._directions[idx][0] + delta_y * self._directions[idx][1]
+        lateral = delta_x * self._lateral_directions[idx][0] + delta_y * self._lateral_directions[idx][1]
+        return long, lateral
+
+    def local_coordinates_many(self, positions):
+        """
+        Batched version of local_coordinates.
+        :param positions: array in shape [num_positions, 2]
+        :return: longitudinal and lateral positions, both in shape [num_positions]
+        """
+        positions = np.asarray(positions)[..., :2]
+        d = self._d_ba_unit
+        # [num_positions, num_segments]
+        s = np.einsum("psk,sk->ps", self._start_points[None, :, :] - positions[:, None, :], d)
+        t = np.einsum("psk,sk->ps", positions[:, None, :] - self._end_points[None, :, :], d)
+        h = np.maximum(np.maximum(s, t), 0)
+        d_pa = positions[:, None, :] - self._start_points[None, :, :]
+        c = d_pa[..., 0] * d[:, 1] - d_pa[..., 1] * d[:, 0]
+        idx = np.argmin(np.hypot(h, c), axis=1)
+        delta = positions - self._start_points[idx]
+        long = self._accumulate_lengths[idx] + np.sum(delta * self._directions[idx], axis=1)
+        lateral = np.sum(delta * self._lateral_directions[idx], axis=1)
+        return long, lateral
 
     def _get_properties(self, points):
+        """
+        Merge points closer than 1m and return the start points and end points of segments
+        """
         points = np.asarray(points)[..., :2]
-        ret = []
         start_points = []
         end_points = []
+        self._is_static = False
         p_start_idx = 0
         while p_start_idx < len(points) - 1:
             for p_end_idx in range(p_start_idx + 1, len(points)):
@@ -120,32 +95,39 @@ class InterpolatingLine:
                 p_start_idx = p_end_idx  # next
                 continue
 
-            seg_property = {
-                "length": self.points_distance(p_start, p_end),
-                "direction": np.asarray(self.points_direction(p_start, p_end)),
-                "lateral_direction": np.asarray(self.points_lateral_direction(p_start, p_end)),
-                "heading": self.points_heading(p_start, p_end),
-                "start_point": p_start,
-                "end_point": p_end
-            }
-            ret.append(seg_property)
-            start_points.append(seg_property["start_point"])
-            end_points.append(seg_property["end_point"])
+            start_points.append(p_start)
+            end_points.append(p_end)
             p_start_idx = p_end_idx  # next
-        if len(ret) == 0:
+        if len(start_points) == 0:
             # static, length=zero
-            seg_property = {
-                "length": 0.1,
-                "direction": np.asarray((1, 0)),
-                "lateral_direction": np.asarray((0, 1)),
-                "heading": 0,
-                "start_point": points[0],
-                "end_point": np.asarray([points[0][0] + 0.1, points[0][1]])
-            }
-            ret.append(seg_property)
-            start_points.append(seg_property["start_point"])
-            end_points.append(seg_property["end_point"])
-        return ret, np.asarray(start_points), np.asarray(end_points)
+            self._is_static = True
+            start_points.append(points[0])
+            end_points.append(np.asarray([points[0][0] + 0.1, points[0][1]]))
+        return np.asarray(start_points, dtype=float), np.asarray(end_points, dtype=float)
+
+    @property
+    def segment_points(self):
+        """
+        Start points of segments followed by the end point of the last segment, in shape [num_segments + 1, 2]
+        """
+        return np.concatenate([self._start_points, self._end_points[-1:]])
+
+    @property
+    def segment_property(self):
+        """
+        Segments represented as a list of dict. It is kept for compatibility, use the array attributes instead
+        """
+        return [self._get_segment(idx) for idx in range(len(self._seg_lengths))]
+
+    def _get_segment(self, idx):
+        return {
+            "length": self._seg_lengths[idx],
+            "direction": self._directions[idx],
+            "lateral_direction": self._lateral_directions[idx],
+            "heading": self._headings[idx],
+            "start_point": self._start_points[idx],
+            "end_point": self._end_points[idx]
+        }
 
     @staticmethod
     def points_distance(start_p, end_p):
@@ -164,69 +146,80 @@ class InterpolatingLine:
     def points_heading(start_p, end_p):
         return math.atan2(end_p[1] - start_p[1], end_p[0] - start_p[0])
 
+    def _segment_index(self, longitudinal):
+        """
+        Index of the first segment whose accumulated length + 0.1 >= longitudinal, or the last segment
+        """
+        idx = np.searchsorted(self._accumulate_ends_with_tolerance, longitudinal, side="left")
+        return min(idx, len(self._seg_lengths) - 1)
+
     def get_point(self, longitudinal, lateral=None):
         """
         Get point on this line by interpolating
         """
-        accumulate_len = 0
-        for seg in self.segment_property:
-            accumulate_len += seg["length"]
-            if accumulate_len + 0.1 >= longitudinal:
-                break
+        idx = self._segment_index(longitudinal)
+        point = self._start_points[idx] + (longitudinal - self._accumulate_lengths[idx + 1] +
+                                           self._seg_lengths[idx]) * self._directions[idx]
         if lateral is not None:
-            return (seg["start_point"] + (longitudinal - accumulate_len + seg["length"]) *
-                    seg["direction"]) + lateral * seg["lateral_direction"]
+            return point + lateral * self._lateral_directions[idx]
         else:
-            return seg["start_point"] + (longitudinal - accumulate_len + seg["length"]) * seg["direction"]
+            return point
+
+    def get_points(self, longitudinals, laterals=0):
+        """
+        Batched version of get_point
+        :param longitudinals: array in shape [num_points]
+        :param laterals: a float or an array in shape [num_points]
+        :return: points in shape [num_points, 2]
+        """
+        longitudinals = np.asarray(longitudinals, dtype=float)
+        idx = np.minimum(
+            np.searchsorted(self._accumulate_ends_with_tolerance, longitudinals, side="left"),
+            len(self._seg_lengths) - 1
+        )
+        offset = longitudinals - self._accumulate_lengths[idx + 1] + self._seg_lengths[idx]
+        return self._start_points[idx] + offset[:, None] * self._directions[idx] + \
+            np.asarray(laterals)[..., None] * self._lateral_directions[idx]
 
     def get_heading_theta(self, longitudinal: float) -> float:
         """
         In rad
         """
-        accumulate_len = 0
-
-        assert len(self.segment_property) > 0
-
-        for seg in self.segment_property:
-            accumulate_len += seg["length"]
-            if accumulate_len > longitudinal:
-                return seg["heading"]
-
-        return seg["heading"]
+        assert len(self._seg_lengths) > 0
+        idx = np.searchsorted(self._accumulate_lengths[1:], longitudinal, side="right")
+        return self._headings[min(idx, len(self._seg_lengths) - 1)]
 
     def segment(self, longitudinal: float):
         """
         Return the segment piece on this lane of current position
         """
-        accumulate_len = 0
-        for index, seg in enumerate(self.segment_property):
-            accumulate_len += seg["length"]
-            if accumulate_len + 0.1 >= longitudinal:
-                return self.segment_property[index]
-        return self.segment_property[index]
+        return self._get_segment(self._segment_index(longitudinal))
 
     def lateral_direction(self, longitude):
-        lane_segment = self.segment(longitude)
-        lateral = lane_segment["lateral_direction"]
-        return lateral
+        return self._lateral_directions[self._segment_index(longitude)]
 
     def destroy(self):
-        del self.segment_property
-        self.segment_property = []
+        self._start_points = None
+        self._end_points = None
+        self._distance_b_a = None
+        self._seg_lengths = np.zeros((0, ))
+        self._directions = None
+        self._lateral_directions = None
+        self._headings = None
+        self._accumulate_lengths = None
+        self._accumulate_ends_with_tolerance = None
+        self._d_ba_unit = None
         self.length = None
 
     def get_polyline(self, interval=2, lateral=0):
         """
         This method will return the center line of this Lane in a discrete vector representation
         """
-        ret = []
-        for i in np.arange(0, self.length, interval):
-            ret.append(self.position(i, lateral))
-        ret.append(self.position(self.length, lateral))
-        return np.array(ret)
+        longitudinals = np.append(np.arange(0, self.length, interval), self.length)
+        return self.get_points(longitudinals, lateral)
 
     @staticmethod
-    def min_lineseg_dist(p, a, b, d_ba=None):
+    def min_lineseg_dist(p, a, b, d_ba=None, d=None):
         """Cartesian distance from point to line segment
         Edited to support arguments as series, from:
         https://stackoverflow.com/a/54442561/11208892
@@ -235,12 +228,14 @@ class InterpolatingLine:
             - p: np.array of single point, shape (2,) or 2D array, shape (x, 2)
             - a: np.array of shape (x, 2)
             - b: np.array of shape (x, 2)
+            - d: precomputed normalized tangent vectors of shape (x, 2)
         """
         # normalized tangent vectors
         p = np.asarray(p)
-        if d_ba is None:
-            d_ba = b - a
-        d = np.divide(d_ba, (np.hypot(d_ba[:, 0], d_ba[:, 1]).reshape(-1, 1)))
+        if d is None:
+            if d_ba is None:
+                d_ba = b - a
+            d = np.divide(d_ba, (np.hypot(d_ba[:, 0], d_ba[:, 1]).reshape(-1, 1)))
 
         # signed parallel distance components
         # rowwise dot products of 2D vectors
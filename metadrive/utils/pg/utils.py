@@ -9,13 +9,14 @@ from panda3d.core import Vec3
 
 from metadrive.component.lane.circular_lane import CircularLane
 from metadrive.component.lane.pg_lane import PGLane
+from metadrive.component.lane.straight_lane import StraightLane
 from metadrive.constants import CollisionGroup
 from metadrive.constants import Decoration, MetaDriveType
 from metadrive.engine.physics_node import BaseRigidBodyNode, BaseGhostBodyNode
 from metadrive.utils.coordinates_shift import panda_heading
 from metadrive.utils.coordinates_shift import panda_vector
 from metadrive.utils.interpolating_line import InterpolatingLine
-from metadrive.utils.math import get_points_bounding_box, norm
+from metadrive.utils.math import get_points_bounding_box, norm, wrap_to_pi
 from metadrive.utils.utils import get_object_from_node
 
 if TYPE_CHECKING:
@@ -44,31 +45,122 @@ def check_lane_on_road(
     Calculate if the new lane intersects with other lanes in current road network
     The return Value is True when cross
     Note: the decoration road will be ignored in default
+
+    Points sampled along the new lane are tested against all lanes of a road at once. Bounding boxes of roads are
+    cached in the road network, and points too close to the boundary of a lane are tested again with
+    lane.local_coordinates(), so the result is the same as testing each point one by one
     """
     assert ignore_intersection_checking is not None
     if ignore_intersection_checking:
         return True
-    graph = road_network.graph
-    for _from, to_dict in graph.items():
+    longitudes = np.arange(1, int(lane.length), 1)
+    if len(longitudes) == 0:
+        return False
+    points = _get_lane_positions(lane, longitudes, positive)
+    x_max_2, x_min_2, y_max_2, y_min_2 = get_lanes_bounding_box([lane])
+    for (_from, _to), (lanes, (x_max_1, x_min_1, y_max_1, y_min_1)) in _get_road_bounding_boxes(road_network).items():
+        if ignored and (_from, _to) == ignored:
+            continue
+        if x_min_1 > x_max_2 or x_min_2 > x_max_1 or y_min_1 > y_max_2 or y_min_2 > y_max_1:
+            continue
+        for l in lanes:
+            uncertain = _get_points_on_lane(l, points)
+            if uncertain is True:
+                return True
+            # test points close to the lane boundary one by one
+            for i in longitudes[uncertain]:
+                sample_point = lane.position(i, positive * lane.width_at(i) / 2.0)
+                longitudinal, lateral = l.local_coordinates(sample_point)
+                is_on = math.fabs(lateral) <= l.width_at(longitudinal) / 2.0 and 0 <= longitudinal <= l.length
+                if is_on:
+                    return True
+    return False
+
+
+# Points whose distance to the boundary of a lane is smaller than this are tested with lane.local_coordinates()
+_ON_LANE_TOLERANCE = 1e-6
+
+
+def _get_road_bounding_boxes(road_network: "NodeRoadNetwork"):
+    """
+    Bounding boxes of roads to check in check_lane_on_road(). A box is reused until lanes of the road are changed
+    """
+    cache = road_network.road_bounding_boxes
+    ret = {}
+    for _from, to_dict in road_network.graph.items():
         for _to, lanes in to_dict.items():
-            if ignored and (_from, _to) == ignored:
-                continue
-            if (_from, _to) == (Decoration.start, Decoration.end):
-                continue
-            if len(lanes) == 0:
+            if (_from, _to) == (Decoration.start, Decoration.end) or len(lanes) == 0:
                 continue
-            x_max_1, x_min_1, y_max_1, y_min_1 = get_lanes_bounding_box(lanes)
-            x_max_2, x_min_2, y_max_2, y_min_2 = get_lanes_bounding_box([lane])
-            if x_min_1 > x_max_2 or x_min_2 > x_max_1 or y_min_1 > y_max_2 or y_min_2 > y_max_1:
-                continue
-            for _id, l in enumerate(lanes):
-                for i in range(1, int(lane.length), 1):
-                    sample_point = lane.position(i, positive * lane.width_at(i) / 2.0)
-                    longitudinal, lateral = l.local_coordinates(sample_point)
-                    is_on = math.fabs(lateral) <= l.width_at(longitudinal) / 2.0 and 0 <= longitudinal <= l.length
-                    if is_on:
-                        return True
-    return False
+            cached = cache.get((_from, _to), None)
+            if cached is None or len(cached[0]) != len(lanes) or any(a is not b for a, b in zip(cached[0], lanes)):
+                cached = (list(lanes), get_lanes_bounding_box(lanes))
+            ret[(_from, _to)] = cached
+    road_network.road_bounding_boxes = ret
+    return ret
+
+
+def _get_lane_positions(lane, longitudes, positive):
+    """
+    Positions at the given longitudes and lateral = positive * width / 2, in shape [num_points, 2]
+    """
+    if type(lane) is StraightLane:
+        laterals = positive * lane.width / 2.0
+        return lane.start + longitudes[:, None] * lane.direction + laterals * lane.direction_lateral
+    elif type(lane) is CircularLane:
+        laterals = positive * lane.width / 2.0
+        phi = lane.direction * longitudes / lane.radius + lane.start_phase
+        radius = lane.radius + laterals * lane.direction
+        return np.stack([lane.center[0] + radius * np.cos(phi), lane.center[1] + radius * np.sin(phi)], axis=1)
+    return np.array([lane.position(i, positive * lane.width_at(i) / 2.0) for i in longitudes], dtype=float)
+
+
+def _wrap_to_pi(x):
+    """
+    Vectorized wrap_to_pi, and a mask of values close to the discontinuity at pi
+    """
+    x = np.mod(x, 2 * np.pi)
+    return x - 2 * np.pi * (x > np.pi), np.abs(x - np.pi) < _ON_LANE_TOLERANCE
+
+
+def _get_points_on_lane(lane, points):
+    """
+    Test if points are on the lane
+    :return: True if any point is on the lane. Otherwise, a mask of points which are too close to the lane boundary to
+    be determined with vectorized computation
+    """
+    if type(lane) is StraightLane:
+        delta_x = points[:, 0] - lane.start[0]
+        delta_y = points[:, 1] - lane.start[1]
+        longitudinal = delta_x * lane.direction[0] + delta_y * lane.direction[1]
+        lateral = delta_x * lane.direction_lateral[0] + delta_y * lane.direction_lateral[1]
+        uncertain = np.zeros(len(points), dtype=bool)
+    elif type(lane) is CircularLane:
+        # the same as CircularLane.local_coordinates()
+        delta_x = points[:, 0] - lane.center[0]
+        delta_y = points[:, 1] - lane.center[1]
+        abs_phase, uncertain = _wrap_to_pi(np.arctan2(delta_y, delta_x))
+        start_phase, end_phase = wrap_to_pi(lane.start_phase), wrap_to_pi(lane.end_phase)
+        diff_to_start_phase, mask_1 = _wrap_to_pi(abs_phase - start_phase)
+        diff_to_end_phase, mask_2 = _wrap_to_pi(abs_phase - end_phase)
+        diff_to_start_phase, diff_to_end_phase = np.abs(diff_to_start_phase), np.abs(diff_to_end_phase)
+        closer_to_end = diff_to_start_phase > diff_to_end_phase
+        uncertain |= mask_1 | mask_2 | (np.abs(diff_to_start_phase - diff_to_end_phase) < _ON_LANE_TOLERANCE)
+        if lane.is_clockwise():
+            diff_end, diff_start = lane.end_phase - abs_phase, lane.start_phase - abs_phase
+        else:
+            diff_end, diff_start = abs_phase - lane.end_phase, abs_phase - lane.start_phase
+        relative_end, mask_1 = _wrap_to_pi(diff_end)
+        relative_start, mask_2 = _wrap_to_pi(diff_start)
+        longitudinal = np.where(closer_to_end, relative_end * lane.radius + lane.length, relative_start * lane.radius)
+        uncertain |= np.where(closer_to_end, mask_1, mask_2)
+        lateral = lane.direction * (np.sqrt(delta_x**2 + delta_y**2) - lane.radius)
+    else:
+        # test all points with lane.local_coordinates()
+        return np.ones(len(points), dtype=bool)
+    margin = np.minimum(lane.width / 2.0 - np.abs(lateral), np.minimum(longitudinal, lane.length - longitudinal))
+    if np.any((margin > _ON_LANE_TOLERANCE) & ~uncertain):
+        return True
+    return uncertain | (np.abs(margin) <= _ON_LANE_TOLERANCE)
 
 
 def get_lanes_bounding_box(lanes, extra_lateral=3) -> Tuple:
@@ -90,9 +182,7 @@ def get_interpolating_lane_contour(lanes):
     assert isinstance(lanes[0], InterpolatingLine)
     ret = []
     for lane in lanes:
-        for seg in lane.segment_property:
-            ret.append(seg["start_point"])
-        ret.append(seg["end_point"])
+        ret += list(lane.segment_points)
     return ret
 
 